@@ -0,0 +1,146 @@
+#------------------------------------------- ATTENDANCE ARCHIVE ----------------------------------------------#
+
+# Closed years of Attendance move out of the live database into one SQLite file per year, next to it
+# (emp.db -> emp.attendance_2024.db), and Attendance_Archive in the live database lists them.
+# attach() ATTACHes the archives and creates the temp view Attendance_All, the UNION ALL of the live
+# table and every archive, for the reports that need the whole history.
+#   python ems.py db archive --year 2024
+
+import datetime
+import os
+import time
+
+import db
+import shards
+
+VIEW = 'Attendance_All'
+COLUMNS = 'att_id, emp_id, date, clock_in, clock_out, working_hours, overtime_hours, status'
+
+
+class archiveError(Exception):
+    pass
+
+
+def _main_path(conn):
+    for _, name, path in conn.execute('PRAGMA database_list'):
+        if name == 'main':
+            return path
+
+
+def archive_path(conn, year):
+    base, _ = os.path.splitext(_main_path(conn) or db.DB_PATH)
+    return f'{base}.attendance_{year}.db'
+
+
+def _resolve(conn, path):
+    # Archives are registered by file name, so they move with the live database
+    return os.path.join(os.path.dirname(_main_path(conn) or db.DB_PATH), path)
+
+
+def archived_years(conn):
+    return [row[0] for row in conn.execute('SELECT year FROM Attendance_Archive ORDER BY year')]
+
+
+def list_archives(conn):
+    return conn.execute('SELECT year, path, rows, archived_at FROM Attendance_Archive ORDER BY year').fetchall()
+
+
+def _attach(conn, year, path):
+    alias = f'attendance_{year}'
+    if alias not in {row[1] for row in conn.execute('PRAGMA database_list')}:
+        conn.execute(f'ATTACH DATABASE ? AS {alias}', (path,))
+    return alias
+
+
+def archive_year(conn, year, vacuum=False):
+    # Moves every Attendance row of a closed year into its archive file; returns (rows moved, seconds).
+    # The copy commits before the live rows are deleted, so an interrupted run loses nothing and
+    # running it again finishes the job.
+    year = int(year)
+    if year >= datetime.date.today().year:
+        raise archiveError(f'Only closed years can be archived; {year} is still open')
+    if shards.is_sharded(conn):
+        # The rows of the year are spread over the department shards
+        raise archiveError('Attendance is split into department shards; archive before sharding')
+    params = {'start': f'{year}-01-01', 'end': f'{year}-12-31'}
+    path = archive_path(conn, year)
+    began = time.perf_counter()
+
+    conn.commit()
+    alias = _attach(conn, year, path)
+    with db.transaction(conn):
+        conn.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {alias}.Attendance(
+                        att_id INTEGER PRIMARY KEY,
+                        emp_id INTEGER,
+                        date DATE,
+                        clock_in TIME,
+                        clock_out TIME,
+                        working_hours NUMERIC,
+                        overtime_hours NUMERIC,
+                        status VARCHAR(20)
+                    )
+                    ''')
+        conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {alias}.idx_attendance_emp_date ON Attendance(emp_id, date)')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {alias}.idx_attendance_date ON Attendance(date)')
+        conn.execute(f'''
+                    INSERT OR IGNORE INTO {alias}.Attendance({COLUMNS})
+                        SELECT {COLUMNS} FROM main.Attendance WHERE date BETWEEN :start AND :end
+                    ''', params)
+        conn.execute('''
+                    INSERT OR REPLACE INTO Attendance_Archive(year,path,rows) VALUES (?,?,0)
+                    ''', (year, os.path.basename(path)))
+
+    with db.transaction(conn):
+        live, archived = conn.execute(f'''
+                    SELECT (SELECT COUNT(*) FROM main.Attendance WHERE date BETWEEN :start AND :end),
+                           (SELECT COUNT(*) FROM {alias}.Attendance a WHERE a.att_id IN
+                                (SELECT att_id FROM main.Attendance WHERE date BETWEEN :start AND :end))
+                    ''', params).fetchone()
+        if archived != live:
+            raise archiveError(f'Archive {path} is missing {live - archived} row(s) of {year}; nothing was deleted')
+        cursor = conn.execute('DELETE FROM main.Attendance WHERE date BETWEEN :start AND :end', params)
+        conn.execute(f'''
+                    UPDATE Attendance_Archive SET rows = (SELECT COUNT(*) FROM {alias}.Attendance),
+                        archived_at = datetime('now', 'localtime')
+                        WHERE year = ?
+                    ''', (year,))
+    moved = cursor.rowcount
+
+    if vacuum:
+        conn.execute('VACUUM main')
+    if _has_view(conn):
+        attach(conn)
+    return moved, time.perf_counter() - began
+
+
+def _has_view(conn):
+    return conn.execute("SELECT 1 FROM sqlite_temp_master WHERE type = 'view' AND name = ?", (VIEW,)).fetchone()
+
+
+def attach(conn):
+    # ATTACHes every archive and (re)creates the temp view over the live table and all of them
+    selects = [f'SELECT {COLUMNS} FROM main.Attendance']
+    for year, path in conn.execute('SELECT year, path FROM Attendance_Archive ORDER BY year').fetchall():
+        path = _resolve(conn, path)
+        if not os.path.exists(path):
+            raise archiveError(f'Attendance archive for {year} is missing : {path}')
+        selects.append(f'SELECT {COLUMNS} FROM {_attach(conn, year, path)}.Attendance')
+    conn.execute(f'DROP VIEW IF EXISTS temp.{VIEW}')
+    conn.execute(f'CREATE TEMP VIEW {VIEW} AS ' + '\nUNION ALL '.join(selects))
+    return VIEW
+
+
+def detach(conn):
+    conn.execute(f'DROP VIEW IF EXISTS temp.{VIEW}')
+    for _, name, _ in conn.execute('PRAGMA database_list').fetchall():
+        if name.startswith('attendance_'):
+            conn.execute(f'DETACH DATABASE {name}')
+
+
+def attendance_source(conn, start=None):
+    # Table a report from start ('YYYY-MM-DD', None : the beginning) onwards should read
+    years = archived_years(conn)
+    if not years or (start and int(start[:4]) > years[-1]):
+        return 'Attendance'
+    return attach(conn)
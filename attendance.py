@@ -0,0 +1,327 @@
+#------------------------------------------- ATTENDANCE ----------------------------------------------#
+
+import datetime
+import queue
+import sqlite3
+import threading
+import time
+
+import db
+import payroll
+import shards
+
+FULL_DAY_HOURS = 8
+PRESENT_HOURS = 6
+HALF_DAY_HOURS = 4
+WORKING_DAYS = 25
+
+# A punch writer commits once per MAX_BATCH punches or MAX_WAIT seconds, whichever comes first
+MAX_BATCH = 500
+MAX_WAIT = 0.02
+
+
+class punchError(Exception):
+    pass
+
+
+def day_status(work_hours):
+    # Returns (status, overtime hours) for a day's working hours
+    if work_hours > FULL_DAY_HOURS:
+        return 'OVERTIME', work_hours - FULL_DAY_HOURS
+    elif work_hours > PRESENT_HOURS:
+        return 'PRESENT', 0
+    elif work_hours >= HALF_DAY_HOURS:
+        return 'HALF DAY', 0
+    return 'ABSENT', 0
+
+
+def _clock_in(conn, emp_id, now):
+    # Checks and writes one punch in; the caller owns the transaction
+    date = now.strftime(r'%Y-%m-%d')
+    time_in = now.strftime(r'%H:%M')
+
+    marked = conn.execute('''
+                        SELECT clock_in FROM Attendance WHERE emp_id = ? AND date = ?
+                        ''',(emp_id,date)).fetchone()
+    if marked:
+        raise punchError('You have already punched in today.')
+    try:
+        conn.execute('''
+                    INSERT INTO Attendance(emp_id,date,clock_in,status)
+                        VALUES (?,?,?,?)
+                    ''',(emp_id,date,time_in,'PRESENT'))
+    except sqlite3.IntegrityError:
+        # Another terminal punched the same employee in first
+        raise punchError('You have already punched in today.')
+    return {'date': date, 'time': time_in}
+
+
+def _open_day(conn, emp_id, now):
+    # Returns (clock_in, working hours, status, overtime) for a punch out at now
+    date = now.strftime(r'%Y-%m-%d')
+    punched = conn.execute('''
+                        SELECT clock_in,clock_out FROM Attendance WHERE emp_id = ? AND date = ?
+                        ''',(emp_id,date)).fetchone()
+    if not punched:
+        raise punchError('You haven\'t punched in yet !!! Please punch in first.')
+    if punched[1] is not None:
+        raise punchError('You have already punch out for today .')
+
+    t_in = datetime.datetime.strptime(punched[0], '%H:%M')
+    t_out = datetime.datetime.strptime(now.strftime(r'%H:%M'), '%H:%M')
+    work_hours = (t_out - t_in).seconds / 3600
+    return (punched[0], work_hours) + day_status(work_hours)
+
+
+def _clock_out(conn, emp_id, now, confirm=None):
+    # Checks and writes one punch out; the caller owns the transaction
+    date = now.strftime(r'%Y-%m-%d')
+    time_out = now.strftime(r'%H:%M')
+    _, work_hours, status, overtime = _open_day(conn, emp_id, now)
+    if status in ('ABSENT', 'HALF DAY') and confirm and not confirm(status):
+        return None
+
+    balance = conn.execute('''
+                        SELECT total_leave FROM Leave_Balance WHERE emp_id = ?
+                        ''',(emp_id,)).fetchone()
+    leave_balance = balance[0] if balance else 0
+
+    # Short days come out of the leave balance first, then out of the period's pay
+    missed = {'ABSENT': 1, 'HALF DAY': 0.5}.get(status, 0)
+    if missed:
+        if leave_balance != 0:
+            leave_balance -= missed
+            conn.execute('''
+                        UPDATE Leave_Balance SET total_leave = ? WHERE emp_id = ?
+                        ''',(leave_balance,emp_id))
+        else:
+            salary = conn.execute('''
+                        SELECT basic_pay FROM Payroll WHERE emp_id = ? ORDER BY payroll_id LIMIT 1
+                        ''',(emp_id,)).fetchone()
+            if salary:
+                payroll.adjust(conn, emp_id, 'DEDUCTION', (salary[0] / WORKING_DAYS) * missed,
+                               payroll.period_of(date), 'ATTENDANCE')
+    conn.execute('''
+                UPDATE Attendance SET clock_out = ?,working_hours = ?,overtime_hours = ?,status = ?
+                    WHERE emp_id = ? AND date = ?
+                ''',(time_out,work_hours,overtime,status,emp_id,date))
+    _add_to_summary(conn, emp_id, date[:7], status, work_hours, overtime)
+    return {'date': date, 'time': time_out, 'status': status, 'working_hours': work_hours, 'overtime_hours': overtime}
+
+
+def _add_to_summary(conn, emp_id, month, status, work_hours, overtime):
+    conn.execute('''
+                INSERT INTO Attendance_Summary(month,emp_id,days,present,half_days,absent,working_hours,overtime_hours)
+                    VALUES (:month,:emp_id,1,:present,:half_day,:absent,:hours,:overtime)
+                    ON CONFLICT (month, emp_id) DO UPDATE SET
+                        days = days + 1,
+                        present = present + excluded.present,
+                        half_days = half_days + excluded.half_days,
+                        absent = absent + excluded.absent,
+                        working_hours = working_hours + excluded.working_hours,
+                        overtime_hours = overtime_hours + excluded.overtime_hours
+                ''',{'month': month, 'emp_id': emp_id, 'present': int(status in ('PRESENT', 'OVERTIME')),
+                     'half_day': int(status == 'HALF DAY'), 'absent': int(status == 'ABSENT'),
+                     'hours': work_hours, 'overtime': overtime})
+
+
+def punch_in(conn, emp_id, now=None):
+    now = now or datetime.datetime.now()
+    if _writer is not None:
+        return _writer.punch_in(emp_id, now)
+    with db.transaction(conn):
+        return _clock_in(conn, emp_id, now)
+
+
+def punch_out(conn, emp_id, now=None, confirm=None):
+    # confirm(status) is asked before an ABSENT or HALF DAY punch out; returning False aborts
+    now = now or datetime.datetime.now()
+    if _writer is not None:
+        if confirm:
+            status = _open_day(conn, emp_id, now)[2]
+            if status in ('ABSENT', 'HALF DAY') and not confirm(status):
+                return None
+        return _writer.punch_out(emp_id, now)
+    with db.transaction(conn):
+        return _clock_out(conn, emp_id, now, confirm)
+
+
+#------------------------------------------- MONTHLY SUMMARY ----------------------------------------------#
+
+def rebuild_summary(conn, month=None):
+    # Regenerates Attendance_Summary from the raw rows, for one month 'YYYY-MM' or all of them.
+    # Months of archived years keep the totals they had when they were archived.
+    began = time.perf_counter()
+    with db.transaction(conn):
+        conn.execute('''
+                    DELETE FROM Attendance_Summary WHERE (:month IS NULL OR month = :month)
+                    AND CAST(substr(month, 1, 4) AS INTEGER) NOT IN (SELECT year FROM Attendance_Archive)
+                    ''',{'month': month})
+        cursor = conn.execute('''
+                    INSERT INTO Attendance_Summary(month,emp_id,days,present,half_days,absent,working_hours,overtime_hours)
+                        SELECT substr(date, 1, 7), emp_id, COUNT(*),
+                               COUNT(CASE WHEN status IN ('PRESENT', 'OVERTIME') THEN 1 END),
+                               COUNT(CASE WHEN status = 'HALF DAY' THEN 1 END),
+                               COUNT(CASE WHEN status = 'ABSENT' THEN 1 END),
+                               TOTAL(working_hours), TOTAL(overtime_hours)
+                            FROM Attendance
+                            WHERE clock_out IS NOT NULL
+                            AND (:month IS NULL OR date BETWEEN :month || '-01' AND :month || '-31')
+                            AND CAST(substr(date, 1, 4) AS INTEGER) NOT IN (SELECT year FROM Attendance_Archive)
+                            GROUP BY substr(date, 1, 7), emp_id
+                    ''',{'month': month})
+    return cursor.rowcount, time.perf_counter() - began
+
+
+def monthly_summary(conn, month, dept_id=None, emp_id=None):
+    # (emp_id, name, days, present, half_days, absent, working_hours, overtime_hours) per employee
+    return conn.execute('''
+                    SELECT s.emp_id, e.name, s.days, s.present, s.half_days, s.absent,
+                           ROUND(s.working_hours, 2), ROUND(s.overtime_hours, 2)
+                        FROM Attendance_Summary s JOIN Employee e ON e.emp_id = s.emp_id
+                        WHERE s.month = :month
+                        AND (:dept_id IS NULL OR e.dept_id = :dept_id)
+                        AND (:emp_id IS NULL OR s.emp_id = :emp_id)
+                        ORDER BY s.emp_id
+                    ''',{'month': month, 'dept_id': dept_id, 'emp_id': emp_id}).fetchall()
+
+
+def department_summary(conn, month):
+    # (dept_name, employees, days, present, half_days, absent, working_hours, overtime_hours) per department
+    return conn.execute('''
+                    SELECT d.dept_name, COUNT(*), SUM(s.days), SUM(s.present), SUM(s.half_days), SUM(s.absent),
+                           ROUND(SUM(s.working_hours), 2), ROUND(SUM(s.overtime_hours), 2)
+                        FROM Attendance_Summary s
+                        JOIN Employee e ON e.emp_id = s.emp_id
+                        JOIN Department d ON d.dept_id = e.dept_id
+                        WHERE s.month = ?
+                        GROUP BY d.dept_id ORDER BY d.dept_name
+                    ''',(month,)).fetchall()
+
+
+#------------------------------------------- PUNCH WRITER ----------------------------------------------#
+
+class PunchWriter:
+    # Queues punches from any number of threads and commits them in micro-batches on its own
+    # connection, so a shift change costs one lock and one fsync per batch instead of per punch.
+    # Punches are applied in arrival order with the same rules as punch_in / punch_out; a punch
+    # that breaks a rule fails on its own without holding back the rest of its batch. On a sharded
+    # database a batch commits once per department shard it touches.
+
+    def __init__(self, path=None, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.conn = db.connect(path)
+        self.queue = queue.Queue()
+        self.stats = {'batches': 0, 'punches': 0, 'rejected': 0}
+        self.thread = threading.Thread(target=self._run, name='punch-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, kind, emp_id, now=None):
+        # kind is 'in' or 'out'; the returned Future resolves once the batch is committed
+        if kind not in ('in', 'out'):
+            raise ValueError(f'unknown punch {kind!r}')
+        # Imported here : concurrent.futures pulls in logging, which the portal does not otherwise need
+        from concurrent.futures import Future
+        future = Future()
+        self.queue.put((kind, emp_id, now or datetime.datetime.now(), future))
+        return future
+
+    def punch_in(self, emp_id, now=None):
+        return self.submit('in', emp_id, now).result()
+
+    def punch_out(self, emp_id, now=None):
+        return self.submit('out', emp_id, now).result()
+
+    def close(self):
+        # Writes whatever is queued, then stops the writer thread
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+        shards.close_conn()
+        self.conn.close()
+
+    def _write(self, batch):
+        if not shards.is_sharded(self.conn):
+            self._commit(self.conn, batch)
+            return
+        # Sharded, each department's punches commit on its own shard, under its own lock
+        groups = {}
+        for item in batch:
+            try:
+                conn = shards.route(self.conn, item[1])
+            except shards.shardError as e:
+                item[3].set_exception(e)
+                continue
+            groups.setdefault(id(conn), (conn, []))[1].append(item)
+        for conn, items in groups.values():
+            self._commit(conn, items)
+
+    def _commit(self, conn, batch):
+        results = []
+        try:
+            if conn is self.conn:
+                conn.execute('BEGIN IMMEDIATE')
+            else:
+                # BEGIN IMMEDIATE on a shard would also take the write lock of emp.db, attached as org.
+                # A no-op write takes the shard's alone, before the batch reads anything.
+                conn.execute('BEGIN')
+                conn.execute('DELETE FROM main.Attendance WHERE 0')
+            with db.transaction(conn):
+                for kind, emp_id, now, future in batch:
+                    try:
+                        if kind == 'in':
+                            results.append((future, _clock_in(conn, emp_id, now), None))
+                        else:
+                            results.append((future, _clock_out(conn, emp_id, now), None))
+                    except punchError as e:
+                        results.append((future, None, e))
+        except Exception as e:
+            # Nothing in the batch was committed
+            for *_, future in batch:
+                future.set_exception(e)
+            return
+        self.stats['batches'] += 1
+        self.stats['punches'] += len(batch)
+        for future, result, error in results:
+            if error is not None:
+                self.stats['rejected'] += 1
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+_writer = None
+
+
+def start_writer(path=None, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+    # While a writer is running, punch_in / punch_out in this process go through it
+    global _writer
+    if _writer is None:
+        _writer = PunchWriter(path, max_batch, max_wait)
+    return _writer
+
+
+def stop_writer():
+    global _writer
+    if _writer is not None:
+        _writer.close()
+        _writer = None
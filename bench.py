@@ -0,0 +1,322 @@
+#------------------------------------------- BENCHMARK SUITE ----------------------------------------------#
+
+# Times the portal's hot paths against generated databases of several sizes and writes a JSON report.
+#   python bench.py --sizes 1000 100000 1000000 --report bench.json
+#   python bench.py --sizes 1000 --compare bench.json
+# Generated databases are cached in --data and copied before each run, so every run starts
+# from the same state. The portal methods are driven with scripted answers and their output
+# goes to os.devnull, so the timings include the printing but not the terminal.
+# 'startup' launches python -m ems itself and times it up to the first menu prompt.
+
+import argparse
+import builtins
+import contextlib
+import datetime
+import getpass
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+
+import attendance
+import datagen
+import db
+import migrations
+import roster
+
+SIZES = [1000, 100000, 1000000]
+REPEAT = 100
+HISTORY_DAYS = 7
+BURST = 300
+SEED = 42
+# Launches timed per size, and the budget from process start to the first menu prompt
+STARTUP_RUNS = 20
+STARTUP_BUDGET_MS = 50
+
+
+@contextlib.contextmanager
+def scripted(answers):
+    # Feeds input() and getpass() from answers and discards everything printed
+    answers = iter(answers)
+    saved = builtins.input, getpass.getpass
+    builtins.input = getpass.getpass = lambda prompt='': next(answers)
+    try:
+        with open(os.devnull, 'w', encoding='utf-8') as sink, contextlib.redirect_stdout(sink):
+            yield
+    finally:
+        builtins.input, getpass.getpass = saved
+
+
+def timed(cases):
+    # cases is a list of (callable, answers); returns the timings in milliseconds
+    timings = []
+    for func, answers in cases:
+        with scripted(answers):
+            began = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - began) * 1000)
+        db.get_conn().rollback()
+    return summarise(timings)
+
+
+def summarise(timings):
+    timings = sorted(timings)
+    return {
+        'runs': len(timings),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'max_ms': round(timings[-1], 3),
+    }
+
+
+def punch_burst(emp_ids, day, queued):
+    # Every employee punches in at the same moment from its own thread, as at a shift change
+    if queued:
+        attendance.start_writer()
+    timings = []
+    failed = []
+    start = threading.Barrier(len(emp_ids) + 1)
+
+    def kiosk(emp_id):
+        conn = db.get_conn()
+        start.wait()
+        began = time.perf_counter()
+        try:
+            attendance.punch_in(conn, emp_id, day)
+        except Exception as e:
+            failed.append(e)
+        timings.append((time.perf_counter() - began) * 1000)
+        db.close_conn()
+
+    threads = [threading.Thread(target=kiosk, args=(emp_id,)) for emp_id in emp_ids]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    attendance.stop_writer()
+    result = summarise(timings)
+    result['punches_per_s'] = round(len(emp_ids) / elapsed, 1)
+    result['failed'] = len(failed)
+    return result
+
+
+def roster_memory(conn):
+    # Memory and load time of the whole Employee table as fetchall() tuples and as a Roster,
+    # plus the time of a department group-by and a salary-band filter on each
+    sql = f'SELECT {",".join(roster.FIELDS)} FROM Employee ORDER BY emp_id'
+    dept, salary = roster.FIELDS.index('dept_id'), roster.FIELDS.index('salary')
+    result = {}
+    for model, load in (('tuples', lambda: conn.execute(sql).fetchall()), ('roster', lambda: roster.Roster.load(conn))):
+        tracemalloc.start()
+        rows = load()
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del rows
+
+        began = time.perf_counter()
+        rows = load()
+        loaded = time.perf_counter() - began
+        began = time.perf_counter()
+        if model == 'tuples':
+            groups = {}
+            for row in rows:
+                groups.setdefault(row[dept], []).append(row[salary])
+            totals = {key: (len(values), sum(values)) for key, values in groups.items()}
+            band = [row for row in rows if 50000 <= row[salary] <= 60000]
+        else:
+            totals = rows.group_by('dept_id')
+            band = rows.filter(salary=(50000, 60000))
+        reported = time.perf_counter() - began
+        result[model] = {'rows': len(rows), 'retained_mb': round(retained / 2 ** 20, 1), 'peak_mb': round(peak / 2 ** 20, 1),
+                         'load_s': round(loaded, 3), 'group_filter_s': round(reported, 3),
+                         'departments': len(totals), 'salary_band': len(band)}
+        del rows
+    return result
+
+
+def startup(path, script=False, runs=STARTUP_RUNS):
+    # Wall time from launching the portal against path (an emp.db) to its first menu prompt, as
+    # python -m ems, or as python ems.py when script is set. A script is compiled on every launch,
+    # while -m ems runs from the cached bytecode like every module it imports.
+    here = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, os.path.join(here, 'ems.py')] if script else [sys.executable, '-m', 'ems']
+    env = dict(os.environ, PYTHONPATH=here)
+    prompt = b'Enter your choice'
+    timings = []
+    # The first launch writes the bytecode cache and is not timed
+    for run in range(runs + 1):
+        began = time.perf_counter()
+        process = subprocess.Popen(command, cwd=os.path.dirname(path), env=env,
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        seen = b''
+        while prompt not in seen:
+            chunk = process.stdout.read1(4096)
+            if not chunk:
+                raise RuntimeError('ems.py exited before its first prompt')
+            seen += chunk
+        if run:
+            timings.append((time.perf_counter() - began) * 1000)
+        process.communicate(b'3\n')
+    return summarise(timings)
+
+
+def dataset(size, data_dir, days, seed):
+    # Builds the cached database for this size once and returns its path
+    path = os.path.join(data_dir, f'ems_{size}_{days}d_{seed}.db')
+    if os.path.exists(path):
+        return path, None
+    os.makedirs(data_dir, exist_ok=True)
+    building = path + '.tmp'
+    for leftover in (building, building + '-wal', building + '-shm'):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    db.DB_PATH = building
+    conn = db.get_conn()
+    migrations.migrate(conn)
+    counts = datagen.generate(conn, size, days=days, seed=seed,
+                              end=datetime.date.today() - datetime.timedelta(days=1))
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    db.close_all()
+    os.replace(building, path)
+    return path, counts
+
+
+def bench_size(size, data_dir, repeat, days, seed, burst, memory=True):
+    import ems
+
+    source, counts = dataset(size, data_dir, days, seed)
+    work = source.replace('.db', '.run.db')
+    shutil.copyfile(source, work)
+    db.DB_PATH = work
+    conn = db.get_conn()
+    rng = random.Random(seed)
+
+    emp_ids = rng.sample(range(1, size + 1), min(repeat, size))
+    marks = ','.join('?' * len(emp_ids))
+    people = conn.execute(f'''
+                        SELECT e.emp_id, e.user_id, u.username, e.name, e.job_title, e.date_of_joining, e.contact
+                            FROM Employee e JOIN User u ON u.user_id = e.user_id
+                            WHERE e.emp_id IN ({marks})
+                        ''', emp_ids).fetchall()
+    manager_user = conn.execute('SELECT user_id FROM Manager ORDER BY manager_id LIMIT 1').fetchone()[0]
+    department = conn.execute('SELECT dept_name FROM Department ORDER BY dept_id LIMIT 1').fetchone()[0]
+    manager = ems.Manager(manager_user)
+    staff = {emp_id: ems.Employee(user_id) for emp_id, user_id, *_ in people}
+
+    actions = {}
+    actions['login'] = timed([(ems.login, [username, datagen.PASSWORD]) for _, _, username, *_ in people])
+    actions['clock_in'] = timed([(staff[emp_id].clock_in, []) for emp_id, *_ in people])
+    actions['clock_out'] = timed([(staff[emp_id].clock_out, ['Y']) for emp_id, *_ in people])
+    actions['view_leave_status'] = timed([(staff[emp_id].view_leave_status, []) for emp_id, *_ in people])
+    actions['search_emp.id'] = timed([(manager.search_emp, ['1', str(emp_id), '8']) for emp_id, *_ in people])
+    actions['search_emp.name'] = timed([(manager.search_emp, ['2', name[:-1], '8']) for _, _, _, name, *_ in people])
+    actions['search_emp.department'] = timed([(manager.search_emp, ['3', department, '8'])] * len(people))
+    actions['search_emp.designation'] = timed([(manager.search_emp, ['4', title, '8']) for *_, title, _, _ in people])
+    actions['search_emp.joined'] = timed([(manager.search_emp, ['5', joined, '8']) for *_, joined, _ in people])
+    actions['search_emp.contact'] = timed([(manager.search_emp, ['6', str(contact), '8']) for *_, contact in people])
+    actions['manage_salary.view'] = timed([(manager.manage_salary, [str(emp_id), '1', '6']) for emp_id, *_ in people])
+    actions['manage_salary.history'] = timed([(manager.manage_salary, [str(emp_id), '5', '6']) for emp_id, *_ in people])
+    tomorrow = datetime.datetime.combine(datetime.date.today() + datetime.timedelta(days=1), datetime.time(9))
+    kiosks = rng.sample(range(1, size + 1), min(burst, size))
+    actions['clock_in.burst'] = punch_burst(kiosks, tomorrow, queued=False)
+    actions['clock_in.burst_queued'] = punch_burst(kiosks, tomorrow + datetime.timedelta(days=1), queued=True)
+
+    usage = roster_memory(conn) if memory else None
+
+    # ems.py opens emp.db in its working directory
+    launch_dir = work.replace('.run.db', '.launch')
+    os.makedirs(launch_dir, exist_ok=True)
+    shutil.copyfile(source, os.path.join(launch_dir, 'emp.db'))
+    actions['startup'] = startup(os.path.join(launch_dir, 'emp.db'))
+    actions['startup.script'] = startup(os.path.join(launch_dir, 'emp.db'), script=True)
+    shutil.rmtree(launch_dir)
+
+    rows = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+            for table in ('Employee', 'Attendance', 'Leave_Record', 'Payroll')}
+    db.close_all()
+    for leftover in (work, work + '-wal', work + '-shm'):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    result = {'rows': rows, 'actions': actions}
+    if usage:
+        result['memory'] = usage
+    if counts:
+        result['generate_seconds'] = round(counts['elapsed'], 3)
+    return result
+
+
+def compare(old, new):
+    # Prints the median of every action in both reports and the ratio new / old
+    print(f'{"size":>8}  {"action":<24} {"old ms":>10} {"new ms":>10} {"ratio":>7}')
+    for size, result in new['sizes'].items():
+        before = old['sizes'].get(size)
+        if not before:
+            continue
+        for action, timing in result['actions'].items():
+            if action not in before['actions']:
+                continue
+            was, now = before['actions'][action]['median_ms'], timing['median_ms']
+            ratio = f'{now / was:.2f}' if was else '-'
+            print(f'{size:>8}  {action:<24} {was:>10.3f} {now:>10.3f} {ratio:>7}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the EMS hot paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='employee counts')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='runs per action and size')
+    parser.add_argument('--days', type=int, default=HISTORY_DAYS, help='days of history per employee')
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--burst', type=int, default=BURST, help='kiosks punching in at the same moment')
+    parser.add_argument('--data', default='bench_data', help='directory for the generated databases')
+    parser.add_argument('--report', default='bench.json')
+    parser.add_argument('--compare', help='earlier report to compare the medians against')
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help='skip the roster against fetchall() memory comparison')
+    args = parser.parse_args(argv)
+
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'days': args.days,
+        'seed': args.seed,
+        'burst': args.burst,
+        'sizes': {},
+    }
+    for size in args.sizes:
+        print(f'benchmarking {size} employees ...')
+        result = report['sizes'][str(size)] = bench_size(size, args.data, args.repeat, args.days, args.seed,
+                                                         args.burst, args.memory)
+        for action, timing in result['actions'].items():
+            print(f'  {action:<24} median {timing["median_ms"]:>9.3f} ms   p95 {timing["p95_ms"]:>9.3f} ms')
+        if result['actions']['startup']['median_ms'] > STARTUP_BUDGET_MS:
+            print(f'  startup is over its {STARTUP_BUDGET_MS} ms budget'
+                  + (' (PYTHONDONTWRITEBYTECODE is set, so every launch compiles)' if sys.dont_write_bytecode else ''))
+        for model, usage in result.get('memory', {}).items():
+            print(f'  employees as {model:<11} {usage["retained_mb"]:>9.1f} MB   load {usage["load_s"]:.3f} s   '
+                  f'group+filter {usage["group_filter_s"]:.3f} s')
+
+    with open(args.report, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f'report written to {args.report}')
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            compare(json.load(file), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,503 @@
+#------------------------------------------- COMMAND LINE INTERFACE ----------------------------------------------#
+
+# Non-interactive access to the portal actions, for scripts, cron jobs and kiosks:
+#   python ems.py employee add --username ravi --password 'Passw0rd!' ... --manager 1
+#   python ems.py attendance clock-in --emp 42
+#   python ems.py leave approve --id 7
+#   python ems.py leave approve --department IT --type sick --max-days 2
+#   python ems.py payroll run --month 2025-06
+
+import argparse
+import sys
+import time
+
+import archive
+import attendance
+import db
+import departments
+import employees
+import export
+import importer
+import leave
+import migrations
+import payroll
+import profiler
+import querylog
+import roster
+import search
+import shards
+import snapshot
+
+
+class cliError(Exception):
+    pass
+
+
+def print_rows(columns, rows):
+    print('\t'.join(columns))
+    for row in rows:
+        print('\t'.join('' if value is None else str(value) for value in row))
+
+
+def department_id(conn, name):
+    if name is None:
+        return None
+    dept_id = departments.dept_id(conn, name.upper())
+    if dept_id is None:
+        raise cliError(f'Invalid Department Name {name!r}')
+    return dept_id
+
+
+def table_columns(conn, name):
+    # Sharded, emp.db still has the tables (empty), so their columns can be read there
+    return [column[0] for column in conn.execute(f'SELECT * FROM {name} LIMIT 0').description]
+
+
+#------------------------------------------- EMPLOYEE COMMANDS ----------------------------------------------#
+
+def employee_add(conn, args):
+    row = {'username': args.username, 'password': args.password, 'name': args.name,
+           'department': args.department, 'designation': args.designation,
+           'date_of_joining': args.joined, 'salary': args.salary, 'contact': args.contact, 'email': args.email}
+    emp_id = employees.add_employee(conn, row, args.manager)
+    print(f'Employee added with ID {emp_id}')
+
+
+def employee_import(conn, args):
+    result = importer.import_employees(conn, args.file, args.manager, report_path=args.report)
+    for line_no, field, message in result['errors']:
+        print(f'line {line_no}\t{field}\t{message}', file=sys.stderr)
+    print(f'imported {result["imported"]}, rejected {result["failed"]} in {result["elapsed"]:.3f} s')
+    return 1 if result['failed'] else 0
+
+
+def employee_list(conn, args):
+    print('\t'.join(search.EMPLOYEE_COLUMNS.split(',')))
+    remaining = args.limit
+    after = None
+    while remaining is None or remaining > 0:
+        size = search.PAGE_SIZE * 50 if remaining is None else min(remaining, search.PAGE_SIZE * 50)
+        rows = search.employee_page(conn, sort=args.sort, after=after, page_size=size)
+        if not rows:
+            break
+        for row in rows:
+            print('\t'.join('' if value is None else str(value) for value in row))
+        after = search.page_key(rows[-1], args.sort)
+        if remaining is not None:
+            remaining -= len(rows)
+
+
+def employee_search(conn, args):
+    if args.fuzzy:
+        rows = search.fuzzy_name_search(conn, args.fuzzy, limit=args.limit)
+    else:
+        rows = search.search_employees(conn, emp_id=args.id, name=args.name and args.name.upper(),
+                                       dept_id=department_id(conn, args.department),
+                                       title=args.designation and args.designation.upper(),
+                                       joined=args.joined, joined_after=args.joined_after,
+                                       joined_before=args.joined_before, contact=args.contact, limit=args.limit)
+    print_rows(search.EMPLOYEE_COLUMNS.split(','), rows)
+
+
+def employee_report(conn, args):
+    employees = roster.Roster.load(conn, department_id(conn, args.department))
+    if args.min_salary is not None or args.max_salary is not None:
+        employees = employees.filter(salary=(args.min_salary, args.max_salary))
+    names = {dept_id: name for name, dept_id in departments.name_to_id(conn).items()} if args.by == 'department' else None
+    print_rows([args.by, 'employees', 'total_salary', 'average', 'lowest', 'highest'],
+               roster.salary_report(employees, args.by, names))
+
+
+def employee_update(conn, args):
+    employees.update_employee(conn, args.emp, name=args.name, department=args.department,
+                              designation=args.designation, date_of_joining=args.joined,
+                              salary=args.salary, contact=args.contact, email=args.email)
+    print(f'Employee {args.emp} updated')
+
+
+def employee_delete(conn, args):
+    employees.delete_employee(conn, args.emp)
+    print(f'Employee {args.emp} deleted')
+
+
+#------------------------------------------- ATTENDANCE COMMANDS ----------------------------------------------#
+
+def attendance_clock_in(conn, args):
+    punch = attendance.punch_in(shards.route(conn, args.emp), args.emp)
+    print(f'{args.emp}\tPUNCH-IN\t{punch["date"]}\t{punch["time"]}')
+
+
+def attendance_clock_out(conn, args):
+    punch = attendance.punch_out(shards.route(conn, args.emp), args.emp, confirm=lambda status: args.yes)
+    if punch is None:
+        raise cliError('Punch out aborted: the day would be marked ABSENT or HALF DAY. Pass --yes to confirm.')
+    print(f'{args.emp}\tPUNCH-OUT\t{punch["date"]}\t{punch["time"]}\t{punch["status"]}')
+
+
+def attendance_today(conn, args):
+    rows = shards.query(conn, 'SELECT * FROM Attendance WHERE date = date(\'now\', \'localtime\') ORDER BY emp_id', key=1)
+    print_rows(table_columns(conn, 'Attendance'), rows)
+
+
+def attendance_history(conn, args):
+    conn = shards.route(conn, args.emp)
+    cursor = conn.execute(f'''
+                        SELECT date,clock_in,clock_out,working_hours,overtime_hours,status
+                            FROM {archive.attendance_source(conn, args.start)}
+                            WHERE emp_id = ? AND date >= ? ORDER BY date
+                        ''', (args.emp, args.start or ''))
+    print_rows([column[0] for column in cursor.description], cursor)
+
+
+def attendance_summary(conn, args):
+    check_month(args.month)
+    month = args.month or payroll.period_of()
+    if args.by == 'department':
+        columns = ['department', 'employees']
+        rows = shards.gather(shards.scatter(conn, attendance.department_summary, month), key=lambda row: row[0])
+    else:
+        columns = ['emp_id', 'name']
+        rows = shards.gather(shards.by_department(conn, attendance.monthly_summary, month, emp_id=args.emp,
+                                                  dept_id=department_id(conn, args.department)), key=lambda row: row[0])
+    print_rows(columns + ['days', 'present', 'half_days', 'absent', 'working_hours', 'overtime_hours'], rows)
+
+
+def attendance_rebuild(conn, args):
+    check_month(args.month)
+    began = time.perf_counter()
+    rows = sum(result[0] for _, result in shards.scatter(conn, attendance.rebuild_summary, args.month))
+    elapsed = time.perf_counter() - began
+    print(f'monthly summary rebuilt : {rows} row(s) in {elapsed:.3f} s')
+
+
+#------------------------------------------- LEAVE COMMANDS ----------------------------------------------#
+
+def leave_apply(conn, args):
+    leave_type = args.type.upper() + ' LEAVE'
+    result = leave.apply_leave(shards.route(conn, args.emp), args.emp, leave_type, args.start, args.end, allow_paid=args.allow_paid)
+    print(f'Leave request {result["leave_id"]} filed : {result["leave_type"]}, {result["leave_days"]} day(s), '
+          f'{result["paid_leave"]} paid, {result["status"]}')
+
+
+def leave_list(conn, args):
+    clauses = []
+    params = []
+    if args.status:
+        clauses.append('status = ?')
+        params.append(args.status.upper())
+    if args.emp is not None:
+        clauses.append('emp_id = ?')
+        params.append(args.emp)
+    sql = 'SELECT * FROM Leave_Record'
+    if clauses:
+        sql += ' WHERE ' + ' AND '.join(clauses)
+    print_rows(table_columns(conn, 'Leave_Record'), shards.query(conn, sql + ' ORDER BY leave_id', params))
+
+
+SUMMARY_COLUMNS = ['emp_id', 'name', 'entitlement', 'balance', 'requests', 'pending', 'pending_days',
+                   'approved', 'approved_days', 'rejected', 'rejected_days']
+
+
+def leave_summary(conn, args):
+    if args.emp is not None:
+        summaries = [dict(emp_id=args.emp, name=None, **leave.leave_summary(shards.route(conn, args.emp), args.emp))]
+    else:
+        if args.manager is None and args.department is None:
+            raise cliError('Pass --emp, --manager or --department')
+        summaries = shards.gather(shards.by_department(conn, leave.team_leave_summary, manager_id=args.manager,
+                                                       dept_id=department_id(conn, args.department)),
+                                  key=lambda summary: summary['emp_id'])
+    print_rows(SUMMARY_COLUMNS, ([summary[column] for column in SUMMARY_COLUMNS] for summary in summaries))
+
+
+def decide(conn, args, status):
+    filters = {'emp_id': args.emp, 'dept_id': department_id(conn, args.department), 'manager_id': args.manager,
+               'leave_type': args.type and args.type.upper() + ' LEAVE', 'start': args.start, 'end': args.end,
+               'max_days': args.max_days}
+    if args.id is not None:
+        if any(value is not None for value in filters.values()) or args.all:
+            raise cliError('--id cannot be combined with filters')
+        leave.decide_leave(shards.locate(conn, 'Leave_Record', 'leave_id', args.id), args.id, status)
+        print(f'Leave request {args.id} {status.lower()}')
+        return
+    if not args.all and all(value is None for value in filters.values()):
+        raise cliError('Pass --id, a filter, or --all for every pending request')
+    count = shards.total(shards.by_department(conn, leave.decide_by_filter, status, **filters))
+    print(f'{count} leave request(s) {status.lower()}')
+
+
+def leave_approve(conn, args):
+    decide(conn, args, 'APPROVED')
+
+
+def leave_reject(conn, args):
+    decide(conn, args, 'REJECTED')
+
+
+def leave_rules(conn, args):
+    print_rows(['rule_id', 'leave_type', 'department', 'max_days', 'min_balance', 'created_at'], leave.list_rules(conn))
+
+
+def leave_rule_add(conn, args):
+    leave_type = args.type and args.type.upper() + ' LEAVE'
+    rule_id = leave.add_rule(conn, args.max_days, leave_type, department_id(conn, args.department), args.min_balance)
+    print(f'Auto-approval rule {rule_id} added')
+
+
+def leave_rule_remove(conn, args):
+    leave.remove_rule(conn, args.id)
+    print(f'Auto-approval rule {args.id} removed')
+
+
+#------------------------------------------- PAYROLL / EXPORT / DB COMMANDS ----------------------------------------------#
+
+def check_month(month):
+    try:
+        payroll.pay_period(month)
+    except ValueError:
+        raise cliError('Invalid month format !!! Use YYYY-MM')
+
+
+def payroll_run(conn, args):
+    check_month(args.month)
+    began = time.perf_counter()
+    results = shards.by_department(conn, payroll.run_payroll, month=args.month, dept_id=department_id(conn, args.department))
+    processed = sum(result[0] for _, result in results)
+    elapsed = time.perf_counter() - began
+    print(f'payroll processed for {processed} employee(s) in {elapsed:.3f} s')
+
+
+def payroll_overtime(conn, args):
+    check_month(args.month)
+    rows = shards.gather(shards.by_department(conn, payroll.apply_overtime, month=args.month, emp_id=args.emp,
+                                              dept_id=department_id(conn, args.department)), key=lambda row: row[0])
+    if args.emp is not None and not rows:
+        raise cliError(f'No payroll record for employee {args.emp}')
+    print_rows(['emp_id', 'overtime_hours', 'overtime_pay'], rows)
+
+
+def payroll_show(conn, args):
+    check_month(args.month)
+    record = payroll.salary_record(shards.route(conn, args.emp), args.emp, args.month)
+    if record is None:
+        raise cliError(f'No payroll record for employee {args.emp}')
+    print_rows(['payroll_id','emp_id','basic_pay','allowance','deduction','overtime_pay','net_pay','pay_date'], [record])
+
+
+def export_data(conn, args):
+    count, elapsed = export.export(conn, args.name, args.path, start=args.date_from, end=args.date_to,
+                                   dept_id=department_id(conn, args.department))
+    print(f'{count} rows exported to {args.path} in {elapsed:.3f} s')
+
+
+def db_migrate(conn, args):
+    applied = migrations.migrate(conn)
+    print(f'schema version {migrations.schema_version(conn)}' + (f', applied {applied}' if applied else ''))
+
+
+def db_stats(conn, args):
+    for key, value in db.connection_stats().items():
+        print(f'{key}\t{value}')
+    for key, value in departments.cache_stats().items():
+        print(f'department_cache_{key}\t{value}')
+
+
+def db_archive(conn, args):
+    moved, elapsed = archive.archive_year(conn, args.year, vacuum=args.vacuum)
+    print(f'{moved} attendance row(s) of {args.year} archived to {archive.archive_path(conn, args.year)} in {elapsed:.3f} s')
+
+
+def db_archives(conn, args):
+    print_rows(['year', 'path', 'rows', 'archived_at'], archive.list_archives(conn))
+
+
+def db_shard(conn, args):
+    moved, elapsed = shards.split(conn, vacuum=args.vacuum)
+    print(f'{moved} row(s) moved into {len(shards.shard_ids(conn))} department shard(s) in {elapsed:.3f} s')
+
+
+def db_shards(conn, args):
+    print_rows(['dept_id', 'department', 'path', 'created_at'], shards.list_shards(conn))
+
+
+def db_snapshot(conn, args):
+    taken, elapsed = snapshot.refresh()
+    print(f'snapshot {snapshot.snapshot_path()} as of {taken} in {elapsed:.3f} s')
+
+
+#------------------------------------------- ARGUMENT PARSER ----------------------------------------------#
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='ems', description='Employee Management System')
+    parser.add_argument('--db', help=f'database file (default {db.DB_PATH})')
+    parser.add_argument('--query-log', help='append per-statement timings and slow queries to this file')
+    parser.add_argument('--slow-ms', type=float, default=querylog.SLOW_MS, help='slow query threshold')
+    parser.add_argument('--explain', action='store_true', help='log the query plan of slow statements')
+    parser.add_argument('--profile', metavar='DIR', help='write the timing and stacks of the command to this directory')
+    parser.add_argument('--profile-mode', choices=profiler.MODES, default='sample')
+    parser.add_argument('--live', action='store_true', help='run reports against the live database, not the snapshot')
+    groups = parser.add_subparsers(dest='group', required=True)
+
+    def command(group, name, handler, help, report=False):
+        # report commands read the reporting snapshot unless --live is given
+        sub = group.add_parser(name, help=help)
+        sub.set_defaults(handler=handler, report=report)
+        return sub
+
+    employee = groups.add_parser('employee', help='employee records').add_subparsers(dest='command', required=True)
+    sub = command(employee, 'add', employee_add, 'add one employee')
+    for option in ('username', 'password', 'name', 'department', 'designation', 'joined', 'salary', 'contact', 'email'):
+        sub.add_argument(f'--{option}', required=True)
+    sub.add_argument('--manager', type=int, required=True, help='manager_id the employee reports to')
+    sub = command(employee, 'import', employee_import, 'bulk import from CSV or JSONL')
+    sub.add_argument('file')
+    sub.add_argument('--manager', type=int, required=True, help='default manager_id for rows without one')
+    sub.add_argument('--report', help='write the per-row error report to this CSV file')
+    sub = command(employee, 'list', employee_list, 'list employees')
+    sub.add_argument('--sort', choices=list(search.SORT_KEYS), default='id')
+    sub.add_argument('--limit', type=int)
+    sub = command(employee, 'search', employee_search, 'search employees')
+    sub.add_argument('--id', type=int)
+    sub.add_argument('--name', help='name prefix')
+    sub.add_argument('--fuzzy', help='typo tolerant name search')
+    sub.add_argument('--department')
+    sub.add_argument('--designation', help='designation prefix')
+    sub.add_argument('--joined')
+    sub.add_argument('--joined-after')
+    sub.add_argument('--joined-before')
+    sub.add_argument('--contact')
+    sub.add_argument('--limit', type=int, default=search.SEARCH_LIMIT)
+    sub = command(employee, 'report', employee_report, 'headcount and salary totals per group', report=True)
+    sub.add_argument('--by', choices=sorted(roster.GROUPINGS), default='department')
+    sub.add_argument('--department')
+    sub.add_argument('--min-salary', type=float)
+    sub.add_argument('--max-salary', type=float)
+    sub = command(employee, 'update', employee_update, 'update employee details')
+    sub.add_argument('--emp', type=int, required=True)
+    for option in ('name', 'department', 'designation', 'joined', 'salary', 'contact', 'email'):
+        sub.add_argument(f'--{option}')
+    sub = command(employee, 'delete', employee_delete, 'delete an employee')
+    sub.add_argument('--emp', type=int, required=True)
+
+    punches = groups.add_parser('attendance', help='attendance').add_subparsers(dest='command', required=True)
+    sub = command(punches, 'clock-in', attendance_clock_in, 'punch in')
+    sub.add_argument('--emp', type=int, required=True)
+    sub = command(punches, 'clock-out', attendance_clock_out, 'punch out')
+    sub.add_argument('--emp', type=int, required=True)
+    sub.add_argument('--yes', action='store_true', help='accept an ABSENT or HALF DAY punch out')
+    command(punches, 'today', attendance_today, "today's attendance log")
+    sub = command(punches, 'history', attendance_history, 'attendance history of one employee', report=True)
+    sub.add_argument('--emp', type=int, required=True)
+    sub.add_argument('--start', help='from YYYY-MM-DD, default the whole history')
+
+    sub = command(punches, 'summary', attendance_summary, 'monthly totals per employee or department', report=True)
+    sub.add_argument('--month', help='YYYY-MM, default current month')
+    sub.add_argument('--by', choices=['employee', 'department'], default='employee')
+    sub.add_argument('--department')
+    sub.add_argument('--emp', type=int)
+    sub = command(punches, 'rebuild-summary', attendance_rebuild, 'regenerate the monthly summary from the raw rows')
+    sub.add_argument('--month', help='YYYY-MM, default every month')
+
+    leaves = groups.add_parser('leave', help='leave requests').add_subparsers(dest='command', required=True)
+    sub = command(leaves, 'apply', leave_apply, 'file a leave request')
+    sub.add_argument('--emp', type=int, required=True)
+    sub.add_argument('--type', choices=['casual', 'sick', 'earned', 'paid'], required=True)
+    sub.add_argument('--start', required=True)
+    sub.add_argument('--end', required=True)
+    sub.add_argument('--allow-paid', action='store_true', help='process days beyond the balance as paid leave')
+    sub = command(leaves, 'list', leave_list, 'list leave requests', report=True)
+    sub.add_argument('--status', choices=['pending', 'approved', 'rejected'])
+    sub.add_argument('--emp', type=int)
+    sub = command(leaves, 'summary', leave_summary, 'leave balance and request totals', report=True)
+    sub.add_argument('--emp', type=int)
+    sub.add_argument('--manager', type=int, help='every employee reporting to this manager id')
+    sub.add_argument('--department')
+    for name, func, verb in (('approve', leave_approve, 'approve'), ('reject', leave_reject, 'reject')):
+        sub = command(leaves, name, func, f'{verb} one pending request, or every one matching the filters')
+        sub.add_argument('--id', type=int)
+        sub.add_argument('--emp', type=int)
+        sub.add_argument('--department')
+        sub.add_argument('--manager', type=int, help='employees reporting to this manager id')
+        sub.add_argument('--type', choices=['casual', 'sick', 'earned', 'paid'])
+        sub.add_argument('--start', help='leave starting on or after YYYY-MM-DD')
+        sub.add_argument('--end', help='leave ending on or before YYYY-MM-DD')
+        sub.add_argument('--max-days', type=int, help='leave of at most this many days')
+        sub.add_argument('--all', action='store_true', help='every pending request')
+    command(leaves, 'rules', leave_rules, 'list the auto-approval rules')
+    sub = command(leaves, 'rule-add', leave_rule_add, 'approve matching requests as they are filed')
+    sub.add_argument('--max-days', type=int, required=True)
+    sub.add_argument('--type', choices=['casual', 'sick', 'earned'])
+    sub.add_argument('--department')
+    sub.add_argument('--min-balance', type=int, default=0, help='balance the request must leave')
+    sub = command(leaves, 'rule-remove', leave_rule_remove, 'remove an auto-approval rule')
+    sub.add_argument('--id', type=int, required=True)
+
+    pay = groups.add_parser('payroll', help='payroll').add_subparsers(dest='command', required=True)
+    sub = command(pay, 'run', payroll_run, 'run payroll for a month')
+    sub.add_argument('--month', help='YYYY-MM, default current month')
+    sub.add_argument('--department')
+    sub = command(pay, 'overtime', payroll_overtime, "set overtime pay from the period's overtime hours")
+    sub.add_argument('--month', help='YYYY-MM, default current month')
+    sub.add_argument('--department')
+    sub.add_argument('--emp', type=int)
+    sub = command(pay, 'show', payroll_show, 'salary details of one employee')
+    sub.add_argument('--emp', type=int, required=True)
+    sub.add_argument('--month', help='YYYY-MM, default current month')
+
+    sub = command(groups, 'export', export_data, 'export data to CSV / JSONL', report=True)
+    sub.add_argument('name', choices=list(export.EXPORTS))
+    sub.add_argument('path', help='output file; .jsonl for JSON lines, add .gz to compress')
+    sub.add_argument('--from', dest='date_from')
+    sub.add_argument('--to', dest='date_to')
+    sub.add_argument('--department')
+
+    database = groups.add_parser('db', help='database maintenance').add_subparsers(dest='command', required=True)
+    command(database, 'migrate', db_migrate, 'apply pending schema migrations')
+    command(database, 'stats', db_stats, 'connection pool counters')
+    sub = command(database, 'archive', db_archive, 'move a closed year of attendance into its own file')
+    sub.add_argument('--year', type=int, required=True)
+    sub.add_argument('--vacuum', action='store_true', help='shrink the live database file afterwards')
+    command(database, 'archives', db_archives, 'list the attendance archives')
+    command(database, 'snapshot', db_snapshot, 'refresh the reporting snapshot')
+    sub = command(database, 'shard', db_shard, "move each department's attendance, leave and payroll into its own file")
+    sub.add_argument('--vacuum', action='store_true', help='shrink the live database file afterwards')
+    command(database, 'shards', db_shards, 'list the department shards')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        db.DB_PATH = args.db
+    if args.query_log:
+        querylog.enable(args.query_log, args.slow_ms, args.explain)
+    else:
+        querylog.enable_from_env()
+    if args.profile:
+        profiler.enable(args.profile, args.profile_mode)
+    else:
+        profiler.enable_from_env()
+    conn = db.get_conn()
+    try:
+        migrations.migrate(conn)
+        if args.report and not args.live:
+            conn = snapshot.report_conn()
+            taken = snapshot.as_of(conn)
+            if taken:
+                # stderr, so the rows on stdout stay plain TSV
+                print(f'as of {taken}', file=sys.stderr)
+        name = ['cli', args.group] + ([args.command] if 'command' in args else [])
+        return profiler.run(args.handler, conn, args, name='.'.join(name)) or 0
+    except (cliError, archive.archiveError, attendance.punchError, leave.leaveError, employees.employeeError,
+            importer.importError, migrations.migrationError, shards.shardError) as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 1
+    finally:
+        snapshot.close()
+        shards.close_all()
+        db.close_all()
+        querylog.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+#------------------------------------------- SYNTHETIC DATA GENERATOR ----------------------------------------------#
+
+# Fills an empty database with departments, managers, employees and their attendance,
+# leave and payroll history. The same seed and end date always give the same data.
+#   python datagen.py --db bench.db --employees 100000 --days 60
+
+import argparse
+import datetime
+import random
+import time
+
+import attendance
+import db
+import departments as department_cache
+import importer
+import migrations
+
+PASSWORD = 'Passw0rd!'
+BATCH_SIZE = 10000
+
+DEPARTMENTS = ['HR','IT','SALES','FINANCE','MARKETING','OPERATIONS','ADMINISTRATION','SUPPORT','LEGAL','RESEARCH']
+REGIONS = ['NORTH','SOUTH','EAST','WEST','CENTRAL']
+FIRST_NAMES = ['ARJUN','PRIYA','RAHUL','ANANYA','VIKRAM','SNEHA','KARTHIK','DIVYA','ARUN','MEERA',
+               'SURESH','KAVYA','RAJESH','LAKSHMI','NIKHIL','POOJA','SANJAY','DEEPA','MANOJ','ANJALI',
+               'GANESH','SAJMIYA','VARUN','NISHA','HARI','REKHA','VIJAY','SWATHI','ASHOK','BHAVANA']
+LAST_NAMES = ['KUMAR','SHARMA','NAIR','REDDY','IYER','MENON','PILLAI','RAO','GUPTA','SINGH',
+              'PATEL','JOSHI','DAS','BOSE','VERMA','S','K','R','M','P']
+TITLES = ['DEVELOPER','TESTER','ANALYST','CLERK','ACCOUNTANT','EXECUTIVE','ENGINEER','CONSULTANT','ASSOCIATE','SPECIALIST']
+LEAVE_TYPES = ['CASUAL LEAVE','SICK LEAVE','EARNED LEAVE']
+
+
+def department_names(count):
+    names = list(DEPARTMENTS)
+    for region in REGIONS:
+        names.extend(f'{name} {region}' for name in DEPARTMENTS)
+    if count > len(names):
+        raise ValueError(f'at most {len(names)} departments are supported')
+    return names[:count]
+
+
+def working_days(start, end):
+    # Monday to Saturday, matching the 25 working days a month the pay rules assume
+    day = start
+    while day <= end:
+        if day.weekday() != 6:
+            yield day
+        day += datetime.timedelta(days=1)
+
+
+def _attendance_rows(rng, emp_ids, days):
+    # random() instead of randrange() keeps this loop, which runs once per row, cheap
+    clock = [f'{minute // 60:02d}:{minute % 60:02d}' for minute in range(1440)]
+    dates = [str(day) for day in days]
+    random = rng.random
+    for emp_id in emp_ids:
+        for date in dates:
+            roll = random()
+            if roll < 0.04:
+                continue
+            start = 510 + int(random() * 90)
+            if roll < 0.07:
+                minutes = 60 + int(random() * 180)
+            elif roll < 0.12:
+                minutes = 240 + int(random() * 121)
+            elif roll < 0.85:
+                minutes = 361 + int(random() * 120)
+            else:
+                minutes = 481 + int(random() * 179)
+            hours = minutes / 60
+            status, overtime = attendance.day_status(hours)
+            yield (emp_id, date, clock[start], clock[start + minutes], hours, overtime, status)
+
+
+def _leave_rows(rng, emp_ids, start, end, today, taken):
+    span = (end - start).days + 1
+    for emp_id in emp_ids:
+        for _ in range(max(1, span * 4 // 365) if rng.random() < 0.6 else 0):
+            first = start + datetime.timedelta(days=rng.randrange(span))
+            days = rng.choice((1, 1, 1, 2, 2, 3, 5))
+            status = 'APPROVED' if rng.random() < 0.8 else 'REJECTED'
+            if status == 'APPROVED':
+                taken[emp_id] = taken.get(emp_id, 0) + days
+            yield (emp_id, rng.choice(LEAVE_TYPES), str(first), str(first + datetime.timedelta(days=days - 1)), days, status)
+        if rng.random() < 0.05:
+            first = today + datetime.timedelta(days=rng.randrange(1, 30))
+            days = rng.choice((1, 2, 3))
+            yield (emp_id, rng.choice(LEAVE_TYPES), str(first), str(first + datetime.timedelta(days=days - 1)), days, 'PENDING')
+
+
+def _payroll_rows(emp_ids, salaries, start, end):
+    months = []
+    month = start.replace(day=1)
+    while month <= end.replace(day=1):
+        following = (month + datetime.timedelta(days=32)).replace(day=1)
+        months.append(str(following - datetime.timedelta(days=1)))
+        month = following
+    for emp_id in emp_ids:
+        salary = salaries[emp_id]
+        allowance = salary * 0.1
+        for pay_date in months:
+            yield (emp_id, salary, allowance, 0, 0, salary + allowance, pay_date)
+
+
+def generate(conn, employees, departments=10, managers=None, days=30, seed=42, end=None, batch_size=BATCH_SIZE):
+    # Returns the number of rows written per table; the database must not have employees yet
+    if conn.execute('SELECT 1 FROM Employee LIMIT 1').fetchone():
+        raise ValueError('the database already has employees; generate into an empty database')
+    rng = random.Random(seed)
+    end = end or datetime.date.today() - datetime.timedelta(days=1)
+    start = end - datetime.timedelta(days=days - 1)
+    today = end + datetime.timedelta(days=1)
+    history = list(working_days(start, end))
+    managers = managers or departments
+    counts = {}
+    began = time.perf_counter()
+
+    conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    with db.transaction(conn):
+        names = department_names(departments)
+        conn.executemany('INSERT OR IGNORE INTO Department(dept_name) VALUES (?)', [(name,) for name in names])
+        dept_ids = [row[0] for row in conn.execute('SELECT dept_id FROM Department ORDER BY dept_id')][:departments]
+        counts['Department'] = len(dept_ids)
+
+        user_id = importer._next_id(conn, 'User', 'user_id')
+        manager_id = importer._next_id(conn, 'Manager', 'manager_id')
+        manager_ids = {}
+        for n in range(managers):
+            dept_id = dept_ids[n % len(dept_ids)]
+            conn.execute('INSERT INTO User(user_id,username,password,role_id) VALUES (?,?,?,1)',
+                         (user_id + n, f'mgr{n + 1:05d}', PASSWORD))
+            conn.execute('''
+                        INSERT INTO Manager(manager_id,user_id,dept_id,name,contact,email)
+                            VALUES (?,?,?,?,?,?)
+                        ''', (manager_id + n, user_id + n, dept_id, f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                              str(8000000000 + n), f'mgr{n + 1:05d}@example.com'))
+            manager_ids.setdefault(dept_id, []).append(manager_id + n)
+        counts['Manager'] = managers
+
+        emp_ids = []
+        salaries = {}
+        for first in range(0, employees, batch_size):
+            records = []
+            for n in range(first, min(first + batch_size, employees)):
+                dept_id = rng.choice(dept_ids)
+                joined = start - datetime.timedelta(days=rng.randrange(0, 3650))
+                salary = rng.randrange(15000, 150001, 500)
+                records.append((f'user{n + 1:07d}', PASSWORD, f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                                dept_id, rng.choice(TITLES), str(joined), salary, str(9000000000 + n),
+                                f'user{n + 1:07d}@example.com', rng.choice(manager_ids.get(dept_id) or [manager_id])))
+            for emp_id, record in zip(importer.insert_records(conn, records), records):
+                emp_ids.append(emp_id)
+                salaries[emp_id] = record[6]
+        counts['Employee'] = employees
+
+        cursor = conn.executemany('''
+                    INSERT INTO Attendance(emp_id,date,clock_in,clock_out,working_hours,overtime_hours,status)
+                        VALUES (?,?,?,?,?,?,?)
+                    ''', _attendance_rows(rng, emp_ids, history))
+        counts['Attendance'] = cursor.rowcount
+
+        taken = {}
+        cursor = conn.executemany('''
+                    INSERT INTO Leave_Record(emp_id,leave_type,start_date,end_date,leave_duration,status)
+                        VALUES (?,?,?,?,?,?)
+                    ''', _leave_rows(rng, emp_ids, start, end, today, taken))
+        counts['Leave_Record'] = cursor.rowcount
+        conn.executemany('UPDATE Leave_Balance SET total_leave = max(0, total_leave - ?) WHERE emp_id = ?',
+                         [(days, emp_id) for emp_id, days in taken.items()])
+
+        cursor = conn.executemany('''
+                    INSERT INTO Payroll(emp_id,basic_pay,allowance,deduction,overtime_pay,net_pay,pay_date)
+                        VALUES (?,?,?,?,?,?,?)
+                    ''', _payroll_rows(emp_ids, salaries, start, end))
+        counts['Payroll'] = cursor.rowcount + employees
+
+    attendance.rebuild_summary(conn)
+    department_cache.refresh()
+    conn.execute('ANALYZE')
+    counts['elapsed'] = time.perf_counter() - began
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fill an empty EMS database with synthetic data')
+    parser.add_argument('--db', default=db.DB_PATH)
+    parser.add_argument('--employees', type=int, default=1000)
+    parser.add_argument('--departments', type=int, default=10)
+    parser.add_argument('--managers', type=int, help='default one per department')
+    parser.add_argument('--days', type=int, default=30, help='days of attendance, leave and payroll history')
+    parser.add_argument('--end', help='last day of history (YYYY-MM-DD), default yesterday')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    db.DB_PATH = args.db
+    conn = db.get_conn()
+    migrations.migrate(conn)
+    end = datetime.datetime.strptime(args.end, '%Y-%m-%d').date() if args.end else None
+    counts = generate(conn, args.employees, args.departments, args.managers, args.days, args.seed, end)
+    db.close_all()
+    for table, count in counts.items():
+        print(f'{table}\t{count:.3f}' if table == 'elapsed' else f'{table}\t{count}')
+
+
+if __name__ == '__main__':
+    main()
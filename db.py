@@ -0,0 +1,84 @@
+#------------------------------------------- DATABASE CONNECTIONS ----------------------------------------------#
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DB_PATH = 'emp.db'
+
+# One connection per thread, reused by every Manager / Employee method.
+_local = threading.local()
+_lock = threading.Lock()
+_pool = {}
+_stats = {'opened': 0, 'reused': 0}
+
+
+class Connection(sqlite3.Connection):
+    # Unlike sqlite3.Connection, a subclass can be weakly referenced, so per-connection
+    # cache state (see departments.py) goes away with the connection
+    pass
+
+
+# Class of the connections connect() opens; querylog.enable() swaps in a traced subclass
+CONNECTION_CLASS = Connection
+
+
+def connect(path=None):
+    conn = sqlite3.connect(path or DB_PATH, timeout=10, check_same_thread=False, factory=CONNECTION_CLASS)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    return conn
+
+
+def get_conn():
+    key = threading.get_ident()
+    with _lock:
+        conn = _pool.get(key)
+        if conn is not None:
+            _stats['reused'] += 1
+            return conn
+        conn = _pool[key] = connect()
+        _stats['opened'] += 1
+    return conn
+
+
+@contextmanager
+def transaction(conn=None):
+    conn = conn or get_conn()
+    # Nested blocks on the same connection join the outermost one, which alone commits.
+    if not hasattr(_local, 'active'):
+        _local.active = set()
+    outermost = id(conn) not in _local.active
+    _local.active.add(id(conn))
+    try:
+        yield conn
+    except BaseException:
+        if outermost:
+            conn.rollback()
+        raise
+    else:
+        if outermost:
+            conn.commit()
+    finally:
+        if outermost:
+            _local.active.discard(id(conn))
+
+
+def close_conn():
+    with _lock:
+        conn = _pool.pop(threading.get_ident(), None)
+    if conn is not None:
+        conn.close()
+
+
+def close_all():
+    with _lock:
+        conns = list(_pool.values())
+        _pool.clear()
+    for conn in conns:
+        conn.close()
+
+
+def connection_stats():
+    with _lock:
+        return {'open': len(_pool), 'opened': _stats['opened'], 'reused': _stats['reused']}
@@ -0,0 +1,85 @@
+#------------------------------------------- DEPARTMENT CACHE ----------------------------------------------#
+
+# Department names and ids hardly ever change, so they are read once and kept in memory.
+# At most once every RECHECK_AFTER seconds a lookup asks its connection for PRAGMA data_version,
+# which moves whenever another connection commits to the database; only then is the table read
+# again. Writes made on the same connection do not move it, so code that changes Department
+# calls refresh() afterwards. On a shard connection Department is in emp.db, attached as org
+# (see shards.py), so the version and the cache entry are those of org rather than the shard file.
+
+import threading
+import time
+import weakref
+
+import db
+
+# Seconds a connection trusts the cache before asking PRAGMA data_version again
+RECHECK_AFTER = 1.0
+
+_lock = threading.Lock()
+_tables = {}
+_seen = weakref.WeakKeyDictionary()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _last_seen(conn):
+    try:
+        return _seen.get(conn)
+    except TypeError:
+        # A plain sqlite3.Connection cannot be tracked and reads the table every time
+        return None
+
+
+def _home(conn):
+    # (file, schema) of the database holding Department : org on a shard connection, else main
+    databases = {name: path for _, name, path in conn.execute('PRAGMA database_list')}
+    schema = 'org' if 'org' in databases else 'main'
+    # In-memory databases have no file name and are never shared between connections
+    return databases[schema] or id(conn), schema
+
+
+def _table(conn):
+    # Returns the cached {name: id} and {id: name} maps for the database behind conn
+    now = time.monotonic()
+    with _lock:
+        seen = _last_seen(conn)
+        if seen is not None and seen[0] in _tables and now - seen[3] < RECHECK_AFTER:
+            _stats['hits'] += 1
+            return _tables[seen[0]]
+    path, schema = seen[:2] if seen is not None else _home(conn)
+    version = conn.execute(f'PRAGMA {schema}.data_version').fetchone()[0]
+    with _lock:
+        if seen is not None and path in _tables and seen[2] == version:
+            _seen[conn] = (path, schema, version, now)
+            _stats['hits'] += 1
+            return _tables[path]
+        _stats['misses'] += 1
+    ids = dict(conn.execute(f'SELECT dept_name, dept_id FROM {schema}.Department'))
+    table = ids, {dept_id: name for name, dept_id in ids.items()}
+    with _lock:
+        _tables[path] = table
+        if isinstance(conn, db.Connection):
+            _seen[conn] = (path, schema, version, now)
+    return table
+
+
+def dept_id(conn, name):
+    return _table(conn)[0].get(name)
+
+
+def dept_name(conn, dept_id):
+    return _table(conn)[1].get(dept_id)
+
+
+def name_to_id(conn):
+    return dict(_table(conn)[0])
+
+
+def refresh():
+    with _lock:
+        _tables.clear()
+
+
+def cache_stats():
+    with _lock:
+        return {'hits': _stats['hits'], 'misses': _stats['misses'], 'databases': len(_tables)}
@@ -0,0 +1,91 @@
+#------------------------------------------- EMPLOYEE RECORDS ----------------------------------------------#
+
+import datetime
+import re
+
+import db
+import departments as department_cache
+import importer
+import shards
+
+
+class employeeError(Exception):
+    pass
+
+
+def add_employee(conn, row, manager_id):
+    # row uses the importer's field names; returns the new emp_id
+    departments = department_cache.name_to_id(conn)
+    managers = {r[0] for r in conn.execute('SELECT manager_id FROM Manager')}
+    record, errors = importer.validate_row(row, departments, managers, manager_id)
+    if errors:
+        raise employeeError('; '.join(f'{field} : {message}' for field, message in errors))
+
+    conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    with db.transaction(conn):
+        if conn.execute('SELECT 1 FROM User WHERE username = ?', (record[0],)).fetchone():
+            raise employeeError('Username already Exists !!!')
+        emp_id = importer.insert_records(conn, [record])[0]
+    shards.place(conn, [emp_id])
+    return emp_id
+
+
+def _check(field, value, departments):
+    # Returns the column and the value to store, with the same rules as Manager.update_emp
+    if field in ('name', 'designation'):
+        value = value.upper()
+        if not re.fullmatch(importer.NAME_PATTERN, value):
+            raise employeeError(f'Invalid {field} !!! Use letters and spaces only')
+        return ('name' if field == 'name' else 'job_title'), value
+    if field == 'department':
+        dept_id = departments.get(value.upper())
+        if dept_id is None:
+            raise employeeError('Invalid Department Name !!!')
+        return 'dept_id', dept_id
+    if field == 'date_of_joining':
+        try:
+            datetime.datetime.strptime(value, r'%Y-%m-%d')
+        except ValueError:
+            raise employeeError('Invalid date format !!!')
+        return 'date_of_joining', value
+    if field == 'salary':
+        try:
+            return 'salary', int(value)
+        except ValueError:
+            raise employeeError('Invalid entry !!! Salary should be a number')
+    if field == 'contact':
+        if not re.fullmatch(importer.CONTACT_PATTERN, value):
+            raise employeeError('Invalid contact number !!! It should contain exactly 10 digits')
+        return 'contact', value
+    if field == 'email':
+        value = value.lower()
+        if not re.fullmatch(importer.EMAIL_PATTERN, value):
+            raise employeeError('Invalid mail id !!!')
+        return 'email', value
+    raise employeeError(f'Unknown field {field!r}')
+
+
+def update_employee(conn, emp_id, **fields):
+    departments = department_cache.name_to_id(conn)
+    changes = dict(_check(field, str(value), departments) for field, value in fields.items() if value is not None)
+    if not changes:
+        raise employeeError('Nothing to update')
+    assignments = ','.join(f'{column} = ?' for column in changes)
+    with db.transaction(conn):
+        row = conn.execute('SELECT dept_id FROM Employee WHERE emp_id = ?', (emp_id,)).fetchone()
+        if not row:
+            raise employeeError('No such employee found. Please check the details and try again.')
+        conn.execute(f'UPDATE Employee SET {assignments} WHERE emp_id = ?', [*changes.values(), emp_id])
+    if changes.get('dept_id', row[0]) != row[0]:
+        # Their attendance, leave and payroll follow them to the new department's shard
+        shards.place(conn, [emp_id], from_dept=row[0])
+
+
+def delete_employee(conn, emp_id):
+    row = conn.execute('SELECT user_id FROM Employee WHERE emp_id = ?', (emp_id,)).fetchone()
+    if not row:
+        raise employeeError('No such employee found. Please check the details and try again.')
+    with db.transaction(conn):
+        conn.execute('DELETE FROM Employee WHERE emp_id = ?', (emp_id,))
+        conn.execute('DELETE FROM User WHERE user_id = ?', (row[0],))
@@ -1,145 +1,31 @@
 #------------------------------------------- EMPLOYEE MANAGEMENT SYSTEM --------------------------------------#
 
-import sqlite3
+# Only what the first menu needs is imported here; the handlers import the modules they use, which
+# keeps a plain start inside bench.STARTUP_BUDGET_MS
+import db
+import migrations
+import profiler
+import querylog
+import shards
+import snapshot
 import getpass
 import re
 import datetime
+import os
 import time
-from tabulate import tabulate
+
 #------------------------------------------- DATABASE SETUP ----------------------------------------------#
 
 def setup_db():
-    conn = sqlite3.connect('emp.db')
-    cursor = conn.cursor()
-
-    # USER RECORD
-    cursor.execute('''
-
-                    CREATE TABLE IF NOT EXISTS User(
-                        user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        username VARCHAR(20) UNIQUE NOT NULL,
-                        password TEXT NOT NULL,
-                        role_id INTEGER
-                )
-                ''')
-
-    # DEPARTMENT RECORD
-    cursor.execute('''
-                
-                    CREATE TABLE IF NOT EXISTS Department(
-                        dept_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        dept_name VARCHAR(20)
-                )
-                ''')
-
-    # MANAGER RECORD
-    cursor.execute('''
-
-                    CREATE TABLE IF NOT EXISTS Manager(
-                        manager_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER,
-                        dept_id INTEGER,
-                        name VARCHAR(20),
-                        contact INTEGER,
-                        email VARCHAR(30),
-                        FOREIGN KEY (user_id) REFERENCES User(user_id),
-                        FOREIGN KEY (dept_id) REFERENCES Department(dept_id)
-                )
-                ''')
-
-    # EMPLOYEE RECORD
-    cursor.execute('''
-                
-                CREATE TABLE IF NOT EXISTS Employee(
-                        emp_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER,
-                        dept_id INTEGER,
-                        manager_id INTEGER,
-                        name VARCHAR(20),
-                        job_title VARCHAR(20),
-                        date_of_joining DATE,
-                        salary INTEGER,
-                        contact INTEGER,
-                        email VARCHAR(30), 
-                        FOREIGN KEY (user_id) REFERENCES User(user_id),
-                        FOREIGN KEY (dept_id) REFERENCES Department(dept_id),
-                        FOREIGN KEY (manager_id) REFERENCES Manager(manager_id)
-                )
-                ''')
-
-    # ATTENDANCE RECORD
-    cursor.execute('''
-                
-                CREATE TABLE IF NOT EXISTS Attendance(
-                        att_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        emp_id INTEGER,
-                        date DATE,
-                        clock_in TIME,
-                        clock_out TIME,
-                        working_hours NUMERIC,
-                        overtime_hours NUMERIC,
-                        status VARCHAR(20),
-                        FOREIGN KEY (emp_id) REFERENCES Employee(emp_id)
-                )
-                ''')
-
-    # LEAVE RECORD
-    cursor.execute('''
-                
-                CREATE TABLE IF NOT EXISTS Leave_Record(
-                        leave_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        emp_id INTEGER,
-                        leave_type VARCHAR(20),
-                        start_date DATE,
-                        end_date DATE,
-                        leave_duration NUMERIC,
-                        leave_balance NUMERIC,
-                        status VARCHAR(20),
-                        FOREIGN KEY (emp_id) REFERENCES Employee(emp_id)
-                )
-                ''')
-
-    # LEAVE BALANCE RECORD
-    cursor.execute('''
-                
-                CREATE TABLE IF NOT EXISTS Leave_Balance(
-                   balance_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                   emp_id INTEGER,
-                   total_leave NUMERIC,
-                   FOREIGN KEY (emp_id) REFERENCES Employee(emp_id)
-                   )
-                   ''')
-    
-
-    # PAYROLL RECORD
-    cursor.execute('''
-                
-                CREATE TABLE IF NOT EXISTS Payroll(
-                        payroll_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        emp_id INTEGER,
-                        basic_pay NUMERIC NOT NULL,
-                        allowance NUMERIC,
-                        deduction NUMERIC,
-                        overtime_pay NUMERIC,
-                        net_pay NUMERIC,
-                        pay_date DATE,
-                        FOREIGN KEY (emp_id) REFERENCES Employee(emp_id)
-                )
-                ''')
-
-    # cursor.executemany('''                   
-    #                 INSERT OR IGNORE INTO Department(dept_name)
-    #                     VALUES (?)''',
-    #                             [('HR',),
-    #                             ('FINANCE',),
-    #                             ('IT',),
-    #                             ('SALES',),
-    #                             ('MARKETING',),
-    #                             ('OPERATIONS',),
-    #                             ('ADMINISTRATION',)])
+    migrations.migrate(db.get_conn())
 
-    conn.commit()
-    conn.close()
+def report_conn():
+    # Reports read the snapshot (see snapshot.py) and say how old it is
+    conn = snapshot.report_conn()
+    taken = snapshot.as_of(conn)
+    if taken:
+        print(f'\n 📸 Report data as of {taken}')
+    return conn
 
 #----------------------------------------------- EXCEPTIONS  ----------------------------------------------------#
 
@@ -238,15 +124,19 @@ def get_role_id():
 #------------------------------------------ USER REGISTRATION  --------------------------------------------#
 
 def register():
-    conn = sqlite3.connect('emp.db')
+    import departments
+    conn = db.get_conn()
     cursor = conn.cursor()
     
     print('\n\t\t\t\t-----------------------------------\n\t\t\t\tWelcome to user registration portal\n\t\t\t\t-----------------------------------')
 
+    # EMS_INSTRUCTION_PACE=<seconds> prints the instructions a line at a time
+    pace = float(os.environ.get('EMS_INSTRUCTION_PACE') or 0)
     with open('instructions.txt','r') as file:
         for i in file.readlines():
             print(i)
-            time.sleep(0.2)
+            if pace:
+                time.sleep(pace)
 
     username = get_username().lower().strip()
             
@@ -268,12 +158,7 @@ def register():
                     VALUES (?,?,?) 
             ''',(username,password,role))
         
-        cursor.execute('''
-                       SELECT user_id FROM User WHERE username = ?
-                       ''',(username,))
-        
-        user_id = cursor.fetchone()
-
+        user_id = cursor.lastrowid
         
         if role == 1:
             print('\n\t\t--------------------------------\n\t\t 👤 Manager Profile Details 👤 \n\t\t--------------------------------\n Please provide the required information below ⬇️ ⬇️ ⬇️')
@@ -287,10 +172,7 @@ def register():
                     continue
                 try:
                     dept = input('\nDepartment Name : ').upper()
-                    cursor.execute('''
-                                SELECT dept_id FROM Department WHERE dept_name = ?
-                            ''',(dept,))
-                    dept_id = cursor.fetchone()
+                    dept_id = departments.dept_id(conn,dept)
                     if not dept_id:
                         raise charError
                 except charError:
@@ -331,16 +213,18 @@ def register():
                     cursor.execute('''
                                     INSERT INTO Manager(user_id,dept_id,name,contact,email)
                                         VALUES (?,?,?,?,?)
-                                ''',(user_id[0],dept_id[0],name,contact,email))
+                                ''',(user_id,dept_id,name,contact,email))
                     
                     print(f'\n 🎉 {name} successfully registered as Manager✅')
                     break
                 elif choice == '2':
                     print('\n🔄 Restarting registration process...')
+                    conn.rollback()
                     return register()  
                 
                 elif choice == '3':
                     print('\n ❌ Registration cancelled ❌')
+                    conn.rollback()
                     return
 
         else:
@@ -356,6 +240,7 @@ def register():
             manager = cursor.fetchone()
             if not manager:
                 print('\n ⚠️ Invalid Manager ID! You are not authorised to register.')
+                conn.rollback()
                 return
            
             print('\n Manager ID verified ✅ . Proceed with registration. ')
@@ -370,10 +255,7 @@ def register():
                     continue
                 try:
                     dept = input('\nDepartment Name : ').upper()
-                    cursor.execute('''
-                                SELECT dept_id FROM Department WHERE dept_name = ?
-                            ''',(dept,))
-                    dept_id = cursor.fetchone()
+                    dept_id = departments.dept_id(conn,dept)
                     if not dept_id:
                         raise charError
                 except charError:
@@ -435,11 +317,8 @@ def register():
                     cursor.execute('''
                                     INSERT INTO Employee(user_id,dept_id,manager_id,name,job_title,date_of_joining,salary,contact,email)
                                         VALUES (?,?,?,?,?,?,?,?,?)
-                                    ''',(user_id[0],dept_id[0],manager[0],name,title,join_date,salary,contact,email))
-                    cursor.execute('''
-                                    SELECT emp_id FROM Employee WHERE user_id = ?
-                                    ''',(user_id[0],))
-                    emp_id = cursor.fetchone()[0]
+                                    ''',(user_id,dept_id,manager[0],name,title,join_date,salary,contact,email))
+                    emp_id = cursor.lastrowid
                 
                     cursor.execute('''
                                 INSERT INTO Payroll(emp_id,basic_pay,allowance,deduction,overtime_pay,net_pay)
@@ -449,25 +328,29 @@ def register():
                                 INSERT INTO Leave_Balance(emp_id,total_leave)
                                     VALUES (?,42)
                                 ''', (emp_id, ))
+                    conn.commit()
+                    shards.place(conn,[emp_id])
                     break
 
                 elif choice == '2':
                     print('\n🔄 Restarting registration process...')
+                    conn.rollback()
                     return register()  
                 
                 elif choice == '3':
                     print('\n ❌ Registration cancelled ❌')
+                    conn.rollback()
                     return
                 else:
+                    conn.rollback()
                     return '\n ⚠️ Invalid choice '
                 
     conn.commit()
-    conn.close()
 
 #----------------------------------------- USER LOGIN ----------------------------------------------#
 
 def login():
-    conn = sqlite3.connect('emp.db')
+    conn = db.get_conn()
     cursor = conn.cursor()
                 
     print('\n\t\t----------------------------------------\n\t\t\t Welcome to Login Portal\n\t\t----------------------------------------')
@@ -515,14 +398,12 @@ def login():
             if attempts == 3:
                 print('\n ❌ ❌ ❌ Too many failed attempts !! Please try again later ')
 
-    conn.close()
-
 #-----------------------------------------------------  MANAGER CLASS   ---------------------------------------------------------------------------#
 
 class Manager:
     def __init__(self,id):
         self.id = id
-        self.conn = sqlite3.connect('emp.db')
+        self.conn = db.get_conn()
         self.cursor = self.conn.cursor()
         self.cursor.execute('''
                             SELECT manager_id FROM Manager WHERE user_id = ?
@@ -531,22 +412,76 @@ class Manager:
         self.manager_id = manager_id[0]
 
     def view_employees(self):
-        self.conn = sqlite3.connect('emp.db')
-        self.cursor = self.conn.cursor()
+        import departments
+        import roster
+        import search
+        import table
+        self.conn = db.get_conn()
 
         print('\n\t\t\t\t\t------------------------\n\t\t\t\t\t👥 EMPLOYEE DIRECTORY\n\t\t\t\t\t-----------------------')
-        self.cursor.execute('''
-                        SELECT emp_id,name,dept_id,job_title,date_of_joining,salary,contact,email FROM Employee 
-                            ''')
-        self.employees = self.cursor.fetchall()
+        sort = 'id'
+        page_size = search.PAGE_SIZE
+        page_no = 1
+        self.employees = search.employee_page(self.conn,sort = sort,page_size = page_size)
 
         if not self.employees:
             print('\n No Employees to display ❌ Please register employees to view them here.')
-        else:
-            print(tabulate(self.employees,headers = ['Emp_ID','Name','Dept_ID','Designation','Joined Date','Salary','Contact','Mail-ID'],tablefmt = 'fancy_grid'))
+            return
+        while True:
+            print(f'\n Page {page_no}  |  Sorted by {sort}  |  {page_size} per page')
+            table.render(self.employees,search.EMPLOYEE_HEADERS,page_size = 0)
+            print('\n[1] ⏭️  Next page\n[2] ⏮️  Previous page\n[3] 🔃 Sort by (id / name / department / salary)\n[4] 📏 Change page size\n[5] 📊 Salary Report\n[6] 🔙 Back')
+            ch = input('\nSelect an option : ')
+            if ch == '1':
+                rows = search.employee_page(self.conn,sort = sort,after = search.page_key(self.employees[-1],sort),page_size = page_size)
+                if not rows:
+                    print('\n 🚫 You are on the last page.')
+                    continue
+                self.employees = rows
+                page_no += 1
+            elif ch == '2':
+                rows = search.employee_page(self.conn,sort = sort,before = search.page_key(self.employees[0],sort),page_size = page_size)
+                if not rows:
+                    print('\n 🚫 You are on the first page.')
+                    continue
+                self.employees = rows
+                page_no -= 1
+            elif ch == '3':
+                choice = input('\nSort by (id / name / department / salary) : ').strip().lower()
+                if choice not in search.SORT_KEYS:
+                    print('\n ⚠️ Invalid sort option !!!')
+                    continue
+                sort = choice
+                page_no = 1
+                self.employees = search.employee_page(self.conn,sort = sort,page_size = page_size)
+            elif ch == '4':
+                try:
+                    size = int(input('\nRows per page : '))
+                    if size < 1:
+                        raise rangeError
+                except (ValueError,rangeError):
+                    print('\n ⚠️ Invalid entry !!! Page size should be a positive number')
+                    continue
+                page_size = size
+                page_no = 1
+                self.employees = search.employee_page(self.conn,sort = sort,page_size = page_size)
+            elif ch == '5':
+                by = input('\nGroup by (department / designation / manager) : ').strip().lower()
+                if by not in roster.GROUPINGS:
+                    print('\n ⚠️ Invalid option !!!')
+                    continue
+                conn = report_conn()
+                names = {dept_id: name for name,dept_id in departments.name_to_id(conn).items()} if by == 'department' else None
+                report = roster.salary_report(roster.Roster.load(conn),by,names)
+                table.render(report,[by.title(),'Employees','Total Salary','Average','Lowest','Highest'],floatfmt = '.2f',page_size = 0)
+            elif ch == '6':
+                break
+            else:
+                print('\n ⚠️ Invalid choice !!!')
 
     def add_emp(self):
-        self.conn = sqlite3.connect('emp.db')
+        import departments
+        self.conn = db.get_conn()
         self.cursor = self.conn.cursor()
 
         print('\n\t------------------------------------------\n\t 📋 Employee Enrollment Section \n\t------------------------------------------')
@@ -572,10 +507,7 @@ class Manager:
                     continue
                 try:
                     dept = input('\nDepartment Name : ').upper()
-                    self.cursor.execute('''
-                                SELECT dept_id FROM Department WHERE dept_name = ?
-                            ''',(dept,))
-                    dept_id = self.cursor.fetchone()
+                    dept_id = departments.dept_id(self.conn,dept)
                     if not dept_id:
                         raise charError
                 except charError:
@@ -617,20 +549,12 @@ class Manager:
                                     INSERT INTO User(username,password,role_id)
                                         VALUES (?,?,?)
                                     ''',(username,password,role))
-                
-                self.cursor.execute('''
-                                    SELECT user_id FROM User WHERE username = ?
-                                    ''',(username,))
-                user_id = self.cursor.fetchone()
+                user_id = self.cursor.lastrowid
                 self.cursor.execute('''
                                     INSERT INTO Employee(user_id,dept_id,manager_id,name,job_title,date_of_joining,salary,contact,email)
                                         VALUES (?,?,?,?,?,?,?,?,?)
-                                    ''',(user_id[0],dept_id[0],self.manager_id,name,title,join_date,salary,contact,email))
-                
-                self.cursor.execute('''
-                                    SELECT emp_id FROM Employee WHERE user_id = ?
-                                    ''',(user_id[0],))
-                emp_id = self.cursor.fetchone()[0]
+                                    ''',(user_id,dept_id,self.manager_id,name,title,join_date,salary,contact,email))
+                emp_id = self.cursor.lastrowid
                 
                 self.cursor.execute('''
                                     INSERT INTO Payroll(emp_id,basic_pay,allowance,deduction,overtime_pay,net_pay)
@@ -640,16 +564,20 @@ class Manager:
                                 INSERT INTO Leave_Balance(emp_id,total_leave)
                                     VALUES (?,42)
                                 ''', (emp_id, ))
+                self.conn.commit()
+                shards.place(self.conn,[emp_id])
                 print('\n Employee Added successfully ✅ ')
                 break
             self.conn.commit()
-            self.conn.close()
 
     def update_emp(self):
-        self.conn = sqlite3.connect('emp.db')
+        import departments
+        self.conn = db.get_conn()
         self.cursor = self.conn.cursor()
 
         updating = True
+        # Department the employee's records are filed under until the change is saved
+        moved_from = None
 
         print('\n\t--------------------------------\n\t🔧 EMPLOYEE RECORD UPDATE \n\t--------------------------------')
         try:
@@ -694,18 +622,12 @@ class Manager:
                     print('\n ✅ Name updated successfully!')
                     break
             elif self.choice == '2':
-                self.cursor.execute('''
-                                SELECT dept_name FROM Department WHERE dept_id = ?
-                            ''',(profile[1],))
-                dept_name = self.cursor.fetchone()[0]
+                dept_name = departments.dept_name(self.conn,profile[1])
                 print(f'\nExisting Department Name on Profile : {dept_name}')
                 while True:
                     try:
                         dept = input('\nEnter the new department : ').upper()
-                        self.cursor.execute('''
-                                    SELECT dept_id FROM Department WHERE dept_name = ?
-                                ''',(dept,))
-                        dept_id = self.cursor.fetchone()
+                        dept_id = departments.dept_id(self.conn,dept)
                         if not dept_id:
                             raise charError
                     except charError:
@@ -714,13 +636,11 @@ class Manager:
                     if dept == dept_name:
                         print('\n 🚫 No changes Detected !!! Same department entered.')
                         continue
-                    self.cursor.execute('''
-                                        SELECT dept_id FROM Department WHERE dept_name = ?        
-                                        ''',(dept,))
-                    dept_id = self.cursor.fetchone()
+                    if moved_from is None:
+                        moved_from = profile[1]
                     self.cursor.execute('''
                                         UPDATE Employee SET dept_id = ? WHERE emp_id = ? 
-                                        ''',(dept_id[0],self.emp))
+                                        ''',(dept_id,self.emp))
                     print('\n ✅ Department updated successfully!')
                     break
             elif self.choice == '3':
@@ -816,17 +736,19 @@ class Manager:
             elif self.choice == '8':
                 print('\n 💾 Changes saved successfully!')
                 self.conn.commit()
-                self.conn.close()
+                if moved_from is not None:
+                    shards.place(self.conn,[self.emp],from_dept = moved_from)
                 break
             elif self.choice == '9':
                 print('\n ❌ Updation cancelled. No changes made.')
-                self.conn.close()
+                self.conn.rollback()
                 break
             else:
                 print('\n ⚠️ Invalid choice !!!')
 
     def delete_emp(self):
-        self.conn = sqlite3.connect('emp.db')
+        import employees
+        self.conn = db.get_conn()
         self.cursor = self.conn.cursor()
 
         print('\n\t-------------------------\n\t 🗑️ DELETE EMPLOYEE RECORD\n\t-------------------------')
@@ -843,30 +765,33 @@ class Manager:
             print('\n⚠️  You are about to permanently delete this employee record.')
             confirm = input('Are you sure you want to proceed? (Y/N): ')
             if confirm == 'y' or confirm == 'Y':
-                self.cursor.execute('''
-                                    SELECT user_id FROM Employee WHERE emp_id = ?
-                                    '''(self.emp))
-                user_id = self.cursor.fetchone()[0]
-                self.cursor.execute('''
-                            DELETE FROM Employee WHERE emp_id = ?
-                            ''',(self.emp,))
-                self.cursor.execute('''
-                            DELETE FROM User WHERE user_id = ?
-                                    ''',(user_id,))
-                self.conn.commit()
+                employees.delete_employee(self.conn,self.emp)
+                print('\n 🗑️ Employee record deleted ✅')
             else:
                 print('\n ❌ Deletion cancelled. No changes made.')
                     
         else:
             print(' 🚫 No such employee found. Please check the details and try again.')
 
+    def show_search_result(self,result):
+        import search
+        import table
+        if not result:
+            print('\n ❌ No such employee found. Please check the details and try again.')
+        else:
+            print('\n Search successful ✅')
+            table.render(result,search.EMPLOYEE_HEADERS)
+            if len(result) == search.SEARCH_LIMIT:
+                print(f'\n Showing the first {search.SEARCH_LIMIT} matches. Narrow the search to see the rest.')
+
     def search_emp(self):
-        self.conn = sqlite3.connect('emp.db')
-        self.cursor = self.conn.cursor()
+        import departments
+        import search
+        self.conn = db.get_conn()
 
         while True:
             print('\n\t---------------------------------\n\t🔍 SEARCH EMPLOYEE RECORD\n\t---------------------------------')
-            print('\n[1] 🆔 Search by ID\n[2] 👤 Search by Name\n[3] 🏛️ Search by Department\n[4] 🪪 Search by Designation\n[5] 📅 Search by Join Date\n[6] 📞 Search by Phone number\n[7] 🚪 Exit ')
+            print('\n[1] 🆔 Search by ID\n[2] 👤 Search by Name\n[3] 🏛️ Search by Department\n[4] 🪪 Search by Designation\n[5] 📅 Search by Join Date\n[6] 📞 Search by Phone number\n[7] 🧩 Combined Search\n[8] 🚪 Exit ')
             self.choice = input('Enter your option : ')
             
             if self.choice == '1':
@@ -875,63 +800,27 @@ class Manager:
                 except ValueError:
                     print('\n ⚠️ Invalid entry !!!')
                     return
-                self.cursor.execute('''
-                                    SELECT emp_id,name,dept_id,job_title,date_of_joining,salary,contact,email FROM Employee WHERE emp_id = ?                         
-                                    ''',(self.emp,))
-                self.employee = self.cursor.fetchone()
-                if not self.employee:
-                    print('\n ❌ No such employee found. Please check the details and try again.')
-                else:
-                    print('\n Search successful ✅')
-                    print(tabulate([self.employee],headers = ['Emp_ID','Name','Dept_ID','Designation','Joined Date','Salary','Contact','Mail-ID'],tablefmt = 'grid'))
+                self.show_search_result(search.search_employees(self.conn,emp_id = self.emp))
             elif self.choice == '2':
                 try:
                     self.name = input('Enter the name of Employee : ').upper()
-                except charError:
                     if not re.fullmatch(r'[A-Za-z ]+', self.name):
                         raise charError
                 except charError:
                     print('\n ⚠️ Invalid Name !!! Use letters and spaces only')
                     return
-                self.cursor.execute('''
-                                    SELECT emp_id,name,dept_id,job_title,date_of_joining,salary,contact,email FROM Employee                         
-                                    ''')
-                self.employee = self.cursor.fetchall()
-                result  = []
-                for i in self.employee:
-                    if self.name in i[1]:
-                        result.append(i)
-                if not result:
-                    print('\n ❌ No such employee found. Please check the details and try again.')   
-                else: 
-                    print('\n Search successful ✅')
-                    print(tabulate(result,headers = ['Emp_ID','Name','Dept_ID','Designation','Joined Date','Salary','Contact','Mail-ID'],tablefmt = 'grid'))
+                self.show_search_result(search.fuzzy_name_search(self.conn,self.name))
                 
             elif self.choice == '3':
                 try:
                     dept = input('\nDepartment Name : ').upper()
-                    self.cursor.execute('''
-                                SELECT dept_id FROM Department WHERE dept_name = ?
-                            ''',(dept,))
-                    dept_id = self.cursor.fetchone()
+                    dept_id = departments.dept_id(self.conn,dept)
                     if not dept_id:
                         raise charError
                 except charError:
                     print('\n ⚠️ Invalid Department Name !!!') 
                     return
-                self.cursor.execute('''
-                                SELECT emp_id,name,dept_id,job_title,date_of_joining,salary,contact,email FROM Employee 
-                                    ''')
-                self.employee = self.cursor.fetchall()
-                result  = []
-                for i in self.employee:
-                    if dept_id[0] == i[2]:
-                        result.append(i)
-                if not result:
-                    print('\n ❌ No such employee found. Please check the details and try again.')   
-                else: 
-                    print('\n Search successful ✅')
-                    print(tabulate(result,headers = ['Emp_ID','Name','Dept_ID','Designation','Joined Date','Salary','Contact','Mail-ID'],tablefmt = 'grid'))
+                self.show_search_result(search.search_employees(self.conn,dept_id = dept_id))
             elif self.choice == '4':
                 try:
                     title = input('\nDesignation : ').upper()
@@ -940,19 +829,7 @@ class Manager:
                 except charError:
                     print('\n ⚠️ Invalid job title !!! Use letters and spaces only\n---------------------------------------------------------------------------------------------------')
                     continue
-                self.cursor.execute('''
-                                SELECT emp_id,name,dept_id,job_title,date_of_joining,salary,contact,email FROM Employee 
-                                    ''')
-                self.employee = self.cursor.fetchall()
-                result  = []
-                for i in self.employee:
-                    if title in i[3]:
-                        result.append(i)
-                if not result:
-                    print('\n ❌ No such employee found. Please check the details and try again.')   
-                else: 
-                    print('\n Search successful ✅')
-                    print(tabulate(result,headers = ['Emp_ID','Name','Dept_ID','Designation','Joined Date','Salary','Contact','Mail-ID'],tablefmt = 'grid'))
+                self.show_search_result(search.search_employees(self.conn,title = title))
             elif self.choice == '5':
                 try:
                     join_date = input('\nDate of joining(YYYY-MM-DD) : ')
@@ -960,19 +837,7 @@ class Manager:
                 except ValueError:
                     print('\n ⚠️ Invalid date format !!!')
                     continue
-                self.cursor.execute('''
-                                SELECT emp_id,name,dept_id,job_title,date_of_joining,salary,contact,email FROM Employee
-                                    ''')
-                self.employee = self.cursor.fetchall()
-                result  = []
-                for i in self.employee:
-                    if join_date in i[4]:
-                        result.append(i)
-                if not result:
-                    print('\n ❌ No such employee found. Please check the details and try again.')   
-                else: 
-                    print('\n Search successful ✅')
-                    print(tabulate(result,headers = ['Emp_ID','Name','Dept_ID','Designation','Joined Date','Salary','Contact','Mail-ID'],tablefmt = 'grid'))
+                self.show_search_result(search.search_employees(self.conn,joined = join_date))
             elif self.choice == '6':
                 try:
                     self.contact = input('\nEnter the phone number : +91')
@@ -982,48 +847,65 @@ class Manager:
                 except numError:
                     print('\n ⚠️ Invalid contact number !!! It should contain exactly 10 digits')
                     return
-                
-                self.cursor.execute('''
-                                    SELECT emp_id,name,dept_id,job_title,date_of_joining,salary,contact,email FROM Employee                        
-                                    ''')
-                self.employee = self.cursor.fetchall()
-                result  = []
-                for i in self.employee:
-                    if int(self.contact) == i[6]:
-                        result.append(i)
-                if not result:
-                    print('\n ❌ No such employee found. Please check the details and try again.')   
-                else: 
-                    print('\n Search successful ✅')
-                    print(tabulate(result,headers = ['Emp_ID','Name','Dept_ID','Designation','Joined Date','Salary','Contact','Mail-ID'],tablefmt = 'grid'))
-            elif self.choice =='7':
+                self.show_search_result(search.search_employees(self.conn,contact = self.contact))
+            elif self.choice == '7':
+                print('\n Leave a field blank to skip it.')
+                filters = {}
+                try:
+                    dept = input('\nDepartment Name : ').upper().strip()
+                    if dept:
+                        dept_id = departments.dept_id(self.conn,dept)
+                        if not dept_id:
+                            raise charError
+                        filters['dept_id'] = dept_id
+                    title = input('\nDesignation : ').upper().strip()
+                    if title:
+                        if not re.fullmatch(r'[A-Za-z ]+',title):
+                            raise charError
+                        filters['title'] = title
+                    joined_after = input('\nJoined on or after (YYYY-MM-DD) : ').strip()
+                    if joined_after:
+                        datetime.datetime.strptime(joined_after, r"%Y-%m-%d")
+                        filters['joined_after'] = joined_after
+                    joined_before = input('\nJoined on or before (YYYY-MM-DD) : ').strip()
+                    if joined_before:
+                        datetime.datetime.strptime(joined_before, r"%Y-%m-%d")
+                        filters['joined_before'] = joined_before
+                except charError:
+                    print('\n ⚠️ Invalid Department Name or Designation !!!')
+                    continue
+                except ValueError:
+                    print('\n ⚠️ Invalid date format !!!')
+                    continue
+                self.show_search_result(search.search_employees(self.conn,**filters))
+            elif self.choice =='8':
                 print('\n Exiting Search Employee Portal')
                 break
             else:
                 print('\n ⚠️ Invalid choice!!!')
-
-        self.conn.close()
     
     def view_attendance(self):
-        self.conn = sqlite3.connect('emp.db')
+        import archive
+        import attendance
+        import departments
+        import payroll
+        import table
+        self.conn = db.get_conn()
         self.cursor = self.conn.cursor()
         while True:
             print('\n\t----------------------------------------\n\t📅 EMPLOYEE ATTENDANCE RECORDS 📅\n\t----------------------------------------')
-            print('\n1. 📊 Today\'s Attendance Log\n2. 👥 Employee-wise Attendance Summary \n3. 🔙 Go Back ')
+            print('\n1. 📊 Today\'s Attendance Log\n2. 👥 Employee-wise Attendance Summary \n3. 🗓️  Monthly Attendance Summary \n4. 🔙 Go Back ')
             choice = input('\n Enter your choice : ')
             if choice == '1':
                 print('\n-------------------------------------------------------------')
                 print('\n\t\t 📊 Today\'s Attendance Log ')
                 print('\n-------------------------------------------------------------')
                 today = datetime.datetime.now().strftime("%Y-%m-%d")
-                self.cursor.execute('''
-                                    SELECT * FROM Attendance WHERE date = ?
+                cursor = shards.query(self.conn,'''
+                                    SELECT * FROM Attendance WHERE date = ? ORDER BY att_id
                                     ''',(today,))
-                data = self.cursor.fetchall()
-                if not data:
+                if not table.render(cursor,['Att_ID','Emp_ID','Date','Clock-in','Clock-out','Working_Hours','Overtime_Hours','Status']):
                     print('\n ⛔ No attendance marked yet.')
-                    continue
-                print(tabulate(data,headers = ['Att_ID','Emp_ID','Date','Clock-in','Clock-out','Working_Hours','Overtime_Hours','Status'],tablefmt = 'grid'))
                 continue
 
             elif choice == '2':
@@ -1043,29 +925,64 @@ class Manager:
                 if not employee:
                     print('\n 🚫 No such user found. Please check the details and try again ')
                     return
-                self.cursor.execute('''
-                                    SELECT  date, clock_in, clock_out, working_hours, overtime_hours, status FROM Attendance WHERE emp_id = ?
+                conn = shards.route(report_conn(),self.emp)
+                try:
+                    source = archive.attendance_source(conn)
+                except archive.archiveError as e:
+                    print(f'\n ⚠️ {e}')
+                    source = 'Attendance'
+                cursor = conn.execute(f'''
+                                    SELECT  date, clock_in, clock_out, working_hours, overtime_hours, status FROM {source} WHERE emp_id = ? ORDER BY date
                                     ''',(self.emp,))
-                self.record = self.cursor.fetchall()
-                
-                print(tabulate(self.record,headers = ['Date','Clock_in','Clock_out','Work_Hours','Overtime_Hours','Status'],tablefmt = 'grid'))
+                if not table.render(cursor,['Date','Clock_in','Clock_out','Work_Hours','Overtime_Hours','Status']):
+                    print('\n ⛔ No attendance recorded for this employee.')
                 continue
             
             elif choice == '3':
+                print('\n-------------------------------------------------------------')
+                print('\n\t\t 🗓️  MONTHLY ATTENDANCE SUMMARY')
+                print('\n-------------------------------------------------------------')
+                month = input('Enter Month (YYYY-MM, leave blank for this month) : ').strip() or payroll.period_of()
+                try:
+                    datetime.datetime.strptime(month,'%Y-%m')
+                except ValueError:
+                    print('\n ⚠️ Invalid month format !!! Use YYYY-MM')
+                    continue
+                dept = input('Enter Department Name (leave blank for department totals) : ').strip().upper()
+                conn = report_conn()
+                if dept:
+                    dept_id = departments.dept_id(conn,dept)
+                    if dept_id is None:
+                        print(f'\n ❌ Department "{dept}" not found')
+                        continue
+                    data = shards.gather(shards.by_department(conn,attendance.monthly_summary,month,dept_id = dept_id))
+                    headers = ['Emp_ID','Name','Days','Present','Half_Days','Absent','Work_Hours','Overtime_Hours']
+                else:
+                    data = shards.gather(shards.scatter(conn,attendance.department_summary,month),key = lambda i: i[0])
+                    headers = ['Department','Employees','Days','Present','Half_Days','Absent','Work_Hours','Overtime_Hours']
+                if not data:
+                    print(f'\n ⛔ No attendance recorded for {month}.')
+                    continue
+                table.render(data,headers)
+                continue
+
+            elif choice == '4':
                 print('\n 🔚 Exiting....')
                 break
             else:
                 print('\n ⚠️ Invalid choice !!!')
                 continue
-            self.conn.close()
    
     def manage_leave(self):
-        self.conn = sqlite3.connect('emp.db')
+        import departments
+        import leave
+        import table
+        self.conn = db.get_conn()
         self.cursor = self.conn.cursor()
         
         while True:
             print('\n\t----------------------------------------\n\t 🗂️ LEAVE MANAGEMENT PORTAL 🗂️\n\t----------------------------------------')
-            print('\n[1] 📄 View leave records \n[2] 🗂️  Manage Leave Requests \n[3] 🚪 Exit ')
+            print('\n[1] 📄 View leave records \n[2] 🗂️  Manage Leave Requests \n[3] 📊 Team Leave Summary \n[4] ⚡ Bulk Decisions \n[5] 🚪 Exit ')
             self.choice = input('\nEnter your choice : ')
             
             if self.choice == '1':
@@ -1073,68 +990,34 @@ class Manager:
                 print('\n[1] 📋 View all requests\n[2] ⏳ View Pending requests\n[3] ✅ View Approved requests\n[4] ❌ View rejected requests\n[5] 🔙 Go back')
                 self.ch = input('Select an action : ')
                 
+                headers = ['Leave_ID','Emp_ID','Leave_Type','From','To','Duration','Status']
+                if self.ch in ('1','2','3','4'):
+                    conn = report_conn()
                 if self.ch == '1':
-                    self.cursor.execute('''
-                                SELECT * FROM Leave_Record ''')
-                    self.record = self.cursor.fetchall()
-                    if not self.record:
-                        print('\n ❌ No leave records found')
-                    else:
-                        print('\n-------------------------------------------------------------------------------------------------------')
-                        print('\nLeave_id  Emp_id \t Leave_Type \t From \t\t To \t\t Duration \t Status ')
-                        print('\n-------------------------------------------------------------------------------------------------------')
-                        for i in self.record:
-                            if i[2] is None:
-                                continue
-                            print(f'\n{i[0]}  \t {i[1]} \t\t {i[2]} \t {i[3]} \t {i[4]} \t  {i[5]} \t\t {i[7]}')
-            
-                elif self.ch =='2':
-                    self.cursor.execute('''
-                        SELECT * FROM Leave_Record WHERE status = 'PENDING'
+                    cursor = shards.query(conn,'''
+                                SELECT leave_id, emp_id, leave_type, start_date, end_date, leave_duration, status
+                                    FROM Leave_Record WHERE leave_type IS NOT NULL ORDER BY leave_id
                                 ''')
-                    self.record = self.cursor.fetchall()
-                    if not self.record:
-                        print('\n ❌ No active leave records found')
-                    else:
-                        print('\n-------------------------------------------------------------------------------------------------------')
-                        print('\nLeave_id  Emp_id \t Leave_Type \t From \t\t To \t\t Duration \t Status ')
-                        print('\n-------------------------------------------------------------------------------------------------------')
-                        for i in self.record:
-                            print(f'\n{i[0]}  \t {i[1]} \t\t {i[2]} \t {i[3]} \t {i[4]} \t  {i[5]} \t\t {i[7]}')
-            
-                elif self.ch =='3':    
-                    self.cursor.execute('''
-                        SELECT * FROM Leave_Record WHERE status = 'APPROVED'
-                                ''')
-                    self.record = self.cursor.fetchall()
-                    if not self.record:
-                        print('\n ❌ No active leave records found')
-                    else:
-                        print('\n-------------------------------------------------------------------------------------------------------\nLeave_id   Emp_id \t Leave_Type \t\t From \t\t To \t Duration \t Status \n-------------------------------------------------------------------------------------------------------')
-                        for i in self.record:
-                            print(f'\n{i[0]}  \t {i[1]} \t\t {i[2]} \t {i[3]} \t {i[4]} \t  {i[5]} \t\t {i[7]}')
+                    if not table.render(cursor,headers):
+                        print('\n ❌ No leave records found')
             
-                elif self.ch =='4':    
-                    self.cursor.execute('''
-                        SELECT * FROM Leave_Record WHERE status = 'REJECTED'
-                                ''')
-                    self.record = self.cursor.fetchall()
-                    if not self.record:
+                elif self.ch in ('2','3','4'):
+                    status = {'2':'PENDING','3':'APPROVED','4':'REJECTED'}[self.ch]
+                    cursor = shards.query(conn,'''
+                        SELECT leave_id, emp_id, leave_type, start_date, end_date, leave_duration, status
+                            FROM Leave_Record WHERE status = ? ORDER BY leave_id
+                                ''',(status,))
+                    if not table.render(cursor,headers):
                         print('\n ❌ No active leave records found')
-                    else:
-                        print('\n-------------------------------------------------------------------------------------------------------\nLeave_id   Emp_id \t Leave_Type \t\t From \t\t To \t Duration \t Status \n-------------------------------------------------------------------------------------------------------')
-                        for i in self.record:
-                            print(f'\n{i[0]}  \t {i[1]} \t\t {i[2]} \t {i[3]} \t {i[4]} \t  {i[5]} \t\t {i[7]}')
                 elif self.ch == '5':
                     print('\n Going back to Leave management Portal ....')
                 else:
                     print('\n ⚠️ Invalid choice !!!')
             elif self.choice == '2':
                 print('\n\t----------------------------------------\n\t\t 🗂️  MANAGE LEAVE REQUESTS 🗂️ \n\t----------------------------------------')
-                self.cursor.execute('''
-                        SELECT * FROM Leave_Record WHERE status = 'PENDING'
-                                ''')
-                self.record = self.cursor.fetchall()
+                self.record = list(shards.query(self.conn,'''
+                        SELECT * FROM Leave_Record WHERE status = 'PENDING' ORDER BY leave_id
+                                '''))
                 if not self.record:
                     print('\n ❌ No active leave records found')
                 else:
@@ -1143,29 +1026,95 @@ class Manager:
                         print(f'\n{i[0]}  \t {i[1]} \t\t {i[2]} \t {i[3]} \t {i[4]} \t  {i[5]} \t\t {i[7]}')
                         print('\n1. ✅ Approve Leave\n2. ❌ Reject Leave\n3. ↩️ Go Back')
                         self.action = input('\n Select an action : ')
-                        if self.action == '1':
-                            self.cursor.execute('''
-                                                UPDATE Leave_Record SET status = 'APPROVED' WHERE leave_id = ?
-                                                ''',(i[0],))
-                            print('\n 📝 Leave request Approved ✅')
-                            self.conn.commit()
-                        elif self.action == '2':
-                            self.cursor.execute('''
-                                                UPDATE Leave_Record SET status = 'REJECTED' WHERE leave_id = ?
-                                                ''',(i[0],))
-                            print('\n 📝 Leave request Rejected ✅')
-                            self.conn.commit()
-                        elif self.action == '3':
+                        if self.action == '3':
                             print('\n Going back to Leave management Portal ....')
                             break
+                        try:
+                            if self.action == '1':
+                                leave.decide_leave(shards.route(self.conn,i[1]),i[0],'APPROVED')
+                                print('\n 📝 Leave request Approved ✅')
+                            elif self.action == '2':
+                                leave.decide_leave(shards.route(self.conn,i[1]),i[0],'REJECTED')
+                                print('\n 📝 Leave request Rejected ✅')
+                        except leave.leaveError as e:
+                            print(f'\n ⚠️ {e}')
             elif self.choice == '3':
+                dept = input('\nEnter Department Name (leave blank for your team) : ').strip().upper()
+                conn = report_conn()
+                if dept:
+                    dept_id = departments.dept_id(conn,dept)
+                    if dept_id is None:
+                        print(f'\n ❌ Department "{dept}" not found')
+                        continue
+                    team = shards.gather(shards.by_department(conn,leave.team_leave_summary,dept_id = dept_id))
+                else:
+                    team = shards.gather(shards.by_department(conn,leave.team_leave_summary,manager_id = self.manager_id),
+                                         key = lambda i: i['emp_id'])
+                if not team:
+                    print('\n ❌ No employees found')
+                    continue
+                rows = ([i['emp_id'],i['name'],i['entitlement'],i['balance'],f"{i['approved_days']:g}",
+                         f"{i['pending']} ({i['pending_days']:g})",f"{i['approved']} ({i['approved_days']:g})",
+                         f"{i['rejected']} ({i['rejected_days']:g})"] for i in team)
+                print('\n\t----------------------------------------\n\t\t 📊 TEAM LEAVE SUMMARY 📊\n\t----------------------------------------')
+                table.render(rows,['Emp_ID','Name','Total','Remaining','Taken','Pending (days)','Approved (days)','Rejected (days)'])
+                print(f'\n 👥 {len(team)} employees, {sum(i["pending"] for i in team)} pending requests')
+            elif self.choice == '4':
+                print('\n\t----------------------------------------\n\t\t ⚡ BULK LEAVE DECISIONS ⚡\n\t----------------------------------------')
+                print('\n Leave a filter blank to match every pending request')
+                filters = {}
+                try:
+                    emp = input('\nEmployee ID : ').strip()
+                    if emp:
+                        filters['emp_id'] = int(emp)
+                    dept = input('Department Name : ').strip().upper()
+                    if dept:
+                        filters['dept_id'] = departments.dept_id(self.conn,dept)
+                        if filters['dept_id'] is None:
+                            print(f'\n ❌ Department "{dept}" not found')
+                            continue
+                    print('\n[1] Casual Leave \n[2] Sick Leave \n[3] Earned Leave \n[4] Paid Leave')
+                    leave_type = input('Leave Type : ').strip()
+                    if leave_type:
+                        filters['leave_type'] = leave.LEAVE_TYPES[leave_type]
+                    for key,prompt in (('start','From (YYYY-MM-DD) : '),('end','To (YYYY-MM-DD) : ')):
+                        date = input(prompt).strip()
+                        if date:
+                            filters[key] = str(datetime.datetime.strptime(date,'%Y-%m-%d').date())
+                    max_days = input('Maximum duration (days) : ').strip()
+                    if max_days:
+                        filters['max_days'] = int(max_days)
+                except (ValueError,KeyError):
+                    print('\n ⚠️ Invalid entry !!!')
+                    continue
+                self.record = shards.gather(shards.by_department(self.conn,leave.pending_leave,**filters),key = lambda i: i[0])
+                if not self.record:
+                    print('\n ❌ No active leave records found')
+                    continue
+                table.render((i[:6] for i in self.record),['Leave_ID','Emp_ID','Leave_Type','From','To','Duration'])
+                print(f'\n {len(self.record)} pending request(s) match')
+                print('\n1. ✅ Approve all\n2. ❌ Reject all\n3. ↩️ Go Back')
+                self.action = input('\n Select an action : ')
+                if self.action == '1':
+                    count = shards.total(shards.by_department(self.conn,leave.decide_by_filter,'APPROVED',**filters))
+                    print(f'\n 📝 {count} leave request(s) Approved ✅')
+                elif self.action == '2':
+                    count = shards.total(shards.by_department(self.conn,leave.decide_by_filter,'REJECTED',**filters))
+                    print(f'\n 📝 {count} leave request(s) Rejected ✅')
+                else:
+                    print('\n Going back to Leave management Portal ....')
+            elif self.choice == '5':
                 print('\n Exiting Leave management portal...')
                 break
             else:
                 print('\n ⚠️ Invalid choice!!!') 
 
     def manage_salary(self):
-        self.conn = sqlite3.connect('emp.db')
+        import archive
+        import departments
+        import payroll
+        import table
+        self.conn = db.get_conn()
         self.cursor = self.conn.cursor()        
         try:
             self.emp = int(input('Enter Employee ID to view salary details : '))
@@ -1179,6 +1128,8 @@ class Manager:
         if not employee:
             print('\n 🚫 No such user found. Please check the details and try again ')
             return
+        self.conn = shards.route(self.conn,self.emp)
+        self.cursor = self.conn.cursor()
         while True:
             print('\n\t--------------------------------------------------\n\t\t 💰 MANAGE EMPLOYEE SALARY \n\t--------------------------------------------------')
            
@@ -1186,25 +1137,14 @@ class Manager:
             ch = input('\nSelect an option : ')
             if ch == '1':
            
-                self.cursor.execute('''
-                                SELECT * FROM Payroll WHERE emp_id = ?
-                                    ''',(self.emp,))
-                salary_record = self.cursor.fetchone()
+                salary_record = payroll.salary_record(self.conn,self.emp)
                 self.cursor.execute('''
                                 SELECT dept_id,name,job_title FROM Employee WHERE emp_id = ?
                                     ''',(self.emp,))
                 emp = self.cursor.fetchone()
-                self.cursor.execute('''
-                                SELECT dept_name FROM Department WHERE dept_id = ?
-                                    ''',(emp[0],))
-                dept = self.cursor.fetchone()
-
-                net_salary = salary_record[2] + salary_record[3] - salary_record[4] + salary_record[5]
+                dept = departments.dept_name(self.conn,emp[0])
 
-                self.cursor.execute('''
-                                    UPDATE Payroll SET net_pay = ? WHERE emp_id = ? 
-                                    ''',(net_salary,self.emp))
-                self.conn.commit()
+                net_salary = salary_record[6]
                
                 print('\n-------------------------------------------------------')
                 print('\n\t\t💼 VIEW EMPLOYEE SALARY')
@@ -1213,7 +1153,7 @@ class Manager:
                 print(f'\nPayroll ID       : {salary_record[0]}')
                 print(f'\nEmployee ID      : {salary_record[1]}')
                 print(f'\nEmployee Name    : {emp[1]}')
-                print(f'\nDepartment       : {dept[0]}')
+                print(f'\nDepartment       : {dept}')
                 print(f'\nDesignation      : {emp[2]}')
                 print('\n-------------------------------------------------------')
                 print(f'\nBasic Salary     : ₹ {salary_record[2]}')               
@@ -1227,25 +1167,17 @@ class Manager:
             elif ch == '2':
                 print('\n\t-----------------------\n\t💰 APPLY ALLOWANCE  \n\t-----------------------')
              
-                self.cursor.execute('''
-                                SELECT basic_pay FROM Payroll WHERE emp_id = ? 
-                                    ''',(self.emp,))
-                salary = self.cursor.fetchone()[0]
-                allowance = salary * 0.1
-                self.cursor.execute('''
-                                    UPDATE Payroll SET allowance = ? WHERE emp_id = ? 
-                                    ''',(allowance,self.emp))
-                self.conn.commit()
-                print(f'\n 🎉 Allowance ₹ {allowance} applied Successfully')
+                result = payroll.apply_allowance(self.conn,emp_id = self.emp,source = 'MANAGER')
+                if not result:
+                    print('\n ❌ No payroll record found for this employee.')
+                    continue
+                print(f'\n 🎉 Allowance ₹ {result[0][1]} applied Successfully')
                 continue
             elif ch == '3':
                 
                 print('\n\t----------------------------\n\t📉 APPLY DEDUCTION\n\t----------------------------')
   
-                self.cursor.execute('''
-                                SELECT deduction FROM Payroll WHERE emp_id = ?
-                                    ''',(self.emp,))
-                deduction = self.cursor.fetchone()[0]
+                deduction = payroll.salary_record(self.conn,self.emp)[4]
                 if deduction == 0:
                     print('\n🟢 Salary processed without deductions.')
                 else:
@@ -1253,45 +1185,37 @@ class Manager:
                 continue
             elif ch == '4':
                 print('\n----------------------------\n🕒 OVERTIME PAY ENTRY \n----------------------------')
-                
-                self.cursor.execute('''
-                                SELECT overtime_hours FROM Attendance WHERE emp_id = ? 
-                                    ''',(self.emp,))
-                overtime = self.cursor.fetchone()
-                if not overtime:
-                    print('\n ❌ Salary processed without overtime pay. No overtime hours were recorded for this employee.')
-                    return
-                self.cursor.execute('''
-                                    SELECT basic_pay,overtime_pay FROM Payroll WHERE emp_id = ?
-                                    ''',(self.emp,))
-                result = self.cursor.fetchone()
-                salary = result[0]
-                overtime_rate = salary / 25 / 8
-                overtime_pay = result[1] + overtime[0] * overtime_rate
-                self.cursor.execute('''
-                                    UPDATE Payroll SET overtime_pay = ? WHERE emp_id = ? 
-                                    ''',(overtime_pay,self.emp))
-                self.conn.commit()
-                if overtime_pay > 0:
+                try:
+                    month = input('\nPay month (YYYY-MM, blank for current month) : ').strip()
+                    payroll.pay_period(month)
+                except ValueError:
+                    print('\n ⚠️ Invalid month format !!! Use YYYY-MM')
+                    continue
+                try:
+                    result = payroll.apply_overtime(self.conn,month = month,emp_id = self.emp,source = 'MANAGER')
+                except archive.archiveError as e:
+                    print(f'\n ⚠️ {e}')
+                    continue
+                if not result:
+                    print('\n ❌ No payroll record found for this employee.')
+                    continue
+                _,overtime_hours,overtime_pay = result[0]
+                if overtime_hours > 0:
                     print('\n 🎉 Overtime Pay Applied')
-                    print(f'🕒 Overtime Hours : {overtime[0]}')
-                    print(f'💰 Overtime Rate  : {overtime_rate:.2f}')
+                    print(f'🕒 Overtime Hours : {overtime_hours:.2f}')
+                    print(f'💰 Overtime Rate  : {employee[7] / payroll.WORKING_DAYS / payroll.HOURS_PER_DAY:.2f}')
                     print(f'💵 New OT Amount  : {overtime_pay:.2f}')
                 else:
-                    print('\n ⚠️ Overtime hours recorded are zero. No overtime pay added.')
+                    print('\n ❌ Salary processed without overtime pay. No overtime hours were recorded for this period.')
                 continue
             elif ch == '5':
                 print('\n\t-----------------------------------\n\t\t 🗂️ View Salary History \n\t-----------------------------------')
                 self.cursor.execute('''
-                                SELECT * FROM Payroll WHERE emp_id = ? 
+                                SELECT payroll_id, emp_id, basic_pay, allowance, deduction, overtime_pay, net_pay
+                                    FROM Payroll WHERE emp_id = ? 
                                     ''',(self.emp,))
-                salary_record = self.cursor.fetchall()
-                
-                print('\n-------------------------------------------------------------------------------------------------')
-                print('\n Payroll_ID  Emp_ID  Basic_pay  Allowance  Deduction  Overtime_pay  Net_Salary ')
-                print('\n-------------------------------------------------------------------------------------------------')
-                for i in salary_record:
-                        print(f'\n   {i[0]}\t\t{i[1]} \t {i[2]} \t {i[3]} \t\t {i[4]}\t\t{i[5]} \t {i[6]} ')
+                if not table.render(self.cursor,['Payroll_ID','Emp_ID','Basic_pay','Allowance','Deduction','Overtime_pay','Net_Salary']):
+                    print('\n ❌ No salary records found')
                 continue
             elif ch == '6':
                 print('\n Exiting 👋🏻👋🏻👋🏻')
@@ -1299,23 +1223,164 @@ class Manager:
             else:
                 print('\n ⚠️ Invalid choice !!!')
 
+    def payroll_run(self):
+        import archive
+        import departments
+        import payroll
+        print('\n\t--------------------------------------------------\n\t\t 🧾 PAYROLL RUN \n\t--------------------------------------------------')
+        try:
+            month = input('\nPay month (YYYY-MM, blank for current month) : ').strip()
+            payroll.pay_period(month)
+        except ValueError:
+            print('\n ⚠️ Invalid month format !!! Use YYYY-MM')
+            return
+        dept = input('\nDepartment Name (blank for all departments) : ').upper().strip()
+        dept_id = None
+        if dept:
+            dept_id = departments.dept_id(db.get_conn(),dept)
+            if dept_id is None:
+                print('\n ⚠️ Invalid Department Name !!!')
+                return
+        start,end = payroll.pay_period(month)
+        began = time.perf_counter()
+        try:
+            results = shards.by_department(db.get_conn(),payroll.run_payroll,month = month,dept_id = dept_id)
+        except archive.archiveError as e:
+            print(f'\n ⚠️ {e}')
+            return
+        processed = sum(i[0] for _,i in results)
+        elapsed = time.perf_counter() - began
+        print(f'\n ✅ Payroll processed for {start} to {end}')
+        print(f'\n 👥 Employees processed : {processed}')
+        print(f'\n ⏱️ Elapsed time        : {elapsed:.3f} s')
+
+    def overtime_run(self):
+        import archive
+        import departments
+        import payroll
+        print('\n\t--------------------------------------------------\n\t\t 🕒 OVERTIME PAY RUN \n\t--------------------------------------------------')
+        try:
+            month = input('\nPay month (YYYY-MM, blank for current month) : ').strip()
+            payroll.pay_period(month)
+        except ValueError:
+            print('\n ⚠️ Invalid month format !!! Use YYYY-MM')
+            return
+        dept = input('\nDepartment Name (blank for all departments) : ').upper().strip()
+        dept_id = None
+        if dept:
+            dept_id = departments.dept_id(db.get_conn(),dept)
+            if dept_id is None:
+                print('\n ⚠️ Invalid Department Name !!!')
+                return
+        start,end = payroll.pay_period(month)
+        began = time.perf_counter()
+        try:
+            result = shards.gather(shards.by_department(db.get_conn(),payroll.apply_overtime,month = month,dept_id = dept_id))
+        except archive.archiveError as e:
+            print(f'\n ⚠️ {e}')
+            return
+        elapsed = time.perf_counter() - began
+        print(f'\n ✅ Overtime pay set for {start} to {end}')
+        print(f'\n 👥 Employees with overtime : {sum(1 for i in result if i[1] > 0)} of {len(result)}')
+        print(f'\n 💵 Total overtime pay      : {sum(i[2] for i in result):.2f}')
+        print(f'\n ⏱️ Elapsed time            : {elapsed:.3f} s')
+
+    def import_employees(self):
+        import importer
+        print('\n\t--------------------------------------------------\n\t\t 📥 BULK EMPLOYEE IMPORT \n\t--------------------------------------------------')
+        print(f'\n CSV files need the columns : {", ".join(importer.FIELDS)} (manager_id optional)')
+        print(' JSONL files need one object per line with the same keys.')
+        path = input('\nFile path : ').strip()
+        try:
+            result = importer.import_employees(db.get_conn(),path,self.manager_id,report_path = path + '.errors.csv')
+        except OSError as e:
+            print(f'\n ⚠️ Unable to read file !!! {e}')
+            return
+        except importer.importError as e:
+            print(f'\n ⚠️ Import failed !!! {e}')
+            return
+        print(f'\n ✅ Employees imported : {result["imported"]}')
+        print(f'\n ❌ Rows rejected      : {result["failed"]}')
+        print(f'\n ⏱️ Elapsed time       : {result["elapsed"]:.3f} s')
+        if result['errors']:
+            for line_no,field,message in result['errors'][:10]:
+                print(f'\n   line {line_no} : {field} - {message}')
+            print(f'\n 📄 Full error report : {path}.errors.csv')
+
+    def export_data(self):
+        import departments
+        import export
+        print('\n\t--------------------------------------------------\n\t\t 📤 DATA EXPORT \n\t--------------------------------------------------')
+        names = list(export.EXPORTS)
+        for number,name in enumerate(names,1):
+            print(f'[{number}] {name}')
+        try:
+            name = names[int(input('\nSelect the data to export : ')) - 1]
+        except (ValueError,IndexError):
+            print('\n ⚠️ Invalid choice !!!')
+            return
+        path = input('\nOutput file (.csv / .jsonl, add .gz to compress) : ').strip()
+        if not path:
+            print('\n ⚠️ File name is required !!!')
+            return
+        try:
+            start = input('\nFrom date (YYYY-MM-DD, blank for no limit) : ').strip()
+            if start:
+                datetime.datetime.strptime(start, r"%Y-%m-%d")
+            end = input('\nTo date (YYYY-MM-DD, blank for no limit) : ').strip()
+            if end:
+                datetime.datetime.strptime(end, r"%Y-%m-%d")
+        except ValueError:
+            print('\n ⚠️ Invalid date format !!!')
+            return
+        dept = input('\nDepartment Name (blank for all departments) : ').upper().strip()
+        dept_id = None
+        if dept:
+            dept_id = departments.dept_id(db.get_conn(),dept)
+            if dept_id is None:
+                print('\n ⚠️ Invalid Department Name !!!')
+                return
+        try:
+            count,elapsed = export.export(report_conn(),name,path,start = start,end = end,dept_id = dept_id)
+        except OSError as e:
+            print(f'\n ⚠️ Unable to write file !!! {e}')
+            return
+        print(f'\n ✅ {count} rows exported to {path} in {elapsed:.3f} s')
+
+    def bulk_operations(self):
+        while True:
+            print('\n\t--------------------------------------------------\n\t\t 🗄️ BULK OPERATIONS \n\t--------------------------------------------------')
+            print('\n[1] 🧾 Run Payroll\n[2] 🕒 Overtime Pay Run\n[3] 📥 Import Employees (CSV / JSONL)\n[4] 📤 Export Data (CSV / JSONL)\n[5] 🔙 Back')
+            ch = input('\nSelect an option : ')
+            if ch == '1':
+                self.payroll_run()
+            elif ch == '2':
+                self.overtime_run()
+            elif ch == '3':
+                self.import_employees()
+            elif ch == '4':
+                self.export_data()
+            elif ch == '5':
+                break
+            else:
+                print('\n ⚠️ Invalid choice !!!')
+
 
 #--------------------------------------------------   EMPLOYEE CLASS   -------------------------------------------------#
 
 class Employee:
     def __init__(self,id):
         self.id = id
-        self.conn = sqlite3.connect('emp.db')
+        self.conn = db.get_conn()
         self.cursor = self.conn.cursor()
         self.cursor.execute('''
                             SELECT emp_id FROM Employee WHERE user_id = ?
                             ''',(self.id,))
         emp_id = self.cursor.fetchone()
         self.emp_id = emp_id[0]
-        self.conn.close()
 
     def change_password(self):
-        self.conn = sqlite3.connect('emp.db')
+        self.conn = db.get_conn()
         self.cursor = self.conn.cursor()
         print('\n\t--------------------------------------------------\n\t 🔐 CHANGE PASSWORD 🔐\n\t--------------------------------------------------')
         old_pw = getpass.getpass('\nEnter old password : ')
@@ -1356,36 +1421,34 @@ class Employee:
                                     UPDATE User SET password = ? WHERE user_id = ?
                                       ''',(new_pw,self.id))
                     self.conn.commit()
-                    self.conn.close()
                     print('\n ✔️ Password Updated Successfully. Please log in again to continue.')
                     break
         login()
 
     def view_profile(self):
-        self.conn = sqlite3.connect('emp.db')
+        import departments
+        self.conn = db.get_conn()
         self.cursor = self.conn.cursor()
         self.cursor.execute('''
                             SELECT name,dept_id,job_title,date_of_joining,salary,contact,email FROM Employee WHERE emp_id = ?
                             ''',(self.emp_id,))
         profile = self.cursor.fetchone()
-        self.cursor.execute('''
-                            SELECT dept_name FROM Department WHERE dept_id = ?
-                            ''',(profile[1],))
-        dept = self.cursor.fetchone()
+        dept = departments.dept_name(self.conn,profile[1])
         print('\n\t-------------------------\n\t 👤 EMPLOYEE PROFILE 👤\n\t-------------------------')   
         print(f'👤 Name            : {profile[0]}')
-        print(f'🏢 Department      : {dept[0]}')
+        print(f'🏢 Department      : {dept}')
         print(f'🧑‍💼 Designation   : {profile[2]}')
         print(f'📅 Date of Joining : {profile[3]}')
         print(f'💰 Salary          : ₹{profile[4]}')
         print(f'📞 Contact No.     : +91-{profile[5]}')
         print(f'📧 Email ID        : {profile[6]}')
-        self.conn.close()
 
     def edit_profile(self):
-        self.conn = sqlite3.connect('emp.db')
+        import departments
+        self.conn = db.get_conn()
         self.cursor = self.conn.cursor()
         updating = True
+        moved_from = None
         
         while updating:
             print('\n\t------------------------\n\t 🧾 Edit Your Details\n\t------------------------')
@@ -1415,18 +1478,12 @@ class Employee:
                     print('\n ✅ Name updated successfully!')
                     break
             elif choice == '2':
-                self.cursor.execute('''
-                                    SELECT dept_name FROM Department WHERE dept_id = ?
-                                ''',(profile[1],))
-                dept_name = self.cursor.fetchone()[0]
+                dept_name = departments.dept_name(self.conn,profile[1])
                 print(f'\nExisting Department Name on Profile : {dept_name}')
                 while True:
                     try:
                         dept = input('\nEnter the new department : ').upper()
-                        self.cursor.execute('''
-                                    SELECT dept_id FROM Department WHERE dept_name = ?
-                                ''',(dept,))
-                        dept_id = self.cursor.fetchone()
+                        dept_id = departments.dept_id(self.conn,dept)
                         if not dept_id:
                             raise charError
                     except charError:
@@ -1435,13 +1492,11 @@ class Employee:
                     if dept == dept_name:
                         print('\n 🚫 No changes detected !!! You entered the same department')
                         continue
-                    self.cursor.execute('''
-                                        SELECT dept_id FROM Department WHERE dept_name = ?        
-                                        ''',(dept,))
-                    dept_id = self.cursor.fetchone()
+                    if moved_from is None:
+                        moved_from = profile[1]
                     self.cursor.execute('''
                                         UPDATE Employee SET dept_id = ? WHERE emp_id = ? 
-                                        ''',(dept_id[0],self.emp_id))
+                                        ''',(dept_id,self.emp_id))
                     print('\n ✅ Department updated successfully!')
                     break
             elif choice == '3':
@@ -1520,6 +1575,8 @@ class Employee:
             elif choice == '7':
                 print('\n 💾 Changes saved successfully!')
                 self.conn.commit()
+                if moved_from is not None:
+                    shards.place(self.conn,[self.emp_id],from_dept = moved_from)
                 updating = False
                 break
             elif choice == '8':
@@ -1530,304 +1587,132 @@ class Employee:
                 print('\n ⚠️ Invalid choice !!!')
                 break
        
-        self.conn.close()
+        self.conn.rollback()
                
     
     def clock_in(self):
-        self.conn = sqlite3.connect('emp.db')
-        self.cursor = self.conn.cursor()
+        import attendance
+        self.conn = shards.route(db.get_conn(),self.emp_id)
 
         print('\n\t    ⏰ PUNCH IN  ')
-        
-        date = datetime.datetime.now().strftime(r'%Y-%m-%d')
-        time_in = datetime.datetime.now().strftime(r'%H:%M')
-        
-        status = 'PRESENT'
-        self.cursor.execute('''
-                            SELECT clock_in FROM Attendance WHERE emp_id = ? and date = ?
-                            ''',(self.emp_id,date))
-        marked = self.cursor.fetchone()
-        if marked:
-            print('\n ⚠️  You have already punched in today.')
-            self.conn.close()
+        try:
+            punch = attendance.punch_in(self.conn,self.emp_id)
+        except attendance.punchError as e:
+            print(f'\n ⚠️  {e}')
             return
-        self.cursor.execute('''
-                            INSERT INTO Attendance(emp_id,date,clock_in,status)
-                                VALUES (?,?,?,?)
-                            ''',(self.emp_id,date,time_in,status))
-        print(f'\n---------------------------------------------\n\tDATE : {date} \n ✔️ PUNCH-IN SUCCESSFUL !!!\n\tTIME : {time_in}\n---------------------------------------------')
-        self.conn.commit()
-        self.conn.close()
+        print(f'\n---------------------------------------------\n\tDATE : {punch["date"]} \n ✔️ PUNCH-IN SUCCESSFUL !!!\n\tTIME : {punch["time"]}\n---------------------------------------------')
 
     def clock_out(self):
-        self.conn = sqlite3.connect('emp.db')
-        self.cursor = self.conn.cursor()
+        import attendance
+        self.conn = shards.route(db.get_conn(),self.emp_id)
         print('\n\t-----------------------')
         print('\n\t   🕣 PUNCH - OUT ')
         print('\n\t-----------------------')
-        date = datetime.datetime.now().strftime(r'%Y-%m-%d')
-        time_out = datetime.datetime.now().strftime(r'%H:%M')
 
-        self.cursor.execute('''
-                            SELECT clock_in FROM Attendance WHERE emp_id = ? AND date = ?
-                            ''',(self.emp_id,date))
-        punched_in = self.cursor.fetchone()
+        def confirm(status):
+            if status == 'ABSENT':
+                print('\n ⚠️  Working hours are insufficient. You will be marked as Absent.')
+                answer = input('Are you sure you want to punch out? (Y/N): ').upper()
+            else:
+                print('\n ⚠️  You have not completed full-day hours. Punching out now will mark you as Half Day.')
+                answer = input('Do you still want to continue? (Y/N): ').upper()
+            return answer == 'Y'
 
-        if not punched_in:
-            print('\n ⚠️  You haven\'t punched in yet !!! Please punch in first.' )
+        try:
+            punch = attendance.punch_out(self.conn,self.emp_id,confirm = confirm)
+        except attendance.punchError as e:
+            print(f'\n ⚠️  {e}')
             return
-        
-        time_in = punched_in[0]
-        t_in = datetime.datetime.strptime(time_in, "%H:%M")
-        t_out = datetime.datetime.strptime(time_out, "%H:%M")
-        work_hours = 0
-        overtime = 0
-        self.cursor.execute('''
-                           SELECT clock_out FROM Attendance WHERE emp_id = ? AND date = ? 
-                            ''',(self.emp_id,date))
-        punched_out = self.cursor.fetchone()
-    
-        if punched_out and punched_out[0] is not None:
-            print('\n ⚠️  You have already punch out for today .')
+        if punch is None:
+            print('\n 🚫 Punch out Aborted ')
             return
         
-        work_hours += (t_out - t_in).seconds / 3600 
-        if work_hours > 8 :
-            status = 'OVERTIME'
-            overtime += work_hours - 8
-     
-        elif work_hours > 6 and work_hours <= 8:
-            status = 'PRESENT'
-        elif work_hours >= 4 :
-            status = 'HALF DAY'
-        else :
-            status = 'ABSENT'
-        self.cursor.execute('''
-                            SELECT total_leave
-                                FROM Leave_Balance WHERE emp_id = ?     
-                            ''',(self.emp_id,))
-        balance = self.cursor.fetchone()
-    
-        leave_balance = balance[0]
-        self.cursor.execute('''
-                            SELECT basic_pay,deduction FROM Payroll WHERE emp_id = ?
-                            ''',(self.emp_id,))
-        salary,deduction = self.cursor.fetchone()
-        if status == 'ABSENT':
-            print('\n ⚠️  Working hours are insufficient. You will be marked as Absent.')
-            confirm = input('Are you sure you want to punch out? (Y/N): ').upper()
-            if confirm != 'Y':
-                print('\n 🚫 Punch out Aborted ')
-                return
-            else:
-                if leave_balance != 0:
-                    leave_balance -= 1
-                else: 
-                    deduction += (salary / 25) 
- 
-        elif status == 'HALF DAY':
-            print('\n ⚠️  You have not completed full-day hours. Punching out now will mark you as Half Day.')
-            confirm = input('Do you still want to continue? (Y/N): ').upper()
-            if confirm != 'Y':
-                print('\n 🚫 Punch out Aborted ')
-                return
-            else:
-                if leave_balance != 0:
-                    leave_balance -= 0.5
-                else:
-                    deduction += (salary / 25) * 0.5
-
-        self.cursor.execute('''
-                            INSERT INTO Payroll(emp_id,deduction,basic_pay)
-                                VALUES (?,?,?)
-                         ''',(self.emp_id,deduction,salary))
-        self.cursor.execute('''
-                            UPDATE Leave_Balance SET total_leave = ? WHERE emp_id = ?
-                           ''', (leave_balance,self.emp_id))
-        self.cursor.execute('''
-                            UPDATE Attendance SET clock_out = ?,working_hours = ?, overtime_hours = ?,status = ? WHERE emp_id = ? AND date = ?
-                            ''',(time_out,work_hours,overtime,status,self.emp_id,date))
-        
         print('\n----------------------------------------------------------------')
-        print(f'\n\tDATE : {date} \n ✔️ PUNCH-OUT SUCCESSFUL !!!\n\tTIME : {time_out}')
+        print(f'\n\tDATE : {punch["date"]} \n ✔️ PUNCH-OUT SUCCESSFUL !!!\n\tTIME : {punch["time"]}')
         print('\n----------------------------------------------------------------')
-        self.conn.commit()
-        self.conn.close()
 
     def apply_leave(self):
-        self.conn = sqlite3.connect('emp.db')
-        self.cursor = self.conn.cursor()
+        import leave
+        self.conn = shards.route(db.get_conn(),self.emp_id)
 
-        self.cursor.execute('''
+        balance = self.conn.execute('''
                             SELECT  total_leave FROM Leave_Balance WHERE emp_id = ?
-                            ''', (self.emp_id,))
-        balance = self.cursor.fetchone()
+                            ''', (self.emp_id,)).fetchone()
    
-        if balance:
-            leave_balance = balance[0]
-            print(leave_balance)
-            paid_leave = 0  
-
-            print('\n\t---------------------------------')
-            print('\t  📝 LEAVE APPLICATION PORTAL')
-            print('\t---------------------------------')
-            print('\nPlease fill out the leave application form below by providing all the required details accurately.')
-            print('\n----------------------------------------------------------------------------------------------------')
-            print('\n\t 📝 LEAVE APPLICATION FORM \n\t-----------------------------')
-            print('\n[1] Casual Leave \n[2] Sick Leave \n[3] Earned Leave \n[4] Paid Leave')
-
-            ch = input('\nPlease Select Leave type : ')
-            leave_types = {'1': 'CASUAL LEAVE', '2': 'SICK LEAVE', '3': 'EARNED LEAVE', '4': 'PAID LEAVE'}
-            if ch not in leave_types:
-                print('\n ⚠️ Invalid Leave Type !!!')
-                self.conn.close()
-                return
-            leave_type = leave_types[ch]
-            status = 'PENDING'
-
-            try:
-                today = str(datetime.date.today())
-                today = datetime.datetime.strptime(today, "%Y-%m-%d")
-                start_date = input('\nLeave Start Date (YYYY-MM-DD): ')
-                start_dt = datetime.datetime.strptime(start_date, "%Y-%m-%d")
-                if start_dt < today:
-                    print('\n ⚠️ Leave application failed: The selected date cannot be earlier than the current date.')
-                    self.conn.close()
-                    return
-                end_date = input('Leave End Date (YYYY-MM-DD): ')
-                end_dt = datetime.datetime.strptime(end_date, "%Y-%m-%d")
-                if end_dt < start_dt:
-                    print("\n ⚠️ Leave application failed: End date cannot be earlier than the start date")
-                    self.conn.close()
-                    return
-            except ValueError:
-                print('\n ⚠️ Invalid Date format !!! Use YYYY-MM-DD')
-                self.conn.close()
-                return
-
-            leave_days = (end_dt - start_dt).days + 1
-            print(f'Leave Duration: {leave_days} day(s)')
-
-            if leave_days > leave_balance:
-                print('\n ⚠️ Insufficient leave balance! Additional days will be processed as paid leave.')
-                confirm = input('Do you wish to proceed? (Y/N): ')
-                if confirm.upper() != 'Y':
-                    print('\n ❌ Leave request cancelled')
-                    self.conn.close()
-                    return
-                
-                paid_leave = leave_days - leave_balance
-                leave_type = 'PAID LEAVE'
-                new_balance = 0
-            new_balance = max(0, leave_balance - leave_days)
-            self.cursor.execute('''
-                            UPDATE Leave_Balance SET total_leave = ? WHERE emp_id = ?
-                                ''', (new_balance, self.emp_id))
-        else:
+        if not balance:
             print("\n ⚠️ Leave balance not found for this employee!\nIf you continue, the requested leave may be treated as paid leave and could lead to salary deductions.")
             confirm = input('\nWould you like to proceed? (Y/N): ')
             if confirm.upper() != 'Y':
                 print('\n ❌ Leave request cancelled')
-                self.conn.close()
                 return
-            else:
-                print('\n\t---------------------------------')
-            print('\t  📝 LEAVE APPLICATION PORTAL')
-            print('\t---------------------------------')
-            print('\nPlease fill out the leave application form below by providing all the required details accurately.')
-            print('\n----------------------------------------------------------------------------------------------------')
-            print('\n\t 📝 LEAVE APPLICATION FORM \n\t-----------------------------')
-            print('\n[1] Casual Leave \n[2] Sick Leave \n[3] Earned Leave \n[4] Paid Leave')
 
+        print('\n\t---------------------------------')
+        print('\t  📝 LEAVE APPLICATION PORTAL')
+        print('\t---------------------------------')
+        print('\nPlease fill out the leave application form below by providing all the required details accurately.')
+        print('\n----------------------------------------------------------------------------------------------------')
+        print('\n\t 📝 LEAVE APPLICATION FORM \n\t-----------------------------')
+        print('\n[1] Casual Leave \n[2] Sick Leave \n[3] Earned Leave \n[4] Paid Leave')
+
+        if balance:
+            ch = input('\nPlease Select Leave type : ')
+            if ch not in leave.LEAVE_TYPES:
+                print('\n ⚠️ Invalid Leave Type !!!')
+                return
+            leave_type = leave.LEAVE_TYPES[ch]
+        else:
             print('\nLeave type : PAID LEAVE')
             leave_type = 'PAID LEAVE'
-            status = 'PENDING'
-            try:
-                today = str(datetime.date.today())
-                today = datetime.datetime.strptime(today, "%Y-%m-%d")
-                start_date = input('\nLeave Start Date (YYYY-MM-DD): ')
-                start_dt = datetime.datetime.strptime(start_date, "%Y-%m-%d")
-                if start_dt < today:
-                    print('\n ⚠️ Leave application failed: The selected date cannot be earlier than the current date.')
-                    self.conn.close()
-                    return
-                end_date = input('Leave End Date (YYYY-MM-DD): ')
-                end_dt = datetime.datetime.strptime(end_date, "%Y-%m-%d")
-                if end_dt < start_dt:
-                    print("\n ⚠️ Leave application failed: End date cannot be earlier than the start date")
-                    self.conn.close()
-                    return
-            except ValueError:
-                print('\n ⚠️ Invalid Date format !!! Use YYYY-MM-DD')
-                self.conn.close()
-                return
 
-            leave_days = (end_dt - start_dt).days + 1
-            print(f'Leave Duration: {leave_days} day(s)')
-            paid_leave = leave_days
-        self.cursor.execute('''
-            INSERT INTO Leave_Record(emp_id,leave_type,start_date,end_date,leave_duration, status)
-                VALUES (?,?,?,?,?,?)
-        ''', (self.emp_id,leave_type, start_date, end_date, leave_days, status))
+        try:
+            start_date = input('\nLeave Start Date (YYYY-MM-DD): ')
+            leave.leave_days(start_date,start_date)
+            end_date = input('Leave End Date (YYYY-MM-DD): ')
+            leave_days = leave.leave_days(start_date,end_date)
+        except leave.leaveError as e:
+            print(f'\n ⚠️ {e}')
+            return
+        print(f'Leave Duration: {leave_days} day(s)')
 
-        if paid_leave > 0:
-            self.cursor.execute('''
-                                SELECT basic_pay, deduction FROM Payroll WHERE emp_id = ?
-                                ''', (self.emp_id,))
-            result = self.cursor.fetchone()
-            if result:
-                salary, deduction = result
-                deduction += (salary / 25) * paid_leave  
-                self.cursor.execute('''
-                    UPDATE Payroll SET deduction = ? WHERE emp_id = ?
-                ''', (deduction, self.emp_id))
-            new_balance = 0
-        self.conn.commit()
-        self.conn.close()
-        print('\n Leave request send 📩')
-        if paid_leave > 0:
-            print(f'⚠️ {paid_leave} day(s) will be deducted from salary as paid leave.')
+        if balance and leave_days > balance[0]:
+            print('\n ⚠️ Insufficient leave balance! Additional days will be processed as paid leave.')
+            confirm = input('Do you wish to proceed? (Y/N): ')
+            if confirm.upper() != 'Y':
+                print('\n ❌ Leave request cancelled')
+                return
+
+        result = leave.apply_leave(self.conn,self.emp_id,leave_type,start_date,end_date,allow_paid = True)
+        if result['status'] == 'APPROVED':
+            print('\n Leave request approved automatically ✅')
+        else:
+            print('\n Leave request send 📩')
+        if result['paid_leave'] > 0:
+            print(f'⚠️ {result["paid_leave"]} day(s) will be deducted from salary as paid leave.')
 
     def view_leave_status(self):
-        self.conn = sqlite3.connect('emp.db')
+        import leave
+        self.conn = shards.route(db.get_conn(),self.emp_id)
         self.cursor = self.conn.cursor()
 
-        total = 42
-       
+        summary = leave.leave_summary(self.conn,self.emp_id)
         self.cursor.execute('''
                             SELECT leave_id,start_date,end_date,leave_type,status FROM Leave_Record WHERE emp_id = ?
                             ''',(self.emp_id,))
         applied = self.cursor.fetchall()
-        self.cursor.execute('''
-                            SELECT * FROM Leave_Record WHERE emp_id = ? AND status = 'PENDING'
-                            ''',(self.emp_id,))
-        pending = self.cursor.fetchall()
-        self.cursor.execute('''
-                            SELECT * FROM Leave_Record WHERE emp_id = ? AND status = 'APPROVED'
-                            ''',(self.emp_id,))
-        approved = self.cursor.fetchall()
-        leave_taken = 0
-        for i in approved:
-            leave_taken += i[5]
-        self.cursor.execute('''
-                            SELECT * FROM Leave_Record WHERE emp_id = ? AND status = 'REJECTED'
-                            ''',(self.emp_id,))
-        rejected = self.cursor.fetchall()
         date = datetime.datetime.now().strftime(r'%Y-%m-%d')
         
-        remaining = total - leave_taken
         print('\n\t---------------------------------------------')
         print('\n\t\t📝🌟 LEAVE STATUS DASHBOARD')
         print('\n\t---------------------------------------------')
         print(f'\n\t 👤 Employee ID   : {self.emp_id}')
         print(f'\n\t 📅 As of Date    : {date}')
         print('\n\t---------------------------------------------')
-        print(f'\n\t 🌴 Total Leave       : {total}')
-        print(f'\n\t 🟢 Leave Taken       : {leave_taken}')
-        print(f'\n\t ⚪ Remaining Leave   : {remaining}')
-        print(f'\n\t ⏳ Pending Leave     : {len(pending)}')
-        print(f'\n\t ✅ Approved Leave    : {len(approved)}')
-        print(f'\n\t ❌ Rejected Leave    : {len(rejected)}')
+        print(f'\n\t 🌴 Total Leave       : {summary["entitlement"]}')
+        print(f'\n\t 🟢 Leave Taken       : {summary["approved_days"]:g}')
+        print(f'\n\t ⚪ Remaining Leave   : {summary["balance"]}')
+        print(f'\n\t ⏳ Pending Leave     : {summary["pending"]}')
+        print(f'\n\t ✅ Approved Leave    : {summary["approved"]}')
+        print(f'\n\t ❌ Rejected Leave    : {summary["rejected"]}')
         print('\n\t---------------------------------------------')
         if applied:
             print(f'\n\t 🗓️  Applied Leave Records:')
@@ -1840,32 +1725,20 @@ class Employee:
                 print(f'\n\t {i[0]} \t\t {i[1]} \t {i[2]} \t {i[3]} \t {i[4]}')
             print('\n\t---------------------------------------------------------------------------------------')
 
-        self.conn.close()
-
     def view_salary_details(self):
-        self.conn = sqlite3.connect('emp.db')
+        import departments
+        import payroll
+        self.conn = shards.route(db.get_conn(),self.emp_id)
         self.cursor = self.conn.cursor()
 
-        self.cursor.execute('''
-                                SELECT * FROM Payroll WHERE emp_id = ?
-                                    ''',(self.emp_id,))
-        salary_record = self.cursor.fetchone()
+        salary_record = payroll.salary_record(self.conn,self.emp_id)
         self.cursor.execute('''
                         SELECT dept_id,name,job_title FROM Employee WHERE emp_id = ?
                             ''',(self.emp_id,))
         emp = self.cursor.fetchone()
-        self.cursor.execute('''
-                        SELECT dept_name FROM Department WHERE dept_id = ?
-                          ''',(emp[0],))
-        dept = self.cursor.fetchone()
+        dept = departments.dept_name(self.conn,emp[0])
 
-        net_salary = salary_record[2] + salary_record[3] - salary_record[4] + salary_record[5]
-
-        self.cursor.execute('''
-                      UPDATE Payroll SET net_pay = ? WHERE emp_id = ? 
-                         ''',(net_salary,self.emp_id))
-        self.conn.commit()
-        self.conn.close()      
+        net_salary = salary_record[6]
         print('\n-------------------------------------------------------')
         print('\n\t\t💰💰💰 SALARY SLIP 💰💰💰')
         print('\n-------------------------------------------------------')
@@ -1873,7 +1746,7 @@ class Employee:
         print(f'\nPayroll ID       : {salary_record[0]}')
         print(f'\nEmployee ID      : {salary_record[1]}')
         print(f'\nEmployee Name    : {emp[1]}')
-        print(f'\nDepartment       : {dept[0]}')
+        print(f'\nDepartment       : {dept}')
         print(f'\nDesignation      : {emp[2]}')
         print('\n-------------------------------------------------------')
         print(f'\nBasic Salary     : ₹ {salary_record[2]}')               
@@ -1888,7 +1761,15 @@ class Employee:
 #------------------------------------------------------ MAIN MENU ----------------------------------------------------------------#
 
 def main():
-    setup_db()
+    querylog.enable_from_env()
+    profiler.enable_from_env()
+    snapshot.start_from_env()
+    try:
+        setup_db()
+    except migrations.migrationError as e:
+        print(f'\n ⚠️ {e}')
+        db.close_all()
+        return
 
     while True:
         print('\n=========================================================================================')
@@ -1902,9 +1783,10 @@ def main():
             print('\n ⚠️ Invalid choice !!!')
             continue
         if choice == '1':
-            register()
+            profiler.run(register)
+            db.get_conn().rollback()
         elif choice == '2':
-            user = login()
+            user = profiler.run(login)
             if user:
                 id = user[0]
                 role = user[3]
@@ -1914,6 +1796,7 @@ def main():
                     employee_portal(id)
         elif choice == '3':
             print('\n 🌟 Thank you for visiting Employee Management System 🌟 Have a nice day 🌟\n')
+            db.close_all()
             break
         else:
             print('\n ⚠️ Invalid choice !!! ')
@@ -1921,7 +1804,7 @@ def main():
 #---------------------------------------------------------- MANAGER PORTAL ----------------------------------------------------------#
 
 def manager_portal(id):
-    conn = sqlite3.connect('emp.db')
+    conn = db.get_conn()
     cursor = conn.cursor()
 
     manager = Manager(id)
@@ -1935,35 +1818,38 @@ def manager_portal(id):
     print(f'\n************* 👤 Welcome {name} 👤 *************')
     while True:
         print('\n==============================================================\n\t 👨‍💼  MANAGER  DASHBOARD \n==============================================================')
-        print('\n[1] 👥 View all employees \n[2] ➕ Add employee\n[3] ✏️ Edit Employee Details \n[4] 🗑️ Delete Employee \n[5] 🔍 Search Employee \n[6] 🕓 View attendance details\n[7] 📅 Manage Leave Applications\n[8] 💰 Manage Employee Salary \n[9] 🚪 Logout')
+        print('\n[1] 👥 View all employees \n[2] ➕ Add employee\n[3] ✏️ Edit Employee Details \n[4] 🗑️ Delete Employee \n[5] 🔍 Search Employee \n[6] 🕓 View attendance details\n[7] 📅 Manage Leave Applications\n[8] 💰 Manage Employee Salary \n[9] 🗄️ Bulk Operations \n[10] 🚪 Logout')
         ch = input('Enter your choice : ')
         if ch == '1':
-            manager.view_employees()
+            profiler.run(manager.view_employees)
         elif ch == '2':
-            manager.add_emp()           
+            profiler.run(manager.add_emp)           
         elif ch == '3':
-            manager.update_emp()
+            profiler.run(manager.update_emp)
         elif ch == '4':
-            manager.delete_emp()
+            profiler.run(manager.delete_emp)
         elif ch =='5':
-            manager.search_emp()
+            profiler.run(manager.search_emp)
         elif ch == '6':
-            manager.view_attendance()
+            profiler.run(manager.view_attendance)
         elif ch == '7':
-            manager.manage_leave()
+            profiler.run(manager.manage_leave)
         elif ch == '8':
-            manager.manage_salary()
+            profiler.run(manager.manage_salary)
         elif ch == '9':
+            profiler.run(manager.bulk_operations)
+        elif ch == '10':
             print(f'\n 👤 {name} 👤 Logging out...✅')
             break
         else:
             print('⚠️ Invalid choice!!!')
-    conn.close()
+        # Drop anything the action left uncommitted on the shared connection
+        conn.rollback()
 
 #------------------------------------------------------- EMPLOYEE PORTAL  ------------------------------------------------------------#
 
 def employee_portal(id):
-    conn = sqlite3.connect('emp.db')
+    conn = db.get_conn()
     cursor = conn.cursor()
     
     employee = Employee(id)
@@ -1972,7 +1858,6 @@ def employee_portal(id):
                    SELECT name FROM Employee WHERE user_id = ?
                    ''',(id,))
     name = cursor.fetchone()[0]
-    conn.close()
 
     print(f'\n************* 👤 Welcome {name} 👤 *************')
     while True:
@@ -1984,29 +1869,36 @@ def employee_portal(id):
             print('⚠️ Invalid choice!!!')
             continue
         if ch == '1':
-            employee.change_password()
+            profiler.run(employee.change_password)
         elif ch == '2':
-            employee.view_profile()
+            profiler.run(employee.view_profile)
         elif ch == '3':
-            employee.edit_profile()   
+            profiler.run(employee.edit_profile)   
         elif ch == '4':
-            employee.clock_in()    
+            profiler.run(employee.clock_in)    
         elif ch == '5':
-            employee.clock_out()
+            profiler.run(employee.clock_out)
         elif ch == '6':
-            employee.apply_leave()
+            profiler.run(employee.apply_leave)
         elif ch == '7':
-            employee.view_leave_status()
+            profiler.run(employee.view_leave_status)
         elif ch == '8':
-            employee.view_salary_details()
+            profiler.run(employee.view_salary_details)
         elif ch == '9':
             print(f'\n👤 {name} 👤 Logging out...✅')
             break
         else:
             print('\n ⚠️ Invalid choice!!!')
+        # Drop anything the action left uncommitted on the shared connection
+        conn.rollback()
     
 
-main()
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        import cli
+        sys.exit(cli.main(sys.argv[1:]))
+    main()
 
        
                     
\ No newline at end of file
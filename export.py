@@ -0,0 +1,109 @@
+#------------------------------------------- DATA EXPORT ----------------------------------------------#
+
+import csv
+import heapq
+import operator
+import time
+
+import archive
+import shards
+
+BATCH_SIZE = 1000
+
+# name : (query, primary key, date column used for range filters)
+EXPORTS = {
+    'employees': ('SELECT t.* FROM Employee t', 't.emp_id', 't.date_of_joining'),
+    'attendance': ('SELECT t.* FROM Attendance t', 't.att_id', 't.date'),
+    'leave': ('SELECT t.* FROM Leave_Record t', 't.leave_id', 't.start_date'),
+    'payroll': ('SELECT t.* FROM Payroll t', 't.payroll_id', 't.pay_date'),
+    'employee_departments': ('''
+        SELECT t.emp_id, t.name, d.dept_name, t.job_title, t.date_of_joining, t.salary, t.contact, t.email, t.manager_id
+            FROM Employee t LEFT JOIN Department d ON d.dept_id = t.dept_id
+        ''', 't.emp_id', 't.date_of_joining'),
+    'attendance_details': ('''
+        SELECT t.att_id, t.emp_id, e.name, d.dept_name, t.date, t.clock_in, t.clock_out,
+               t.working_hours, t.overtime_hours, t.status
+            FROM Attendance t JOIN Employee e ON e.emp_id = t.emp_id
+            LEFT JOIN Department d ON d.dept_id = e.dept_id
+        ''', 't.att_id', 't.date'),
+}
+
+# Exports of the per-employee tables, which live in the department shards once emp.db is split
+SHARDED = ('attendance', 'leave', 'payroll', 'attendance_details')
+
+
+def stream_rows(conn, name, start=None, end=None, dept_id=None, batch_size=BATCH_SIZE):
+    # Returns the column names and a generator that pulls batch_size rows at a time
+    if name not in SHARDED or not shards.is_sharded(conn):
+        return _stream(conn, name, start, end, dept_id, batch_size)
+    # Each shard is read in key order and the streams are merged on the key, the first column. The
+    # department filter stays on : archived attendance is shared by every shard.
+    dept_ids = shards.shard_ids(conn) if dept_id is None else [dept_id]
+    streams = [_stream(shards.route(conn, dept_id=shard), name, start, end, shard, batch_size) for shard in dept_ids]
+    return streams[0][0], heapq.merge(*(rows for _, rows in streams), key=operator.itemgetter(0))
+
+
+def _stream(conn, name, start, end, dept_id, batch_size):
+    query, key, date_column = EXPORTS[name]
+    if 'FROM Attendance t' in query:
+        # Ranges reaching an archived year read the archives too
+        query = query.replace('FROM Attendance t', f'FROM {archive.attendance_source(conn, start)} t')
+    clauses = []
+    params = []
+    if start:
+        clauses.append(f'{date_column} >= ?')
+        params.append(start)
+    if end:
+        clauses.append(f'{date_column} <= ?')
+        params.append(end)
+    if dept_id is not None:
+        clauses.append('t.emp_id IN (SELECT emp_id FROM Employee WHERE dept_id = ?)')
+        params.append(dept_id)
+    if clauses:
+        query += ' WHERE ' + ' AND '.join(clauses)
+    query += f' ORDER BY {key}'
+
+    cursor = conn.execute(query, params)
+    columns = [column[0] for column in cursor.description]
+
+    def rows():
+        try:
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield from batch
+        finally:
+            cursor.close()
+
+    return columns, rows()
+
+
+def open_output(path, compress=None):
+    if compress is None:
+        compress = path.endswith('.gz')
+    if compress:
+        import gzip
+        return gzip.open(path, 'wt', compresslevel=6, newline='', encoding='utf-8')
+    return open(path, 'w', newline='', encoding='utf-8')
+
+
+def export(conn, name, path, fmt=None, start=None, end=None, dept_id=None, compress=None):
+    if fmt is None:
+        fmt = 'jsonl' if path.removesuffix('.gz').endswith(('.jsonl', '.ndjson')) else 'csv'
+    began = time.perf_counter()
+    columns, rows = stream_rows(conn, name, start, end, dept_id)
+    count = 0
+    with open_output(path, compress) as file:
+        if fmt == 'jsonl':
+            import json
+            for row in rows:
+                file.write(json.dumps(dict(zip(columns, row))) + '\n')
+                count += 1
+        else:
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+    return count, time.perf_counter() - began
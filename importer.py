@@ -0,0 +1,220 @@
+#------------------------------------------- BULK EMPLOYEE IMPORT ----------------------------------------------#
+
+import csv
+import datetime
+import re
+import time
+
+import db
+import departments as department_cache
+import shards
+
+BATCH_SIZE = 500
+LEAVE_ENTITLEMENT = 42
+
+FIELDS = ['username','password','name','department','designation','date_of_joining','salary','contact','email']
+
+# Same rules the registration prompts in ems.py enforce
+NAME_PATTERN = r'[A-Za-z ]+'
+CONTACT_PATTERN = r'\d{10}'
+EMAIL_PATTERN = r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}'
+
+
+class importError(Exception):
+    pass
+
+
+def read_rows(path):
+    # Yields (line number, row dict); a row that cannot be parsed comes back as an error string
+    with open(path, 'r', newline='', encoding='utf-8') as file:
+        if path.lower().endswith(('.jsonl', '.ndjson')):
+            import json
+            for line_no, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_no, f'invalid JSON ({e})'
+                    continue
+                if not isinstance(row, dict):
+                    yield line_no, 'invalid JSON (expected an object)'
+                    continue
+                yield line_no, row
+        else:
+            reader = csv.DictReader(file)
+            missing = [field for field in FIELDS if field not in (reader.fieldnames or [])]
+            if missing:
+                raise importError(f'missing columns : {", ".join(missing)}')
+            for row in reader:
+                yield reader.line_num, row
+
+
+def check_username(username):
+    if not username:
+        return 'username is required'
+    if username.isdigit():
+        return 'username should contain letters'
+    if len(username) <= 3:
+        return 'username should contain more than 3 letters'
+    if not username.isalnum():
+        return 'username should not contain special characters'
+
+
+def check_password(password):
+    if len(password) < 6:
+        return 'password must be at least 6 characters'
+    if not re.search(r'[A-Z]', password):
+        return 'password must contain an uppercase letter'
+    if not re.search(r'[a-z]', password):
+        return 'password must contain a lowercase letter'
+    if not re.search(r'[0-9]', password):
+        return 'password must contain a digit'
+    if not re.search(r'[@#$%^&*-_!]', password):
+        return 'password must contain a special character'
+
+
+def validate_row(row, departments, managers, default_manager):
+    def value(field):
+        return str(row.get(field) or '').strip()
+
+    errors = []
+
+    username = value('username').lower()
+    problem = check_username(username)
+    if problem:
+        errors.append(('username', problem))
+    password = str(row.get('password') or '')
+    problem = check_password(password)
+    if problem:
+        errors.append(('password', problem))
+
+    name = value('name').upper()
+    if not re.fullmatch(NAME_PATTERN, name):
+        errors.append(('name', 'use letters and spaces only'))
+    dept_id = departments.get(value('department').upper())
+    if dept_id is None:
+        errors.append(('department', f'unknown department {value("department")!r}'))
+    title = value('designation').upper()
+    if not re.fullmatch(NAME_PATTERN, title):
+        errors.append(('designation', 'use letters and spaces only'))
+    join_date = value('date_of_joining')
+    try:
+        datetime.datetime.strptime(join_date, r'%Y-%m-%d')
+    except ValueError:
+        errors.append(('date_of_joining', 'expected YYYY-MM-DD'))
+    try:
+        salary = int(value('salary'))
+    except ValueError:
+        salary = None
+        errors.append(('salary', 'salary should be a number'))
+    contact = value('contact')
+    if not re.fullmatch(CONTACT_PATTERN, contact):
+        errors.append(('contact', 'contact number should contain exactly 10 digits'))
+    email = value('email').lower()
+    if not re.fullmatch(EMAIL_PATTERN, email):
+        errors.append(('email', 'invalid mail id'))
+
+    manager_id = default_manager
+    if value('manager_id'):
+        try:
+            manager_id = int(value('manager_id'))
+        except ValueError:
+            manager_id = None
+        if manager_id not in managers:
+            errors.append(('manager_id', f'unknown manager {value("manager_id")!r}'))
+
+    if errors:
+        return None, errors
+    return (username, password, name, dept_id, title, join_date, salary, contact, email, manager_id), []
+
+
+def _next_id(conn, table, column):
+    # AUTOINCREMENT never reuses an id, so start past both the sequence and the table
+    seq = conn.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,)).fetchone()
+    top = conn.execute(f'SELECT MAX({column}) FROM {table}').fetchone()[0]
+    return max(seq[0] if seq else 0, top or 0) + 1
+
+
+def _flush(conn, batch, errors):
+    # Usernames already taken are reported, the rest of the batch is written; returns the new emp_ids
+    marks = ','.join('?' * len(batch))
+    taken = {row[0] for row in conn.execute(f'SELECT username FROM User WHERE username IN ({marks})',
+                                            [record[0] for _, record in batch])}
+    rows = []
+    for line_no, record in batch:
+        if record[0] in taken:
+            errors.append((line_no, 'username', 'username already exists'))
+        else:
+            rows.append(record)
+    if not rows:
+        return []
+    return insert_records(conn, rows)
+
+
+def insert_records(conn, rows):
+    # Caller holds the write lock (BEGIN IMMEDIATE), so ids can be handed out up front
+    user_id = _next_id(conn, 'User', 'user_id')
+    emp_id = _next_id(conn, 'Employee', 'emp_id')
+    users, employees, payroll, balances = [], [], [], []
+    for offset, (username, password, name, dept_id, title, join_date, salary, contact, email, manager_id) in enumerate(rows):
+        users.append((user_id + offset, username, password, 0))
+        employees.append((emp_id + offset, user_id + offset, dept_id, manager_id, name, title, join_date, salary, contact, email,
+                          LEAVE_ENTITLEMENT))
+        payroll.append((emp_id + offset, salary, salary))
+        balances.append((emp_id + offset, LEAVE_ENTITLEMENT))
+
+    conn.executemany('INSERT INTO User(user_id,username,password,role_id) VALUES (?,?,?,?)', users)
+    conn.executemany('''
+                    INSERT INTO Employee(emp_id,user_id,dept_id,manager_id,name,job_title,date_of_joining,salary,contact,email,leave_entitlement)
+                        VALUES (?,?,?,?,?,?,?,?,?,?,?)
+                    ''', employees)
+    conn.executemany('''
+                    INSERT INTO Payroll(emp_id,basic_pay,allowance,deduction,overtime_pay,net_pay)
+                        VALUES (?,?,0,0,0,?)
+                    ''', payroll)
+    conn.executemany('INSERT INTO Leave_Balance(emp_id,total_leave) VALUES (?,?)', balances)
+    return list(range(emp_id, emp_id + len(rows)))
+
+
+def import_employees(conn, path, manager_id, report_path=None, batch_size=BATCH_SIZE):
+    began = time.perf_counter()
+    departments = department_cache.name_to_id(conn)
+    managers = {row[0] for row in conn.execute('SELECT manager_id FROM Manager')}
+    errors = []
+    imported = []
+    seen = set()
+    batch = []
+
+    conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    with db.transaction(conn):
+        for line_no, row in read_rows(path):
+            if isinstance(row, str):
+                errors.append((line_no, 'row', row))
+                continue
+            record, problems = validate_row(row, departments, managers, manager_id)
+            if problems:
+                errors.extend((line_no, field, message) for field, message in problems)
+                continue
+            if record[0] in seen:
+                errors.append((line_no, 'username', 'duplicate username in file'))
+                continue
+            seen.add(record[0])
+            batch.append((line_no, record))
+            if len(batch) >= batch_size:
+                imported += _flush(conn, batch, errors)
+                batch = []
+        if batch:
+            imported += _flush(conn, batch, errors)
+    # Sharded, the new Payroll / Leave_Balance rows move from emp.db to the departments' shards
+    shards.place(conn, imported)
+
+    errors.sort()
+    if report_path:
+        with open(report_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(['line','field','error'])
+            writer.writerows(errors)
+    failed = len({line_no for line_no, _, _ in errors})
+    return {'imported': len(imported), 'failed': failed, 'errors': errors, 'elapsed': time.perf_counter() - began}
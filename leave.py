@@ -0,0 +1,215 @@
+#------------------------------------------- LEAVE ----------------------------------------------#
+
+import datetime
+
+import db
+import payroll
+
+LEAVE_TYPES = {'1': 'CASUAL LEAVE', '2': 'SICK LEAVE', '3': 'EARNED LEAVE', '4': 'PAID LEAVE'}
+WORKING_DAYS = 25
+STATUSES = ('PENDING', 'APPROVED', 'REJECTED')
+
+# Request count and days per status, aggregated over Leave_Record r
+_SUMMARY = ', '.join(['COUNT(r.leave_id)'] + [
+    f"COUNT(CASE WHEN r.status = '{status}' THEN 1 END), TOTAL(CASE WHEN r.status = '{status}' THEN r.leave_duration END)"
+    for status in STATUSES])
+
+
+class leaveError(Exception):
+    pass
+
+
+def leave_days(start_date, end_date, today=None):
+    today = today or datetime.date.today()
+    try:
+        start_dt = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()
+        end_dt = datetime.datetime.strptime(end_date, '%Y-%m-%d').date()
+    except ValueError:
+        raise leaveError('Invalid Date format !!! Use YYYY-MM-DD')
+    if start_dt < today:
+        raise leaveError('Leave application failed: The selected date cannot be earlier than the current date.')
+    if end_dt < start_dt:
+        raise leaveError('Leave application failed: End date cannot be earlier than the start date')
+    return (end_dt - start_dt).days + 1
+
+
+def apply_leave(conn, emp_id, leave_type, start_date, end_date, allow_paid=False, today=None):
+    # Days beyond the leave balance become paid leave, which needs allow_paid
+    days = leave_days(start_date, end_date, today)
+    balance = conn.execute('''
+                        SELECT total_leave FROM Leave_Balance WHERE emp_id = ?
+                        ''',(emp_id,)).fetchone()
+    if balance is None:
+        paid_leave = days
+        leave_type = 'PAID LEAVE'
+    elif days > balance[0]:
+        paid_leave = days - balance[0]
+        leave_type = 'PAID LEAVE'
+    else:
+        paid_leave = 0
+    if paid_leave and not allow_paid:
+        raise leaveError(f'Insufficient leave balance! {paid_leave} day(s) would be processed as paid leave.')
+
+    with db.transaction(conn):
+        if balance is not None:
+            conn.execute('''
+                        UPDATE Leave_Balance SET total_leave = ? WHERE emp_id = ?
+                        ''',(max(0, balance[0] - days),emp_id))
+        cursor = conn.execute('''
+                        INSERT INTO Leave_Record(emp_id,leave_type,start_date,end_date,leave_duration,status)
+                            VALUES (?,?,?,?,?,?)
+                        ''',(emp_id,leave_type,start_date,end_date,days,'PENDING'))
+        leave_id = cursor.lastrowid
+        # Routine requests that a rule covers are approved as they are filed; paid leave never is
+        rule = None if paid_leave else matching_rule(conn, emp_id, leave_type, days, balance[0] - days)
+        if rule is not None:
+            conn.execute('''
+                        UPDATE Leave_Record SET status = 'APPROVED' WHERE leave_id = ?
+                        ''',(leave_id,))
+        if paid_leave:
+            result = conn.execute('''
+                        SELECT basic_pay FROM Payroll WHERE emp_id = ? ORDER BY payroll_id LIMIT 1
+                        ''',(emp_id,)).fetchone()
+            if result:
+                payroll.adjust(conn, emp_id, 'DEDUCTION', (result[0] / WORKING_DAYS) * paid_leave,
+                               payroll.period_of(start_date), 'PAID LEAVE')
+    return {'leave_id': leave_id, 'leave_type': leave_type, 'leave_days': days, 'paid_leave': paid_leave,
+            'status': 'PENDING' if rule is None else 'APPROVED', 'rule_id': rule}
+
+
+def decide_leave(conn, leave_id, status):
+    if status not in ('APPROVED', 'REJECTED'):
+        raise leaveError(f'Unknown decision {status!r}')
+    with db.transaction(conn):
+        cursor = conn.execute('''
+                        UPDATE Leave_Record SET status = ? WHERE leave_id = ? AND status = 'PENDING'
+                        ''',(status,leave_id))
+    if not cursor.rowcount:
+        raise leaveError(f'No pending leave request with ID {leave_id}')
+
+
+def _pending_filter(emp_id=None, dept_id=None, manager_id=None, leave_type=None, start=None, end=None, max_days=None):
+    # WHERE clause over Leave_Record r matching PENDING requests; start / end bound the leave dates
+    clauses = ["r.status = 'PENDING'"]
+    params = {}
+    for column, value in (('emp_id', emp_id), ('leave_type', leave_type)):
+        if value is not None:
+            clauses.append(f'r.{column} = :{column}')
+            params[column] = value
+    for column, value in (('dept_id', dept_id), ('manager_id', manager_id)):
+        if value is not None:
+            clauses.append(f'r.emp_id IN (SELECT emp_id FROM Employee WHERE {column} = :{column})')
+            params[column] = value
+    if start is not None:
+        clauses.append('r.start_date >= :start')
+        params['start'] = start
+    if end is not None:
+        clauses.append('r.end_date <= :end')
+        params['end'] = end
+    if max_days is not None:
+        clauses.append('r.leave_duration <= :max_days')
+        params['max_days'] = max_days
+    return ' AND '.join(clauses), params
+
+
+def pending_leave(conn, **filters):
+    # PENDING requests a decide_by_filter() with the same filters would decide
+    where, params = _pending_filter(**filters)
+    return conn.execute(f'''
+                        SELECT r.* FROM Leave_Record r WHERE {where} ORDER BY r.leave_id
+                        ''',params).fetchall()
+
+
+def decide_by_filter(conn, status, **filters):
+    # Approves or rejects every PENDING request matching filters in one transaction; returns the count
+    if status not in ('APPROVED', 'REJECTED'):
+        raise leaveError(f'Unknown decision {status!r}')
+    where, params = _pending_filter(**filters)
+    params['status'] = status
+    with db.transaction(conn):
+        cursor = conn.execute(f'''
+                        UPDATE Leave_Record AS r SET status = :status WHERE {where}
+                        ''',params)
+    return cursor.rowcount
+
+
+#------------------------------------------- AUTO-APPROVAL RULES ----------------------------------------------#
+
+# A rule approves a new request of up to max_days days when its leave_type and dept_id
+# (NULL : any) match and the balance left afterwards is at least min_balance
+
+def add_rule(conn, max_days, leave_type=None, dept_id=None, min_balance=0):
+    if max_days < 1:
+        raise leaveError('A rule must allow at least one day')
+    if leave_type is not None and leave_type not in LEAVE_TYPES.values():
+        raise leaveError(f'Unknown leave type {leave_type!r}')
+    if leave_type == 'PAID LEAVE':
+        raise leaveError('Paid leave is never auto-approved')
+    with db.transaction(conn):
+        cursor = conn.execute('''
+                        INSERT INTO Leave_Rule(leave_type,dept_id,max_days,min_balance) VALUES (?,?,?,?)
+                        ''',(leave_type,dept_id,max_days,min_balance))
+    return cursor.lastrowid
+
+
+def remove_rule(conn, rule_id):
+    with db.transaction(conn):
+        cursor = conn.execute('DELETE FROM Leave_Rule WHERE rule_id = ?',(rule_id,))
+    if not cursor.rowcount:
+        raise leaveError(f'No auto-approval rule with ID {rule_id}')
+
+
+def list_rules(conn):
+    return conn.execute('''
+                        SELECT r.rule_id, r.leave_type, d.dept_name, r.max_days, r.min_balance, r.created_at
+                            FROM Leave_Rule r LEFT JOIN Department d ON d.dept_id = r.dept_id
+                            ORDER BY r.rule_id
+                        ''').fetchall()
+
+
+def matching_rule(conn, emp_id, leave_type, days, balance_after):
+    # rule_id of the first rule that approves this request, or None; a rule for any leave type
+    # still never approves paid leave
+    row = conn.execute('''
+                        SELECT r.rule_id FROM Leave_Rule r
+                            WHERE :leave_type != 'PAID LEAVE'
+                            AND (r.leave_type IS NULL OR r.leave_type = :leave_type)
+                            AND (r.dept_id IS NULL OR r.dept_id = (SELECT dept_id FROM Employee WHERE emp_id = :emp_id))
+                            AND :days <= r.max_days AND :balance_after >= r.min_balance
+                            ORDER BY r.rule_id LIMIT 1
+                        ''',{'emp_id': emp_id, 'leave_type': leave_type, 'days': days,
+                             'balance_after': balance_after}).fetchone()
+    return row[0] if row else None
+
+
+#------------------------------------------- LEAVE SUMMARIES ----------------------------------------------#
+
+def _summary(entitlement, balance, requests, *per_status):
+    summary = {'entitlement': entitlement, 'balance': balance or 0, 'requests': requests}
+    for status, count, days in zip(STATUSES, per_status[0::2], per_status[1::2]):
+        summary[status.lower()] = count
+        summary[status.lower() + '_days'] = days
+    return summary
+
+
+def leave_summary(conn, emp_id):
+    # Counts and days per status plus the entitlement and remaining balance, in one pass over the employee's requests
+    row = conn.execute(f'''
+                        SELECT (SELECT leave_entitlement FROM Employee WHERE emp_id = :emp_id),
+                               (SELECT total_leave FROM Leave_Balance WHERE emp_id = :emp_id), {_SUMMARY}
+                            FROM Leave_Record r WHERE r.emp_id = :emp_id
+                        ''',{'emp_id': emp_id}).fetchone()
+    return _summary(*row)
+
+
+def team_leave_summary(conn, manager_id=None, dept_id=None):
+    # The same summary for every employee reporting to manager_id and / or in dept_id, in one query
+    cursor = conn.execute(f'''
+                        SELECT e.emp_id, e.name, e.leave_entitlement, (SELECT b.total_leave FROM Leave_Balance b WHERE b.emp_id = e.emp_id),
+                               {_SUMMARY}
+                            FROM Employee e LEFT JOIN Leave_Record r ON r.emp_id = e.emp_id
+                            WHERE (:manager_id IS NULL OR e.manager_id = :manager_id)
+                            AND (:dept_id IS NULL OR e.dept_id = :dept_id)
+                            GROUP BY e.emp_id ORDER BY e.emp_id
+                        ''',{'manager_id': manager_id, 'dept_id': dept_id})
+    return [dict(emp_id=emp_id, name=name, **_summary(*rest)) for emp_id, name, *rest in cursor]
@@ -0,0 +1,409 @@
+#------------------------------------------- SCHEMA MIGRATIONS ----------------------------------------------#
+
+# Each migration runs exactly once; the applied version is kept in PRAGMA user_version.
+# Append new migrations to the end of the list, never edit one that has shipped.
+
+import re
+import sqlite3
+
+# Duplicated keys listed when a UNIQUE index cannot be built
+SHOWN_DUPLICATES = 5
+
+
+class migrationError(Exception):
+    pass
+
+
+MIGRATIONS = [
+
+    # 1 : BASE SCHEMA
+    (1, [
+        '''
+        CREATE TABLE IF NOT EXISTS User(
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username VARCHAR(20) UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            role_id INTEGER
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Department(
+            dept_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dept_name VARCHAR(20)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Manager(
+            manager_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            dept_id INTEGER,
+            name VARCHAR(20),
+            contact INTEGER,
+            email VARCHAR(30),
+            FOREIGN KEY (user_id) REFERENCES User(user_id),
+            FOREIGN KEY (dept_id) REFERENCES Department(dept_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Employee(
+            emp_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            dept_id INTEGER,
+            manager_id INTEGER,
+            name VARCHAR(20),
+            job_title VARCHAR(20),
+            date_of_joining DATE,
+            salary INTEGER,
+            contact INTEGER,
+            email VARCHAR(30),
+            FOREIGN KEY (user_id) REFERENCES User(user_id),
+            FOREIGN KEY (dept_id) REFERENCES Department(dept_id),
+            FOREIGN KEY (manager_id) REFERENCES Manager(manager_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Attendance(
+            att_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            emp_id INTEGER,
+            date DATE,
+            clock_in TIME,
+            clock_out TIME,
+            working_hours NUMERIC,
+            overtime_hours NUMERIC,
+            status VARCHAR(20),
+            FOREIGN KEY (emp_id) REFERENCES Employee(emp_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Leave_Record(
+            leave_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            emp_id INTEGER,
+            leave_type VARCHAR(20),
+            start_date DATE,
+            end_date DATE,
+            leave_duration NUMERIC,
+            leave_balance NUMERIC,
+            status VARCHAR(20),
+            FOREIGN KEY (emp_id) REFERENCES Employee(emp_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Leave_Balance(
+            balance_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            emp_id INTEGER,
+            total_leave NUMERIC,
+            FOREIGN KEY (emp_id) REFERENCES Employee(emp_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Payroll(
+            payroll_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            emp_id INTEGER,
+            basic_pay NUMERIC NOT NULL,
+            allowance NUMERIC,
+            deduction NUMERIC,
+            overtime_pay NUMERIC,
+            net_pay NUMERIC,
+            pay_date DATE,
+            FOREIGN KEY (emp_id) REFERENCES Employee(emp_id)
+        )
+        ''',
+        # INSERT OR IGNORE INTO Department(dept_name)
+        #     VALUES ('HR'), ('FINANCE'), ('IT'), ('SALES'), ('MARKETING'), ('OPERATIONS'), ('ADMINISTRATION')
+    ]),
+
+    # 2 : INDEXES ON LOOKUP COLUMNS
+    (2, [
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_emp_date ON Attendance(emp_id, date)',
+        'CREATE INDEX IF NOT EXISTS idx_attendance_date ON Attendance(date)',
+        'CREATE INDEX IF NOT EXISTS idx_leave_emp_status ON Leave_Record(emp_id, status)',
+        'CREATE INDEX IF NOT EXISTS idx_leave_status ON Leave_Record(status)',
+        'CREATE INDEX IF NOT EXISTS idx_leave_balance_emp ON Leave_Balance(emp_id)',
+        'CREATE INDEX IF NOT EXISTS idx_payroll_emp ON Payroll(emp_id)',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_employee_user ON Employee(user_id)',
+        'CREATE INDEX IF NOT EXISTS idx_employee_dept ON Employee(dept_id)',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_manager_user ON Manager(user_id)',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_department_name ON Department(dept_name)',
+    ]),
+
+    # 3 : EMPLOYEE SEARCH INDEXES
+    (3, [
+        'CREATE INDEX IF NOT EXISTS idx_employee_name ON Employee(name)',
+        'CREATE INDEX IF NOT EXISTS idx_employee_title ON Employee(job_title)',
+        'CREATE INDEX IF NOT EXISTS idx_employee_joined ON Employee(date_of_joining)',
+        'CREATE INDEX IF NOT EXISTS idx_employee_contact ON Employee(contact)',
+    ]),
+
+    # 4 : TRIGRAM INDEX FOR FUZZY NAME SEARCH
+    # Names are padded with a space on each side, so a name of n letters has n trigrams.
+    (4, [
+        'CREATE TABLE IF NOT EXISTS Trigram_Seq(n INTEGER PRIMARY KEY)',
+        '''
+        INSERT OR IGNORE INTO Trigram_Seq(n)
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < 128)
+            SELECT n FROM seq
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Employee_Trigram(
+            trigram TEXT NOT NULL,
+            emp_id INTEGER NOT NULL,
+            PRIMARY KEY (trigram, emp_id)
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_employee_trigram_emp ON Employee_Trigram(emp_id)',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_employee_trigram_insert AFTER INSERT ON Employee
+        BEGIN
+            INSERT OR IGNORE INTO Employee_Trigram(trigram, emp_id)
+                SELECT substr(' ' || NEW.name || ' ', n, 3), NEW.emp_id
+                    FROM Trigram_Seq WHERE n <= length(NEW.name);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_employee_trigram_update AFTER UPDATE OF name ON Employee
+        BEGIN
+            DELETE FROM Employee_Trigram WHERE emp_id = OLD.emp_id;
+            INSERT OR IGNORE INTO Employee_Trigram(trigram, emp_id)
+                SELECT substr(' ' || NEW.name || ' ', n, 3), NEW.emp_id
+                    FROM Trigram_Seq WHERE n <= length(NEW.name);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_employee_trigram_delete AFTER DELETE ON Employee
+        BEGIN
+            DELETE FROM Employee_Trigram WHERE emp_id = OLD.emp_id;
+        END
+        ''',
+        '''
+        INSERT OR IGNORE INTO Employee_Trigram(trigram, emp_id)
+            SELECT substr(' ' || e.name || ' ', s.n, 3), e.emp_id
+                FROM Employee e JOIN Trigram_Seq s ON s.n <= length(e.name)
+        ''',
+    ]),
+
+    # 5 : KEYSET PAGING OF THE EMPLOYEE DIRECTORY
+    (5, [
+        'CREATE INDEX IF NOT EXISTS idx_employee_salary ON Employee(salary)',
+    ]),
+
+    # 6 : PAYROLL ADJUSTMENT LEDGER
+    # Deductions, overtime and allowances are appended to a ledger keyed by employee and pay period
+    # (YYYY-MM); triggers keep one running total row per employee-period. The rows clock_out used
+    # to add to Payroll on every punch out are dropped; each employee keeps its first row. Each dropped
+    # row held the first row's deduction plus that punch's, so the difference is carried over first.
+    (6, [
+        '''
+        CREATE TABLE IF NOT EXISTS Payroll_Adjustment(
+            adj_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            emp_id INTEGER NOT NULL,
+            period TEXT NOT NULL,
+            kind TEXT NOT NULL CHECK (kind IN ('ALLOWANCE', 'DEDUCTION', 'OVERTIME')),
+            amount NUMERIC NOT NULL,
+            source VARCHAR(20),
+            created_at TEXT DEFAULT (datetime('now', 'localtime')),
+            FOREIGN KEY (emp_id) REFERENCES Employee(emp_id)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_payroll_adjustment_emp_period ON Payroll_Adjustment(emp_id, period)',
+        '''
+        CREATE TABLE IF NOT EXISTS Payroll_Total(
+            emp_id INTEGER NOT NULL,
+            period TEXT NOT NULL,
+            allowance NUMERIC NOT NULL DEFAULT 0,
+            deduction NUMERIC NOT NULL DEFAULT 0,
+            overtime_pay NUMERIC NOT NULL DEFAULT 0,
+            entries INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (emp_id, period)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_payroll_adjustment_insert AFTER INSERT ON Payroll_Adjustment
+        BEGIN
+            INSERT INTO Payroll_Total(emp_id, period, allowance, deduction, overtime_pay, entries)
+                VALUES (NEW.emp_id, NEW.period,
+                        CASE NEW.kind WHEN 'ALLOWANCE' THEN NEW.amount ELSE 0 END,
+                        CASE NEW.kind WHEN 'DEDUCTION' THEN NEW.amount ELSE 0 END,
+                        CASE NEW.kind WHEN 'OVERTIME' THEN NEW.amount ELSE 0 END, 1)
+                ON CONFLICT (emp_id, period) DO UPDATE SET
+                    allowance = allowance + excluded.allowance,
+                    deduction = deduction + excluded.deduction,
+                    overtime_pay = overtime_pay + excluded.overtime_pay,
+                    entries = entries + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_payroll_adjustment_delete AFTER DELETE ON Payroll_Adjustment
+        BEGIN
+            UPDATE Payroll_Total SET
+                allowance = allowance - CASE OLD.kind WHEN 'ALLOWANCE' THEN OLD.amount ELSE 0 END,
+                deduction = deduction - CASE OLD.kind WHEN 'DEDUCTION' THEN OLD.amount ELSE 0 END,
+                overtime_pay = overtime_pay - CASE OLD.kind WHEN 'OVERTIME' THEN OLD.amount ELSE 0 END,
+                entries = entries - 1
+                WHERE emp_id = OLD.emp_id AND period = OLD.period;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_payroll_adjustment_update BEFORE UPDATE ON Payroll_Adjustment
+        BEGIN
+            SELECT RAISE(ABORT, 'payroll adjustments are append-only; add a correcting entry instead');
+        END
+        ''',
+        '''
+        INSERT INTO Payroll_Adjustment(emp_id, period, kind, amount, source)
+            SELECT p.emp_id, COALESCE(substr(f.pay_date, 1, 7), strftime('%Y-%m', 'now', 'localtime')), 'DEDUCTION',
+                   ROUND(p.deduction - COALESCE(f.deduction, 0), 2), 'MIGRATED'
+                FROM Payroll p
+                JOIN Payroll f ON f.payroll_id = (SELECT MIN(m.payroll_id) FROM Payroll m WHERE m.emp_id = p.emp_id)
+                WHERE p.allowance IS NULL AND p.overtime_pay IS NULL AND p.net_pay IS NULL AND p.pay_date IS NULL
+                AND p.payroll_id > f.payroll_id
+                AND ROUND(p.deduction - COALESCE(f.deduction, 0), 2) > 0
+        ''',
+        '''
+        DELETE FROM Payroll
+            WHERE allowance IS NULL AND overtime_pay IS NULL AND net_pay IS NULL AND pay_date IS NULL
+            AND payroll_id > (SELECT MIN(p.payroll_id) FROM Payroll p WHERE p.emp_id = Payroll.emp_id)
+        ''',
+        '''
+        INSERT INTO Payroll_Adjustment(emp_id, period, kind, amount, source)
+            SELECT p.emp_id, COALESCE(substr(p.pay_date, 1, 7), strftime('%Y-%m', 'now', 'localtime')), k.kind,
+                   CASE k.kind WHEN 'ALLOWANCE' THEN p.allowance WHEN 'DEDUCTION' THEN p.deduction ELSE p.overtime_pay END,
+                   'MIGRATED'
+                FROM Payroll p
+                JOIN (SELECT 'ALLOWANCE' AS kind UNION ALL SELECT 'DEDUCTION' UNION ALL SELECT 'OVERTIME') k
+                WHERE p.payroll_id = (SELECT MIN(f.payroll_id) FROM Payroll f WHERE f.emp_id = p.emp_id)
+                AND CASE k.kind WHEN 'ALLOWANCE' THEN p.allowance WHEN 'DEDUCTION' THEN p.deduction ELSE p.overtime_pay END > 0
+        ''',
+    ]),
+
+    # 7 : TEAM LOOKUPS
+    (7, [
+        'CREATE INDEX IF NOT EXISTS idx_employee_manager ON Employee(manager_id)',
+    ]),
+
+    # 8 : LEAVE AUTO-APPROVAL RULES
+    (8, [
+        '''CREATE TABLE IF NOT EXISTS Leave_Rule(
+            rule_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            leave_type TEXT,
+            dept_id INTEGER REFERENCES Department(dept_id),
+            max_days INTEGER NOT NULL CHECK (max_days > 0),
+            min_balance INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+        )''',
+    ]),
+
+    # 9 : MONTHLY ATTENDANCE SUMMARY
+    # One row per month and employee with the totals of its punched-out days; clock_out keeps it
+    # current and attendance.rebuild_summary() regenerates it from the raw rows
+    (9, [
+        '''
+        CREATE TABLE IF NOT EXISTS Attendance_Summary(
+            month TEXT NOT NULL,
+            emp_id INTEGER NOT NULL,
+            days INTEGER NOT NULL DEFAULT 0,
+            present INTEGER NOT NULL DEFAULT 0,
+            half_days INTEGER NOT NULL DEFAULT 0,
+            absent INTEGER NOT NULL DEFAULT 0,
+            working_hours NUMERIC NOT NULL DEFAULT 0,
+            overtime_hours NUMERIC NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, emp_id)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        INSERT OR REPLACE INTO Attendance_Summary(month,emp_id,days,present,half_days,absent,working_hours,overtime_hours)
+            SELECT substr(date, 1, 7), emp_id, COUNT(*),
+                   COUNT(CASE WHEN status IN ('PRESENT', 'OVERTIME') THEN 1 END),
+                   COUNT(CASE WHEN status = 'HALF DAY' THEN 1 END),
+                   COUNT(CASE WHEN status = 'ABSENT' THEN 1 END),
+                   TOTAL(working_hours), TOTAL(overtime_hours)
+                FROM Attendance WHERE clock_out IS NOT NULL
+                GROUP BY substr(date, 1, 7), emp_id
+        ''',
+    ]),
+
+    # 10 : ATTENDANCE ARCHIVE
+    # Closed years of Attendance live in per-year files; see archive.py
+    (10, [
+        '''
+        CREATE TABLE IF NOT EXISTS Attendance_Archive(
+            year INTEGER PRIMARY KEY,
+            path TEXT NOT NULL,
+            rows INTEGER NOT NULL DEFAULT 0,
+            archived_at TEXT DEFAULT (datetime('now', 'localtime'))
+        )
+        ''',
+    ]),
+
+    # 11 : DEPARTMENT SHARDS
+    # Departments whose per-employee rows live in a file of their own; see shards.py
+    (11, [
+        '''
+        CREATE TABLE IF NOT EXISTS Shard(
+            dept_id INTEGER PRIMARY KEY REFERENCES Department(dept_id),
+            path TEXT NOT NULL,
+            created_at TEXT DEFAULT (datetime('now', 'localtime'))
+        )
+        ''',
+    ]),
+
+    # 12 : LEAVE ENTITLEMENT
+    # The yearly leave days each employee is entitled to, which leave summaries report the balance
+    # against. Existing employees get the standard 42 days, or their balance if that is higher.
+    (12, [
+        'ALTER TABLE Employee ADD COLUMN leave_entitlement NUMERIC NOT NULL DEFAULT 42',
+        '''
+        UPDATE Employee SET leave_entitlement = MAX(leave_entitlement,
+                COALESCE((SELECT MAX(b.total_leave) FROM Leave_Balance b WHERE b.emp_id = Employee.emp_id), 0))
+        ''',
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def _duplicates(conn, version, table, columns):
+    # Message for a UNIQUE index that rows already in a legacy database violate. NULLs never
+    # collide, so only keys without one are listed.
+    keys = ' AND '.join(f'{column.strip()} IS NOT NULL' for column in columns.split(','))
+    repeated = f'SELECT {columns}, COUNT(*) FROM {table} WHERE {keys} GROUP BY {columns} HAVING COUNT(*) > 1'
+    total = conn.execute(f'SELECT COUNT(*) FROM ({repeated})').fetchone()[0]
+    shown = conn.execute(f'{repeated} ORDER BY COUNT(*) DESC LIMIT {SHOWN_DUPLICATES}').fetchall()
+    listed = ', '.join(f"{'/'.join(map(str, row[:-1]))} ({row[-1]} rows)" for row in shown)
+    return (f'Cannot upgrade the database to schema version {version}: {table}({columns}) must be unique, '
+            f'but {total} value(s) appear more than once : {listed}{" ..." if total > len(shown) else ""}. '
+            f'Merge or delete the duplicate {table} rows and start again; nothing has been changed.')
+
+
+def migrate(conn):
+    # Fast path : a current schema costs one PRAGMA read and no DDL
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return []
+
+    conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Another process may have migrated while we waited for the write lock
+        current = schema_version(conn)
+        applied = []
+        for version, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            for sql in statements:
+                try:
+                    conn.execute(sql)
+                except sqlite3.IntegrityError as e:
+                    unique = re.search(r'CREATE UNIQUE INDEX .*? ON (\w+)\(([^)]*)\)', sql)
+                    if unique is None:
+                        raise
+                    raise migrationError(_duplicates(conn, version, *unique.groups())) from e
+            applied.append(version)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return applied
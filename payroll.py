@@ -0,0 +1,184 @@
+#------------------------------------------- PAYROLL RUN ----------------------------------------------#
+
+import datetime
+import time
+
+import archive
+import db
+
+# Pay rules, applied through _TARGETS by run_payroll() and by the manager's salary screen alike
+ALLOWANCE_RATE = 0.1
+WORKING_DAYS = 25
+HOURS_PER_DAY = 8
+
+# Ledger kind : the Payroll_Total column it adds to
+ADJUSTMENTS = {'ALLOWANCE': 'allowance', 'DEDUCTION': 'deduction', 'OVERTIME': 'overtime_pay'}
+
+
+def pay_period(month=None):
+    # month is 'YYYY-MM'; defaults to the current month
+    if month:
+        start = datetime.datetime.strptime(month, '%Y-%m').date()
+    else:
+        start = datetime.date.today().replace(day=1)
+    import calendar
+    last_day = calendar.monthrange(start.year, start.month)[1]
+    return str(start), str(start.replace(day=last_day))
+
+
+def period_of(date=None):
+    # Pay period 'YYYY-MM' of a 'YYYY-MM-DD' date, or of today
+    return (date or str(datetime.date.today()))[:7]
+
+
+def adjust(conn, emp_id, kind, amount, period=None, source=None):
+    # Appends one ledger entry; the trigger adds it to the employee's period total
+    if kind not in ADJUSTMENTS:
+        raise ValueError(f'unknown adjustment {kind!r}')
+    with db.transaction(conn):
+        conn.execute('''
+                    INSERT INTO Payroll_Adjustment(emp_id,period,kind,amount,source)
+                        VALUES (?,?,?,?,?)
+                    ''',(emp_id,period or period_of(),kind,amount,source))
+
+
+def salary_record(conn, emp_id, month=None):
+    # Payroll row of the employee with the period's running totals; one indexed lookup each.
+    # Columns : payroll_id, emp_id, basic_pay, allowance, deduction, overtime_pay, net_pay, pay_date
+    start, end = pay_period(month)
+    return conn.execute('''
+                    SELECT p.payroll_id, p.emp_id, p.basic_pay,
+                           COALESCE(t.allowance, 0), COALESCE(t.deduction, 0), COALESCE(t.overtime_pay, 0),
+                           p.basic_pay + COALESCE(t.allowance, 0) - COALESCE(t.deduction, 0) + COALESCE(t.overtime_pay, 0),
+                           ?
+                        FROM Payroll p LEFT JOIN Payroll_Total t ON t.emp_id = p.emp_id AND t.period = ?
+                        WHERE p.emp_id = ? ORDER BY p.payroll_id LIMIT 1
+                    ''',(end,start[:7],emp_id)).fetchone()
+
+
+def _params(month, dept_id=None, emp_id=None):
+    start, end = pay_period(month)
+    return {'start': start, 'end': end, 'period': start[:7], 'dept_id': dept_id, 'emp_id': emp_id,
+            'allowance_rate': ALLOWANCE_RATE, 'hourly': WORKING_DAYS * HOURS_PER_DAY}
+
+
+def _load_run(conn, params, table='Attendance'):
+    # Fills the temp Payroll_Run table with each selected employee's first payroll row, the one every
+    # salary screen reads, and the period's overtime hours from one indexed aggregate per employee.
+    # table is where the period's attendance lives (see _attendance_table)
+    conn.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS Payroll_Run(
+                    payroll_id INTEGER PRIMARY KEY,
+                    emp_id INTEGER,
+                    salary NUMERIC,
+                    overtime_hours NUMERIC
+                )
+                ''')
+    conn.execute('DELETE FROM Payroll_Run')
+    conn.execute(f'''
+                INSERT INTO Payroll_Run(payroll_id,emp_id,salary,overtime_hours)
+                    SELECT MIN(p.payroll_id), e.emp_id, e.salary,
+                           (SELECT TOTAL(a.overtime_hours) FROM {table} a
+                                WHERE a.emp_id = e.emp_id AND a.date BETWEEN :start AND :end)
+                        FROM Employee e JOIN Payroll p ON p.emp_id = e.emp_id
+                        WHERE (:dept_id IS NULL OR e.dept_id = :dept_id)
+                        AND (:emp_id IS NULL OR e.emp_id = :emp_id)
+                        GROUP BY e.emp_id
+                ''', params)
+
+
+def _attendance_table(conn, params):
+    # Attendance, or the view over it and the archives when the period is in an archived year, so
+    # a rerun after archiving still sees the hours. Called before the transaction : it may ATTACH.
+    return archive.attendance_source(conn, params['start'])
+
+
+# Period total each pay rule tops its ledger kind up to, over Payroll_Run r
+_TARGETS = {'ALLOWANCE': 'r.salary * :allowance_rate',
+            'OVERTIME': 'ROUND(r.overtime_hours * r.salary / :hourly, 2)'}
+
+
+def _top_up(conn, kind, params, source):
+    # Enters the difference between the rule's target and the period total; returns the entries written
+    target = _TARGETS[kind]
+    cursor = conn.execute(f'''
+                INSERT INTO Payroll_Adjustment(emp_id,period,kind,amount,source)
+                    SELECT r.emp_id, :period, '{kind}', ROUND({target} - COALESCE(t.{ADJUSTMENTS[kind]}, 0), 2), :source
+                        FROM Payroll_Run r LEFT JOIN Payroll_Total t ON t.emp_id = r.emp_id AND t.period = :period
+                        WHERE ROUND({target} - COALESCE(t.{ADJUSTMENTS[kind]}, 0), 2) != 0
+                ''', dict(params, source=source))
+    return cursor.rowcount
+
+
+def apply_overtime(conn, month=None, dept_id=None, emp_id=None, source='OVERTIME RUN'):
+    # Sets the period's overtime pay to the period's overtime hours at the hourly rate, for one employee,
+    # a department or everyone. Running it again for the same period changes nothing.
+    # Returns [(emp_id, overtime_hours, overtime_pay)] for the employees it covered.
+    params = _params(month, dept_id, emp_id)
+    table = _attendance_table(conn, params)
+    with db.transaction(conn):
+        _load_run(conn, params, table)
+        _top_up(conn, 'OVERTIME', params, source)
+        rows = conn.execute('''
+                SELECT r.emp_id, r.overtime_hours, COALESCE(t.overtime_pay, 0)
+                    FROM Payroll_Run r LEFT JOIN Payroll_Total t ON t.emp_id = r.emp_id AND t.period = :period
+                    ORDER BY r.emp_id
+                ''', params).fetchall()
+        conn.execute('DELETE FROM Payroll_Run')
+    return rows
+
+
+def apply_allowance(conn, month=None, dept_id=None, emp_id=None, source='ALLOWANCE RUN'):
+    # Sets the period's allowance to ALLOWANCE_RATE of Employee.salary, the same target run_payroll()
+    # tops up to, so a manual entry and a later run agree. Returns [(emp_id, allowance)].
+    params = _params(month, dept_id, emp_id)
+    with db.transaction(conn):
+        _load_run(conn, params)
+        _top_up(conn, 'ALLOWANCE', params, source)
+        rows = conn.execute('''
+                SELECT r.emp_id, COALESCE(t.allowance, 0)
+                    FROM Payroll_Run r LEFT JOIN Payroll_Total t ON t.emp_id = r.emp_id AND t.period = :period
+                    ORDER BY r.emp_id
+                ''', params).fetchall()
+        conn.execute('DELETE FROM Payroll_Run')
+    return rows
+
+
+def run_payroll(conn, month=None, dept_id=None):
+    params = _params(month, dept_id)
+    began = time.perf_counter()
+    table = _attendance_table(conn, params)
+
+    with db.transaction(conn):
+        # Employees onboarded without a payroll row get one first
+        conn.execute('''
+                    INSERT INTO Payroll(emp_id,basic_pay,allowance,deduction,overtime_pay,net_pay)
+                        SELECT e.emp_id, e.salary, 0, 0, 0, e.salary FROM Employee e
+                            WHERE (:dept_id IS NULL OR e.dept_id = :dept_id)
+                            AND NOT EXISTS (SELECT 1 FROM Payroll p WHERE p.emp_id = e.emp_id)
+                    ''', params)
+        _load_run(conn, params, table)
+
+        # The period's allowance and overtime are topped up to what the pay rules give;
+        # deductions stay whatever the ledger has collected
+        for kind in ('ALLOWANCE', 'OVERTIME'):
+            _top_up(conn, kind, params, 'PAYROLL RUN')
+
+        conn.execute('''
+                    UPDATE Payroll SET
+                        basic_pay = r.salary,
+                        allowance = COALESCE(t.allowance, 0),
+                        deduction = COALESCE(t.deduction, 0),
+                        overtime_pay = COALESCE(t.overtime_pay, 0),
+                        pay_date = :end
+                    FROM Payroll_Run r LEFT JOIN Payroll_Total t ON t.emp_id = r.emp_id AND t.period = :period
+                    WHERE Payroll.payroll_id = r.payroll_id
+                    ''', params)
+        cursor = conn.execute('''
+                    UPDATE Payroll SET net_pay = basic_pay + allowance - deduction + overtime_pay
+                        WHERE payroll_id IN (SELECT payroll_id FROM Payroll_Run)
+                    ''')
+        processed = cursor.rowcount
+        conn.execute('DELETE FROM Payroll_Run')
+
+    return processed, time.perf_counter() - began
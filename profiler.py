@@ -0,0 +1,190 @@
+#------------------------------------------- ACTION PROFILER ----------------------------------------------#
+
+# Opt-in profiling of the portal actions (register, login and every dashboard entry). Each run of an
+# action appends one line to <dir>/actions.jsonl with its wall time, the part of it spent waiting at
+# input() / getpass() prompts, and the rest (busy_ms). The default 'sample' mode polls the action's
+# stack every interval while it is busy and appends collapsed stacks ("outer;inner count") to
+# <dir>/<action>.collapsed for flamegraph.pl / speedscope; 'cprofile' mode dumps a cProfile run per
+# action to <dir>/<action>.<n>.pstats instead. When profiling is off, run() is a plain call.
+#   EMS_PROFILE=profile python ems.py
+#   EMS_PROFILE=profile EMS_PROFILE_MODE=cprofile python ems.py
+#   python ems.py --profile profile employee search --name ARJUN
+#   python profiler.py profile              # runs and busy time per action
+
+import builtins
+import collections
+import datetime
+import getpass
+import os
+import sys
+import threading
+import time
+
+MODES = ('sample', 'cprofile')
+INTERVAL = 0.001
+
+_settings = None
+_lock = threading.Lock()
+_runs = collections.Counter()
+_saved = None
+# Threads sitting at a prompt, and the seconds each has spent at prompts
+_prompting = set()
+_waited = collections.Counter()
+
+
+def _prompt(read):
+    # Wraps input() / getpass() so the time at a prompt is not counted as busy
+    def prompt(*args, **kwargs):
+        thread_id = threading.get_ident()
+        _prompting.add(thread_id)
+        began = time.perf_counter()
+        try:
+            return read(*args, **kwargs)
+        finally:
+            _waited[thread_id] += time.perf_counter() - began
+            _prompting.discard(thread_id)
+    return prompt
+
+
+def _label(code):
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class Sampler(threading.Thread):
+    # Counts the collapsed stacks of one thread, skipping the moments it waits at a prompt
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            if self.thread_id in _prompting:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopping.set()
+        self.join()
+        return self.stacks
+
+
+def _filename(name):
+    return ''.join(char if char.isalnum() or char in '._-' else '_' for char in name)
+
+
+def _write(name, line):
+    with _lock:
+        with open(os.path.join(_settings['dir'], name), 'a', encoding='utf-8') as file:
+            file.write(line)
+
+
+def run(func, *args, name=None, **kwargs):
+    # Calls func; while profiling is on, records it as the action name (default Class.method)
+    if _settings is None:
+        return func(*args, **kwargs)
+    name = name or func.__qualname__
+    with _lock:
+        _runs[name] += 1
+        number = _runs[name]
+    thread_id = threading.get_ident()
+    _waited[thread_id] = 0.0
+    started = datetime.datetime.now()
+    sampler = profile = None
+    if _settings['mode'] == 'sample':
+        sampler = Sampler(thread_id, _settings['interval'])
+        sampler.start()
+    else:
+        import cProfile
+        profile = cProfile.Profile()
+        profile.enable()
+    began = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        wall = time.perf_counter() - began
+        waited = _waited.pop(thread_id, 0.0)
+        entry = {'action': name, 'run': number, 'started': started.isoformat(timespec='milliseconds'),
+                 'wall_ms': round(wall * 1000, 3), 'input_wait_ms': round(waited * 1000, 3),
+                 'busy_ms': round((wall - waited) * 1000, 3)}
+        if sampler is not None:
+            stacks = sampler.stop()
+            entry['samples'] = sum(stacks.values())
+            if stacks:
+                _write(f'{_filename(name)}.collapsed', ''.join(f'{stack} {count}\n' for stack, count in stacks.items()))
+        else:
+            profile.disable()
+            profile.dump_stats(os.path.join(_settings['dir'], f'{_filename(name)}.{number}.pstats'))
+        # Only profiled runs write entries, so json is imported here rather than at startup
+        import json
+        _write('actions.jsonl', json.dumps(entry) + '\n')
+
+
+def enable(directory, mode='sample', interval=INTERVAL):
+    global _settings, _saved
+    if mode not in MODES:
+        raise ValueError(f'unknown profiling mode {mode!r}; use one of {", ".join(MODES)}')
+    os.makedirs(directory, exist_ok=True)
+    _settings = {'dir': directory, 'mode': mode, 'interval': interval}
+    if _saved is None:
+        _saved = builtins.input, getpass.getpass
+        builtins.input = _prompt(builtins.input)
+        getpass.getpass = _prompt(getpass.getpass)
+
+
+def enable_from_env():
+    directory = os.environ.get('EMS_PROFILE')
+    if directory:
+        enable(directory, os.environ.get('EMS_PROFILE_MODE', 'sample'),
+               float(os.environ.get('EMS_PROFILE_INTERVAL', INTERVAL)))
+
+
+def disable():
+    global _settings, _saved
+    if _saved is not None:
+        builtins.input, getpass.getpass = _saved
+        _saved = None
+    _settings = None
+
+
+def summary(directory):
+    # {action : runs, mean / p95 / max busy_ms, total input_wait_ms} from <directory>/actions.jsonl
+    import json
+    busy = collections.defaultdict(list)
+    waited = collections.Counter()
+    with open(os.path.join(directory, 'actions.jsonl'), encoding='utf-8') as file:
+        for line in file:
+            entry = json.loads(line)
+            busy[entry['action']].append(entry['busy_ms'])
+            waited[entry['action']] += entry['input_wait_ms']
+    report = {}
+    for action, timings in sorted(busy.items()):
+        timings.sort()
+        report[action] = {'runs': len(timings), 'mean_busy_ms': round(sum(timings) / len(timings), 3),
+                          'p95_busy_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+                          'max_busy_ms': timings[-1], 'input_wait_ms': round(waited[action], 3)}
+    return report
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Summarise the action timings of a profiling run')
+    parser.add_argument('dir', help='directory given to EMS_PROFILE / --profile')
+    args = parser.parse_args(argv)
+    print(f'{"action":<36} {"runs":>5} {"mean ms":>10} {"p95 ms":>10} {"max ms":>10}')
+    for action, stats in summary(args.dir).items():
+        print(f'{action:<36} {stats["runs"]:>5} {stats["mean_busy_ms"]:>10.3f} {stats["p95_busy_ms"]:>10.3f} '
+              f'{stats["max_busy_ms"]:>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
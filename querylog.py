@@ -0,0 +1,190 @@
+#------------------------------------------- QUERY INSTRUMENTATION ----------------------------------------------#
+
+# Opt-in timing of every statement the portal runs. While enabled, new connections are TracedConnection
+# objects: each execute() / executemany() / commit() is timed and filed under its normalised SQL
+# (literals and IN lists folded to ?), and set_trace_callback collects the expanded statements SQLite
+# actually ran, including trigger bodies. Statements slower than the threshold are appended to the log
+# file as they happen, optionally with their EXPLAIN QUERY PLAN and a full_scan flag; close() appends
+# count / total / p50 / p95 / p99 per statement. Times cover execute() up to the first row, not fetching.
+#   EMS_QUERY_LOG=queries.jsonl EMS_SLOW_MS=20 EMS_EXPLAIN=1 python ems.py
+#   python ems.py --query-log queries.jsonl --slow-ms 20 --explain payroll run
+
+import atexit
+import datetime
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import db
+
+SLOW_MS = 50
+# Timings kept per statement for the percentiles; beyond this a random sample is kept
+MAX_SAMPLES = 10000
+# Expanded statements kept with one slow entry
+MAX_TRACE = 20
+
+_lock = threading.Lock()
+_local = threading.local()
+_stats = {}
+_explained = set()
+_settings = None
+
+
+def normalise(sql):
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'(?<![\w.])-?\d+(?:\.\d+)?\b', '?', sql)
+    sql = re.sub(r'\s+', ' ', sql).strip()
+    return re.sub(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)', 'IN (?, ...)', sql, flags=re.IGNORECASE)
+
+
+def _percentile(timings, share):
+    return timings[min(len(timings) - 1, int(len(timings) * share))]
+
+
+def _write(entry):
+    # json and random are imported on use, so that importing this module costs the portal's startup nothing
+    import json
+    with _lock:
+        with open(_settings['path'], 'a', encoding='utf-8') as file:
+            file.write(json.dumps(entry) + '\n')
+
+
+def _trace(statement):
+    traced = getattr(_local, 'traced', None)
+    if traced is not None and len(traced) < MAX_TRACE:
+        traced.append(statement)
+
+
+def _plan(conn, sql, params):
+    # A plain cursor, so the plan query itself is not timed
+    rows = sqlite3.Cursor(conn).execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+    plan = [row[-1] for row in rows]
+    # 'SCAN t' reads the whole table; 'SCAN t USING ... INDEX' walks a whole index
+    return plan, any(re.match(r'SCAN \S+$', step) for step in plan)
+
+
+def _record(conn, sql, params, elapsed, many):
+    if _settings is None:
+        return
+    key = normalise(sql)
+    ms = elapsed * 1000
+    with _lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'timings': []}
+        stats['count'] += 1
+        stats['total_ms'] += ms
+        stats['max_ms'] = max(stats['max_ms'], ms)
+        if len(stats['timings']) < MAX_SAMPLES:
+            stats['timings'].append(ms)
+        else:
+            import random
+            slot = random.randrange(stats['count'])
+            if slot < MAX_SAMPLES:
+                stats['timings'][slot] = ms
+        explain = _settings['explain'] and not many and key not in _explained
+        if explain:
+            _explained.add(key)
+    if ms < _settings['slow_ms']:
+        return
+    entry = {'event': 'slow', 'at': datetime.datetime.now().isoformat(timespec='milliseconds'),
+             'ms': round(ms, 3), 'sql': key, 'executed': list(getattr(_local, 'traced', None) or [])}
+    if many:
+        entry['executemany'] = True
+    if explain:
+        try:
+            entry['plan'], entry['full_scan'] = _plan(conn, sql, params)
+        except sqlite3.Error as e:
+            entry['plan_error'] = str(e)
+    _write(entry)
+
+
+def _timed(conn, run, sql, params, many=False):
+    _local.traced = []
+    began = time.perf_counter()
+    try:
+        return run()
+    finally:
+        elapsed = time.perf_counter() - began
+        _record(conn, sql, params, elapsed, many)
+        _local.traced = None
+
+
+class TracedCursor(sqlite3.Cursor):
+
+    def execute(self, sql, params=()):
+        return _timed(self.connection, lambda: super(TracedCursor, self).execute(sql, params), sql, params)
+
+    def executemany(self, sql, params):
+        return _timed(self.connection, lambda: super(TracedCursor, self).executemany(sql, params), sql, None, True)
+
+
+class TracedConnection(db.Connection):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_trace_callback(_trace)
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute() does not go through cursor()
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, params):
+        return self.cursor().executemany(sql, params)
+
+    def commit(self):
+        if self.in_transaction:
+            return _timed(self, super().commit, 'COMMIT', None, True)
+        return super().commit()
+
+
+def enable(path, slow_ms=SLOW_MS, explain=False):
+    # Connections opened from now on are traced; the pooled ones are closed so they reopen traced
+    global _settings
+    _settings = {'path': path, 'slow_ms': slow_ms, 'explain': explain}
+    db.close_all()
+    db.CONNECTION_CLASS = TracedConnection
+    _write({'event': 'start', 'at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'pid': os.getpid(), 'slow_ms': slow_ms, 'explain': explain})
+    atexit.register(close)
+
+
+def enable_from_env():
+    path = os.environ.get('EMS_QUERY_LOG')
+    if path:
+        enable(path, float(os.environ.get('EMS_SLOW_MS', SLOW_MS)), os.environ.get('EMS_EXPLAIN', '') not in ('', '0'))
+
+
+def statement_stats():
+    # {normalised sql : count, total_ms, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}, slowest total first
+    with _lock:
+        items = [(key, dict(stats, timings=sorted(stats['timings']))) for key, stats in _stats.items()]
+    report = {}
+    for key, stats in sorted(items, key=lambda item: -item[1]['total_ms']):
+        timings = stats['timings']
+        report[key] = {'count': stats['count'], 'total_ms': round(stats['total_ms'], 3),
+                       'mean_ms': round(stats['total_ms'] / stats['count'], 3),
+                       'p50_ms': round(_percentile(timings, 0.5), 3), 'p95_ms': round(_percentile(timings, 0.95), 3),
+                       'p99_ms': round(_percentile(timings, 0.99), 3), 'max_ms': round(stats['max_ms'], 3)}
+    return report
+
+
+def close():
+    # Appends the per-statement summary and stops tracing new connections
+    global _settings
+    if _settings is None:
+        return
+    for key, stats in statement_stats().items():
+        _write(dict({'event': 'statement', 'sql': key}, **stats))
+    _write({'event': 'end', 'at': datetime.datetime.now().isoformat(timespec='seconds')})
+    with _lock:
+        _stats.clear()
+        _explained.clear()
+    db.CONNECTION_CLASS = db.Connection
+    _settings = None
+    atexit.unregister(close)
@@ -0,0 +1,213 @@
+#------------------------------------------- EMPLOYEE ROSTER ----------------------------------------------#
+
+# The whole organisation in memory for reports. Numeric fields are stored in array columns and
+# repeated strings (names, designations, join dates) are kept once, so a million employees take a
+# fraction of the memory of fetchall() tuples. Rows come out as EmployeeRecord objects with named
+# fields, and group_by() / filter() work on the columns directly.
+# A NULL in a numeric column is stored as 0 and marked in that column's missing mask, which only
+# exists once the column holds a NULL. Reading numbers back out of an array costs group_by() and
+# filter() about 1.5x the time of the same loops over tuples (bench.py roster_memory); the roster is
+# for reports over the whole organisation, where the memory matters more.
+
+import operator
+from array import array
+
+FIELDS = ('emp_id', 'name', 'dept_id', 'job_title', 'date_of_joining', 'salary', 'contact', 'email', 'manager_id')
+# array typecode of each numeric field; the others are lists of strings
+NUMERIC = {'emp_id': 'q', 'dept_id': 'q', 'salary': 'd', 'contact': 'q', 'manager_id': 'q'}
+BATCH_SIZE = 10000
+
+
+class EmployeeRecord:
+    __slots__ = FIELDS
+
+    def __init__(self, *values):
+        for field, value in zip(FIELDS, values):
+            setattr(self, field, value)
+
+    def __iter__(self):
+        # Lets a record be printed wherever a row tuple was, e.g. by table.render
+        return (getattr(self, field) for field in FIELDS)
+
+    def __repr__(self):
+        return f'EmployeeRecord({", ".join(f"{field}={getattr(self, field)!r}" for field in FIELDS)})'
+
+
+class GroupStats:
+    # count is the group's employees, non_null those with a value; total, low, high and mean are
+    # over the values alone
+    __slots__ = ('count', 'non_null', 'total', 'low', 'high')
+
+    def __init__(self):
+        self.count = 0
+        self.non_null = 0
+        self.total = 0
+        self.low = None
+        self.high = None
+
+    @property
+    def mean(self):
+        return self.total / self.non_null if self.non_null else None
+
+
+# Report groupings : roster field
+GROUPINGS = {'department': 'dept_id', 'designation': 'job_title', 'manager': 'manager_id'}
+
+
+def _to_python(field, value):
+    if field == 'salary' and value is not None and value.is_integer():
+        return int(value)
+    return value
+
+
+def _pick(column, indices):
+    # column[index] for each of indices, as a sequence
+    if len(indices) == 1:
+        return [column[indices[0]]]
+    return operator.itemgetter(*indices)(column) if indices else []
+
+
+class Roster:
+
+    def __init__(self):
+        self.columns = {field: array(NUMERIC[field]) if field in NUMERIC else [] for field in FIELDS}
+        # Numeric field : bytearray with 1 where the value is NULL, or None while there are none
+        self.missing = dict.fromkeys(NUMERIC)
+
+    @classmethod
+    def load(cls, conn, dept_id=None, batch_size=BATCH_SIZE):
+        roster = cls()
+        cursor = conn.execute(f'''
+                        SELECT {','.join(FIELDS)} FROM Employee
+                            WHERE :dept_id IS NULL OR dept_id = :dept_id
+                            ORDER BY emp_id
+                        ''', {'dept_id': dept_id})
+        strings = {}
+        columns = [(field, roster.columns[field], field in NUMERIC) for field in FIELDS]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for (field, column, is_numeric), values in zip(columns, zip(*rows)):
+                if not is_numeric:
+                    # One str object per distinct value
+                    column.extend(map(strings.setdefault, values, values))
+                    continue
+                missing = roster.missing[field]
+                if None in values:
+                    if missing is None:
+                        missing = roster.missing[field] = bytearray(len(column))
+                    missing.extend([value is None for value in values])
+                    column.extend([0 if value is None else value for value in values])
+                else:
+                    if missing is not None:
+                        missing.extend(bytes(len(values)))
+                    column.extend(values)
+        return roster
+
+    def __len__(self):
+        return len(self.columns['emp_id'])
+
+    def __getitem__(self, index):
+        return EmployeeRecord(*(self._value(field, index) for field in FIELDS))
+
+    def _value(self, field, index):
+        if field not in NUMERIC:
+            return self.columns[field][index]
+        missing = self.missing[field]
+        if missing is not None and missing[index]:
+            return None
+        return _to_python(field, self.columns[field][index])
+
+    def _values(self, field):
+        # The column with None for NULL, for loops that need to see the NULLs
+        column = self.columns[field]
+        missing = self.missing.get(field)
+        if missing is None:
+            return column
+        return [None if null else value for value, null in zip(column, missing)]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def column(self, field):
+        # Values of one field, with None for NULL
+        if field == 'salary':
+            return [_to_python(field, value) for value in self._values(field)]
+        return list(self._values(field))
+
+    def take(self, indices):
+        # New roster with the rows at indices, sharing the string objects
+        roster = Roster()
+        for field, column in self.columns.items():
+            values = _pick(column, indices)
+            roster.columns[field] = array(NUMERIC[field], values) if field in NUMERIC else list(values)
+        for field, missing in self.missing.items():
+            if missing is not None:
+                roster.missing[field] = bytearray(_pick(missing, indices))
+        return roster
+
+    def filter(self, predicate=None, **conditions):
+        # conditions are field=value for equality or field=(low, high) for an inclusive range, None
+        # leaving that end open; predicate(record) narrows the result further
+        indices = None
+        for field, wanted in conditions.items():
+            column = self.columns[field]
+            missing = self.missing.get(field)
+            if isinstance(wanted, tuple):
+                low = float('-inf') if wanted[0] is None else wanted[0]
+                high = float('inf') if wanted[1] is None else wanted[1]
+                if field in NUMERIC and missing is None:
+                    selected = [index for index, value in enumerate(column) if low <= value <= high]
+                elif field in NUMERIC:
+                    selected = [index for index, (value, null) in enumerate(zip(column, missing))
+                                if not null and low <= value <= high]
+                else:
+                    selected = [index for index, value in enumerate(column)
+                                if value is not None and (wanted[0] is None or value >= low)
+                                and (wanted[1] is None or value <= high)]
+            elif field in NUMERIC and wanted is None:
+                selected = [] if missing is None else [index for index, null in enumerate(missing) if null]
+            elif field in NUMERIC and missing is not None:
+                selected = [index for index, (value, null) in enumerate(zip(column, missing))
+                            if not null and value == wanted]
+            else:
+                selected = [index for index, value in enumerate(column) if value == wanted]
+            indices = selected if indices is None else sorted(set(indices).intersection(selected))
+        if indices is None:
+            indices = range(len(self))
+        if predicate is not None:
+            indices = [index for index in indices if predicate(self[index])]
+        return self.take(indices)
+
+    def group_by(self, field, value='salary'):
+        # {key : GroupStats of the numeric field value}; key None collects NULLs
+        if value not in NUMERIC:
+            raise ValueError(f'{value!r} is not a numeric field')
+        buckets = {}
+        for key, amount in zip(self._values(field), self._values(value)):
+            buckets.setdefault(key, []).append(amount)
+        groups = {}
+        for key, bucket in buckets.items():
+            stats = groups[_to_python(field, key)] = GroupStats()
+            stats.count = len(bucket)
+            amounts = bucket if self.missing[value] is None else [amount for amount in bucket if amount is not None]
+            stats.non_null = len(amounts)
+            if amounts:
+                stats.total = sum(amounts)
+                stats.low = min(amounts)
+                stats.high = max(amounts)
+        return groups
+
+
+def salary_report(roster, by='department', names=None):
+    # [(group, employees, total, average, lowest, highest)] sorted by group; names maps dept_id to a name
+    rows = []
+    for key, stats in roster.group_by(GROUPINGS[by]).items():
+        if names is not None:
+            key = names.get(key, key)
+        low, high = (None if amount is None else _to_python('salary', amount) for amount in (stats.low, stats.high))
+        mean = None if stats.mean is None else round(stats.mean, 2)
+        rows.append((key, stats.count, round(stats.total, 2), mean, low, high))
+    return sorted(rows, key=lambda row: (row[0] is None, str(row[0])))
@@ -0,0 +1,139 @@
+#------------------------------------------- EMPLOYEE SEARCH ----------------------------------------------#
+
+import math
+
+EMPLOYEE_COLUMNS = 'emp_id,name,dept_id,job_title,date_of_joining,salary,contact,email'
+EMPLOYEE_HEADERS = ['Emp_ID','Name','Dept_ID','Designation','Joined Date','Salary','Contact','Mail-ID']
+
+SEARCH_LIMIT = 100
+
+# Share of the query's trigrams a name must contain to count as a fuzzy match
+MIN_SIMILARITY = 0.3
+
+
+def _prefix(column, value):
+    # GLOB is case sensitive, so a prefix match can range-scan the column's index.
+    # Names and titles are stored upper case and validated to letters and spaces.
+    return f'{column} GLOB ?', value + '*'
+
+
+def search_employees(conn, emp_id=None, name=None, dept_id=None, title=None,
+                     joined=None, joined_after=None, joined_before=None, contact=None,
+                     limit=SEARCH_LIMIT):
+    clauses = []
+    params = []
+    if emp_id is not None:
+        clauses.append('emp_id = ?')
+        params.append(emp_id)
+    if name:
+        clause, param = _prefix('name', name)
+        clauses.append(clause)
+        params.append(param)
+    if dept_id is not None:
+        clauses.append('dept_id = ?')
+        params.append(dept_id)
+    if title:
+        clause, param = _prefix('job_title', title)
+        clauses.append(clause)
+        params.append(param)
+    if joined:
+        clauses.append('date_of_joining = ?')
+        params.append(joined)
+    if joined_after:
+        clauses.append('date_of_joining >= ?')
+        params.append(joined_after)
+    if joined_before:
+        clauses.append('date_of_joining <= ?')
+        params.append(joined_before)
+    if contact is not None:
+        clauses.append('contact = ?')
+        params.append(int(contact))
+
+    sql = f'SELECT {EMPLOYEE_COLUMNS} FROM Employee'
+    if clauses:
+        sql += ' WHERE ' + ' AND '.join(clauses)
+    sql += ' ORDER BY emp_id'
+    if limit:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+#------------------------------------------- FUZZY NAME SEARCH ----------------------------------------------#
+
+def trigrams(text):
+    # Same padding as the Employee_Trigram triggers in migrations.py
+    padded = f' {text.upper()} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def fuzzy_name_search(conn, name, limit=SEARCH_LIMIT, min_similarity=MIN_SIMILARITY):
+    grams = sorted(trigrams(name.strip()))
+    if not grams:
+        return []
+    marks = ','.join('?' * len(grams))
+    columns = ','.join('e.' + column for column in EMPLOYEE_COLUMNS.split(','))
+    # Best matches share the most trigrams with the query; shorter names win ties
+    return conn.execute(f'''
+                        SELECT {columns}
+                            FROM (SELECT emp_id, COUNT(*) AS shared FROM Employee_Trigram
+                                    WHERE trigram IN ({marks})
+                                    GROUP BY emp_id
+                                    HAVING shared >= ?) m
+                            JOIN Employee e ON e.emp_id = m.emp_id
+                            ORDER BY m.shared DESC, length(e.name), e.emp_id
+                            LIMIT ?
+                        ''',(*grams, math.ceil(len(grams) * min_similarity), limit)).fetchall()
+
+
+#------------------------------------------- EMPLOYEE DIRECTORY PAGING ----------------------------------------------#
+
+PAGE_SIZE = 20
+SORT_KEYS = {'id': 'emp_id', 'name': 'name', 'department': 'dept_id', 'salary': 'salary'}
+
+
+def _keyset(sort):
+    # emp_id breaks ties, so every row has a unique position in the ordering
+    column = SORT_KEYS[sort]
+    return ['emp_id'] if column == 'emp_id' else [column, 'emp_id']
+
+
+def page_key(row, sort):
+    columns = EMPLOYEE_COLUMNS.split(',')
+    return tuple(row[columns.index(column)] for column in _keyset(sort))
+
+
+def _beyond(keys, key, op):
+    # WHERE clauses for the rows after (op '>') or before (op '<') key, in the order they are read.
+    # SQLite puts NULL sort values first, and a row value holding NULL never compares true, so
+    # the NULLs get a clause of their own; each clause can still range-scan the sort index.
+    column = keys[0]
+    if len(keys) == 1:
+        return [(f'{column} {op} ?', list(key))]
+    if key[0] is None:
+        clauses = [(f'{column} IS NULL AND emp_id {op} ?', [key[1]])]
+        return clauses + [(f'{column} IS NOT NULL', [])] if op == '>' else clauses
+    clauses = [(f'({column},emp_id) {op} (?,?)', list(key))]
+    return clauses + [(f'{column} IS NULL', [])] if op == '<' else clauses
+
+
+def employee_page(conn, sort='id', after=None, before=None, page_size=PAGE_SIZE):
+    keys = _keyset(sort)
+    if before is not None:
+        # Walk the index backwards from the first row on screen, then restore the order
+        clauses = _beyond(keys, before, '<')
+        order = ','.join(key + ' DESC' for key in keys)
+    else:
+        clauses = _beyond(keys, after, '>') if after is not None else [(None, [])]
+        order = ','.join(keys)
+    rows = []
+    for clause, params in clauses:
+        sql = f'SELECT {EMPLOYEE_COLUMNS} FROM Employee'
+        if clause:
+            sql += f' WHERE {clause}'
+        rows += conn.execute(sql + f' ORDER BY {order} LIMIT ?', params + [page_size - len(rows)]).fetchall()
+        if len(rows) >= page_size:
+            break
+    if before is not None:
+        rows.reverse()
+    return rows
@@ -0,0 +1,321 @@
+#------------------------------------------- DEPARTMENT SHARDS ----------------------------------------------#
+
+# Optional split of the per-employee tables (TABLES) into one SQLite file per department next to the
+# live database (emp.db -> emp.dept_3.db), so punches, leave and payroll writes of different departments
+# stop queueing on one write lock. Employee, User, Manager, Department and the rules stay in emp.db,
+# which every shard connection ATTACHes as org : unqualified names resolve in the shard first and in
+# emp.db after, so the existing queries run unchanged on a shard connection.
+#   route()         the connection an employee's (or a department's) rows live behind
+#   scatter()       runs a function on every shard at once; by_department() hands each its own dept_id
+#   query()         streams one SELECT from every shard, merged on a sort column
+#   place()         moves the rows of new employees and of employees that changed department
+# The Shard table lists the shards; while it is empty every function works on the connection it was
+# given, exactly as before. New AUTOINCREMENT ids of shard n start past n << ID_BITS, so ids stay
+# unique across the files. Migrations run on emp.db only.
+#   python ems.py db shard                     # moves every department's rows into its shard; rerunnable
+#   python ems.py db shards
+
+import heapq
+import itertools
+import operator
+import os
+import threading
+import time
+
+import db
+
+TABLES = ('Attendance', 'Attendance_Summary', 'Leave_Record', 'Leave_Balance',
+          'Payroll', 'Payroll_Adjustment', 'Payroll_Total')
+# Kept by the Payroll_Adjustment triggers, so rebuilt from the ledger rather than copied
+DERIVED = ('Payroll_Total',)
+ID_BITS = 40
+WORKERS = 8
+# emp_ids per IN (...) lookup
+CHUNK = 500
+
+_lock = threading.Lock()
+_pool = {}
+
+
+class shardError(Exception):
+    pass
+
+
+def _main_path(conn):
+    # emp.db behind conn, which may itself be a shard connection
+    paths = {name: path for _, name, path in conn.execute('PRAGMA database_list')}
+    return paths.get('org') or paths.get('main') or db.DB_PATH
+
+
+def shard_path(conn, dept_id):
+    base, _ = os.path.splitext(_main_path(conn))
+    return f'{base}.dept_{dept_id}.db'
+
+
+def shard_ids(conn):
+    return [row[0] for row in conn.execute('SELECT dept_id FROM Shard ORDER BY dept_id')]
+
+
+def is_sharded(conn):
+    return conn.execute('SELECT 1 FROM Shard LIMIT 1').fetchone() is not None
+
+
+def list_shards(conn):
+    return conn.execute('''
+                SELECT s.dept_id, d.dept_name, s.path, s.created_at
+                    FROM Shard s LEFT JOIN Department d ON d.dept_id = s.dept_id ORDER BY s.dept_id
+                ''').fetchall()
+
+
+def _open(path, org):
+    conn = db.connect(path)
+    conn.execute('ATTACH DATABASE ? AS org', (org,))
+    return conn
+
+
+def get_conn(conn, dept_id):
+    # Connection to a department's shard, one per thread like db.get_conn()
+    path = shard_path(conn, dept_id)
+    key = (threading.get_ident(), path)
+    with _lock:
+        shard = _pool.get(key)
+        if shard is None:
+            shard = _pool[key] = _open(path, _main_path(conn))
+    return shard
+
+
+def close_conn():
+    # Closes the shard connections of the calling thread
+    thread_id = threading.get_ident()
+    with _lock:
+        keys = [key for key in _pool if key[0] == thread_id]
+        conns = [_pool.pop(key) for key in keys]
+    for conn in conns:
+        conn.close()
+
+
+def close_all():
+    with _lock:
+        conns = list(_pool.values())
+        _pool.clear()
+    for conn in conns:
+        conn.close()
+
+
+def create(conn, dept_id):
+    # Builds a department's shard with the live schema of TABLES (indexes and triggers included)
+    # and registers it. A connection of its own : the caller's may hold uncommitted changes.
+    path = shard_path(conn, dept_id)
+    main = db.connect(_main_path(conn))
+    try:
+        main.execute('BEGIN IMMEDIATE')
+        with db.transaction(main):
+            if main.execute('SELECT 1 FROM Shard WHERE dept_id = ?', (dept_id,)).fetchone():
+                return
+            marks = ','.join('?' * len(TABLES))
+            schema = main.execute(f'''
+                        SELECT name, sql FROM sqlite_master WHERE tbl_name IN ({marks}) AND sql IS NOT NULL
+                            ORDER BY type != 'table'
+                        ''', TABLES).fetchall()
+            shard = db.connect(path)
+            try:
+                with db.transaction(shard):
+                    # A file left by an interrupted create() keeps what it already has
+                    built = {row[0] for row in shard.execute('SELECT name FROM sqlite_master')}
+                    for name, sql in schema:
+                        if name not in built:
+                            shard.execute(sql)
+                    shard.execute('''
+                        INSERT INTO sqlite_sequence(name, seq)
+                            SELECT name, ? FROM sqlite_master WHERE type = 'table' AND sql LIKE '%AUTOINCREMENT%'
+                            AND name NOT IN (SELECT name FROM sqlite_sequence)
+                        ''', (dept_id << ID_BITS,))
+            finally:
+                shard.close()
+            main.execute('INSERT INTO Shard(dept_id, path) VALUES (?, ?)', (dept_id, os.path.basename(path)))
+    finally:
+        main.close()
+
+
+def route(conn, emp_id=None, dept_id=None):
+    # Connection holding the rows of emp_id, or of dept_id. conn itself while nothing is sharded, and
+    # for an emp_id that does not exist, so the caller reports it the way it always has.
+    if not is_sharded(conn):
+        return conn
+    if dept_id is None:
+        row = conn.execute('SELECT dept_id FROM Employee WHERE emp_id = ?', (emp_id,)).fetchone()
+        if row is None:
+            return conn
+        if row[0] is None:
+            raise shardError(f'Employee {emp_id} has no department, so no shard holds their records')
+        dept_id = row[0]
+    if not conn.execute('SELECT 1 FROM Shard WHERE dept_id = ?', (dept_id,)).fetchone():
+        # A department added after the split gets its shard on first use
+        create(conn, dept_id)
+    return get_conn(conn, dept_id)
+
+
+def locate(conn, table, column, value):
+    # Connection holding the row of table whose key column is value (e.g. a leave_id). Ids made in a
+    # shard carry its dept_id in their high bits; older ones are looked for shard by shard.
+    if not is_sharded(conn):
+        return conn
+    home = value >> ID_BITS
+    for dept_id in sorted(shard_ids(conn), key=lambda dept_id: dept_id != home):
+        shard = get_conn(conn, dept_id)
+        if shard.execute(f'SELECT 1 FROM main.{table} WHERE {column} = ?', (value,)).fetchone():
+            return shard
+    return conn
+
+
+#---- SCATTER / GATHER ----#
+
+def _scatter(conn, run):
+    # run(shard connection, dept_id) on every shard from a pool of threads; [(dept_id, result)] in
+    # dept_id order. Each worker opens and closes its own connection, so results must be plain values.
+    org = _main_path(conn)
+    shards = [(dept_id, shard_path(conn, dept_id)) for dept_id in shard_ids(conn)]
+    if not shards:
+        return []
+
+    def work(shard):
+        dept_id, path = shard
+        shard_conn = _open(path, org)
+        try:
+            return run(shard_conn, dept_id)
+        finally:
+            shard_conn.close()
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(min(WORKERS, len(shards)), thread_name_prefix='shard') as pool:
+        return list(zip((dept_id for dept_id, _ in shards), pool.map(work, shards)))
+
+
+def scatter(conn, func, *args, **kwargs):
+    # func(conn, *args, **kwargs) on every shard; unsharded, one call on conn as [(None, result)]
+    if not is_sharded(conn):
+        return [(None, func(conn, *args, **kwargs))]
+    return _scatter(conn, lambda shard, dept_id: func(shard, *args, **kwargs))
+
+
+def by_department(conn, func, *args, dept_id=None, **kwargs):
+    # scatter() for functions with a dept_id filter : each shard runs func for its own department, and
+    # a given dept_id runs on that department's shard alone. Without the filter, run_payroll() on a
+    # shard would pick up every other department's employees from org.Employee.
+    if not is_sharded(conn):
+        return [(dept_id, func(conn, *args, dept_id=dept_id, **kwargs))]
+    if dept_id is not None:
+        return [(dept_id, func(route(conn, dept_id=dept_id), *args, dept_id=dept_id, **kwargs))]
+    return _scatter(conn, lambda shard, shard_dept: func(shard, *args, dept_id=shard_dept, **kwargs))
+
+
+def gather(results, key=None):
+    # The lists a scatter returned, as one list sorted on key when given
+    rows = [row for _, result in results for row in result]
+    if key is not None:
+        rows.sort(key=key)
+    return rows
+
+
+def total(results):
+    return sum(result for _, result in results)
+
+
+def query(conn, sql, params=(), key=0):
+    # Rows of one SELECT from every shard, merged on column key, which each shard's rows must already
+    # be ordered by (key=None : shard after shard). Streams like a cursor; unsharded it is one.
+    if not is_sharded(conn):
+        return conn.execute(sql, params)
+    cursors = [get_conn(conn, dept_id).execute(sql, params) for dept_id in shard_ids(conn)]
+    if key is None:
+        return itertools.chain.from_iterable(cursors)
+    return heapq.merge(*cursors, key=operator.itemgetter(key))
+
+
+#---- MOVING ROWS ----#
+
+def _move(shard, source, where, params=()):
+    # Copies the rows matching where from source (a database attached to shard) into the shard, checks
+    # every one arrived, then deletes them from source; returns the rows moved. The copy commits first,
+    # so an interrupted move loses nothing and running it again finishes the job.
+    copied = [name for name in TABLES if name not in DERIVED]
+    with db.transaction(shard):
+        sequences = shard.execute('SELECT seq, name FROM main.sqlite_sequence').fetchall()
+        for name in copied:
+            shard.execute(f'''
+                        INSERT INTO main.{name}
+                            SELECT * FROM {source}.{name} WHERE {where}
+                            EXCEPT SELECT * FROM main.{name} WHERE {where}
+                        ''', params * 2)
+        # Moved rows keep their ids; new ones still come from the shard's own range
+        shard.executemany('UPDATE main.sqlite_sequence SET seq = ? WHERE name = ?', sequences)
+
+    moved = 0
+    with db.transaction(shard):
+        for name in copied:
+            missing = shard.execute(f'''
+                        SELECT COUNT(*) FROM (SELECT * FROM {source}.{name} WHERE {where}
+                                              EXCEPT SELECT * FROM main.{name} WHERE {where})
+                        ''', params * 2).fetchone()[0]
+            if missing:
+                raise shardError(f'{missing} {name} row(s) did not reach their shard; nothing was deleted')
+        for name in TABLES:
+            cursor = shard.execute(f'DELETE FROM {source}.{name} WHERE {where}', params)
+            if name not in DERIVED:
+                moved += cursor.rowcount
+    return moved
+
+
+def split(conn, vacuum=False):
+    # Moves every department's rows out of emp.db into its shard; returns (rows moved, seconds).
+    # Rows of employees that no longer exist stay behind in emp.db.
+    began = time.perf_counter()
+    homeless = conn.execute('SELECT COUNT(*) FROM Employee WHERE dept_id IS NULL').fetchone()[0]
+    if homeless:
+        raise shardError(f'{homeless} employee(s) have no department; assign one before sharding')
+    conn.commit()
+    moved = 0
+    for (dept_id,) in conn.execute('SELECT dept_id FROM Department ORDER BY dept_id').fetchall():
+        create(conn, dept_id)
+        moved += _move(get_conn(conn, dept_id), 'org',
+                       'emp_id IN (SELECT emp_id FROM org.Employee WHERE dept_id = ?)', (dept_id,))
+    if vacuum:
+        conn.execute('VACUUM main')
+    return moved, time.perf_counter() - began
+
+
+def place(conn, emp_ids, from_dept=None):
+    # Call after committing new employees (their Payroll / Leave_Balance rows were written to emp.db)
+    # or a department change (the rows are still in from_dept's shard). Moves their rows into the
+    # shard of their current department; returns the rows moved.
+    if not emp_ids or not is_sharded(conn):
+        return 0
+    emp_ids = list(emp_ids)
+    departments = {}
+    for start in range(0, len(emp_ids), CHUNK):
+        chunk = emp_ids[start:start + CHUNK]
+        for emp_id, dept_id in conn.execute(f'''
+                    SELECT emp_id, dept_id FROM Employee WHERE emp_id IN ({','.join('?' * len(chunk))})
+                    ''', chunk):
+            departments.setdefault(dept_id, []).append(emp_id)
+
+    moved = 0
+    sharded = set(shard_ids(conn))
+    for dept_id, ids in departments.items():
+        shard = route(conn, emp_id=ids[0], dept_id=dept_id)
+        old = from_dept if from_dept in sharded and from_dept != dept_id else None
+        if old is not None:
+            shard.execute('ATTACH DATABASE ? AS src', (shard_path(conn, old),))
+        try:
+            shard.execute('CREATE TEMP TABLE IF NOT EXISTS Shard_Move(emp_id INTEGER PRIMARY KEY)')
+            shard.execute('DELETE FROM Shard_Move')
+            shard.executemany('INSERT INTO Shard_Move(emp_id) VALUES (?)', ((emp_id,) for emp_id in ids))
+            where = 'emp_id IN (SELECT emp_id FROM temp.Shard_Move)'
+            moved += _move(shard, 'org', where)
+            if old is not None:
+                moved += _move(shard, 'src', where)
+        finally:
+            shard.rollback()
+            if old is not None:
+                shard.execute('DETACH DATABASE src')
+    return moved
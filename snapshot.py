@@ -0,0 +1,138 @@
+#------------------------------------------- REPORTING SNAPSHOT ----------------------------------------------#
+
+# Long reports read a copy of the live database instead of emp.db itself, so they never hold a read
+# transaction open against the punches. refresh() copies the live file with the sqlite3 backup API
+# into <base>.report.db (emp.db -> emp.report.db) and records when the copy was taken; report_conn()
+# hands out a read-only connection to it, refreshing first when the copy is missing or older than
+# EMS_SNAPSHOT_MAX_AGE seconds. EMS_SNAPSHOT=0 sends the reports back to the live database, and so does
+# sharding (see shards.py), as the copy would hold emp.db without the departments' rows.
+#   python ems.py db snapshot                          # on demand, or from cron
+#   EMS_SNAPSHOT_INTERVAL=300 python ems.py            # refreshed in the background every 5 minutes
+
+import datetime
+import os
+import sqlite3
+import threading
+import time
+
+import db
+import shards
+
+MAX_AGE = 600
+
+_local = threading.local()
+_refresher = None
+
+
+def enabled():
+    return os.environ.get('EMS_SNAPSHOT', '1') not in ('', '0')
+
+
+def snapshot_path(path=None):
+    base, _ = os.path.splitext(path or db.DB_PATH)
+    return f'{base}.report.db'
+
+
+def refresh(path=None):
+    # Copies the live database into the snapshot; returns (as of, seconds). The copy is built in a
+    # temporary file and renamed over the old one, so open report connections keep the copy they had.
+    target = snapshot_path(path)
+    building = f'{target}.{os.getpid()}.{threading.get_ident()}.tmp'
+    began = time.perf_counter()
+    # A connection of its own : the pooled one may hold uncommitted changes
+    source = db.connect(path)
+    copy = sqlite3.connect(building)
+    try:
+        taken = datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
+        # One step, so the copy is a single read transaction; under WAL the punches carry on meanwhile
+        source.backup(copy)
+        copy.execute('PRAGMA journal_mode = DELETE')
+        copy.execute('CREATE TABLE Snapshot_Info(taken_at TEXT, seconds REAL)')
+        copy.execute('INSERT INTO Snapshot_Info VALUES (?, ?)', (taken, round(time.perf_counter() - began, 3)))
+        copy.commit()
+    except BaseException:
+        copy.close()
+        os.remove(building)
+        raise
+    finally:
+        source.close()
+    copy.close()
+    os.replace(building, target)
+    return taken, time.perf_counter() - began
+
+
+def report_conn(max_age=None):
+    # Read-only connection to a snapshot at most max_age seconds old, one per thread; the live
+    # connection when snapshots are switched off or the database is sharded
+    if not enabled() or shards.is_sharded(db.get_conn()):
+        return db.get_conn()
+    if max_age is None:
+        max_age = float(os.environ.get('EMS_SNAPSHOT_MAX_AGE', MAX_AGE))
+    target = snapshot_path()
+    try:
+        stat = os.stat(target)
+    except FileNotFoundError:
+        stat = None
+    if stat is None or time.time() - stat.st_mtime > max_age:
+        refresh()
+        stat = os.stat(target)
+    key = (target, stat.st_ino, stat.st_mtime_ns)
+    cached = getattr(_local, 'conn', None)
+    if cached is not None:
+        if cached[0] == key:
+            return cached[1]
+        cached[1].close()
+    conn = sqlite3.connect(f'file:{target}?mode=ro', uri=True, check_same_thread=False, factory=db.CONNECTION_CLASS)
+    _local.conn = (key, conn)
+    return conn
+
+
+def as_of(conn):
+    # When the snapshot behind conn was taken; None for the live database
+    try:
+        row = conn.execute('SELECT taken_at FROM Snapshot_Info').fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+def close():
+    cached = getattr(_local, 'conn', None)
+    if cached is not None:
+        cached[1].close()
+        _local.conn = None
+
+
+def start_refresher(interval):
+    # Refreshes the snapshot every interval seconds from a daemon thread
+    global _refresher
+    if _refresher is not None:
+        return
+    stopping = threading.Event()
+
+    def run():
+        while not stopping.wait(interval):
+            try:
+                refresh()
+            except (sqlite3.Error, OSError):
+                # The next round tries again; report_conn() refreshes a stale copy itself
+                pass
+
+    thread = threading.Thread(target=run, name='snapshot-refresher', daemon=True)
+    thread.start()
+    _refresher = (thread, stopping)
+
+
+def stop_refresher():
+    global _refresher
+    if _refresher is not None:
+        thread, stopping = _refresher
+        stopping.set()
+        thread.join()
+        _refresher = None
+
+
+def start_from_env():
+    interval = os.environ.get('EMS_SNAPSHOT_INTERVAL')
+    if interval and enabled():
+        start_refresher(float(interval))
@@ -0,0 +1,110 @@
+#------------------------------------------- TABLE OUTPUT ----------------------------------------------#
+
+# Prints query results as they come off the cursor. Column widths are fixed up front, from the widths
+# given or from the headers and the first SAMPLE_ROWS rows; later cells that do not fit are cut with
+# '~', so no more than the sample is ever held in memory. On a terminal the rows are drawn in a grid a
+# screenful at a time; piped output (or EMS_TABLE=plain) is tab-separated with no paging.
+#   EMS_TABLE=plain python ems.py | tee session.log
+
+import itertools
+import os
+import shutil
+import sys
+
+SAMPLE_ROWS = 50
+MAX_WIDTH = 40
+MODES = ('grid', 'plain')
+
+
+def mode(out=None):
+    # 'grid' on a terminal, 'plain' for pipes and files; EMS_TABLE=grid/plain overrides
+    chosen = os.environ.get('EMS_TABLE', '').lower()
+    if chosen in MODES:
+        return chosen
+    out = out or sys.stdout
+    return 'grid' if hasattr(out, 'isatty') and out.isatty() else 'plain'
+
+
+def page_rows():
+    # Rows that fit on one screen under the header and the paging prompt
+    return max(5, shutil.get_terminal_size().lines - 6)
+
+
+def cell(value, floatfmt=None):
+    if value is None:
+        return ''
+    if isinstance(value, float) and floatfmt:
+        return format(value, floatfmt)
+    return str(value)
+
+
+def _texts(row, floatfmt=None):
+    # str() of every value, with the per-cell rules only for rows that need them
+    if floatfmt or None in row:
+        return [cell(value, floatfmt) for value in row]
+    return list(map(str, row))
+
+
+def _fit(text, width):
+    return text if len(text) <= width else text[:width - 1] + '~'
+
+
+def _numeric(values):
+    values = [value for value in values if value is not None]
+    return bool(values) and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values)
+
+
+def render(rows, headers, widths=None, floatfmt=None, page_size=None, out=None, table_mode=None):
+    # Prints rows (any iterable, e.g. a cursor) under headers and returns how many were printed;
+    # nothing at all is printed when there are no rows. page_size=None pages a terminal by its
+    # height, 0 never pages.
+    out = out or sys.stdout
+    table_mode = table_mode or mode(out)
+    rows = iter(rows)
+    sample = []
+    for row in rows:
+        sample.append(tuple(row))
+        if len(sample) == SAMPLE_ROWS:
+            break
+    if not sample:
+        return 0
+
+    if table_mode == 'plain':
+        out.write('\t'.join(headers) + '\n')
+        count = 0
+        for row in itertools.chain(sample, rows):
+            line = '\t'.join(_texts(row, floatfmt))
+            if '\n' in line or line.count('\t') >= len(row):
+                line = '\t'.join([cell(value, floatfmt).replace('\t', ' ').replace('\n', ' ') for value in row])
+            out.write(line + '\n')
+            count += 1
+        return count
+
+    columns = list(zip(*sample))
+    right = [_numeric(column) for column in columns]
+    if widths is None:
+        widths = [None] * len(headers)
+    widths = [width or min(MAX_WIDTH, max(len(header), *(len(cell(value, floatfmt)) for value in column)))
+              for header, column, width in zip(headers, columns, widths)]
+    rule = '+' + '+'.join('-' * (width + 2) for width in widths) + '+\n'
+    # One format string per table; cells are only cut to width when one is too long
+    template = '| ' + ' | '.join(f'{{:{">" if flush else "<"}{width}}}' for width, flush in zip(widths, right)) + ' |\n'
+    header = rule + '| ' + ' | '.join(_fit(text, width).ljust(width) for text, width in zip(headers, widths)) + ' |\n'
+    header += rule.replace('-', '=')
+    if page_size is None:
+        page_size = page_rows() if out.isatty() else 0
+    out.write(header)
+    count = 0
+    for row in itertools.chain(sample, rows):
+        if page_size and count and count % page_size == 0:
+            out.flush()
+            if input(f' -- {count} rows shown, Enter for more, q to stop -- ').strip().lower() == 'q':
+                break
+            out.write(header)
+        texts = _texts(row, floatfmt)
+        if any(len(text) > width for text, width in zip(texts, widths)):
+            texts = [_fit(text, width) for text, width in zip(texts, widths)]
+        out.write(template.format(*texts))
+        count += 1
+    out.write(rule)
+    return count
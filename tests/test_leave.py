@@ -0,0 +1,43 @@
+import datetime
+
+import db
+import leave
+import migrations
+
+TODAY = datetime.date(2030, 1, 1)
+
+
+def employee_db(path, balance=42):
+    conn = db.connect(str(path))
+    migrations.migrate(conn)
+    conn.execute("INSERT INTO Department(dept_name) VALUES ('IT')")
+    conn.execute("INSERT INTO Employee(dept_id, name, salary) VALUES (1, 'BOB', 25000)")
+    conn.execute('INSERT INTO Leave_Balance(emp_id, total_leave) VALUES (1, ?)', (balance,))
+    conn.execute('INSERT INTO Payroll(emp_id, basic_pay, allowance, deduction, overtime_pay, net_pay) VALUES (1, 25000, 0, 0, 0, 25000)')
+    conn.commit()
+    return conn
+
+
+def test_rule_for_any_leave_type_does_not_approve_paid_leave(tmp_path):
+    conn = employee_db(tmp_path / 'emp.db')
+    leave.add_rule(conn, max_days=5)
+
+    paid = leave.apply_leave(conn, 1, 'PAID LEAVE', '2030-01-06', '2030-01-07', today=TODAY)
+    casual = leave.apply_leave(conn, 1, 'CASUAL LEAVE', '2030-01-13', '2030-01-14', today=TODAY)
+
+    assert paid['status'] == 'PENDING' and paid['rule_id'] is None
+    assert casual['status'] == 'APPROVED'
+    assert leave.matching_rule(conn, 1, 'PAID LEAVE', 1, 40) is None
+    conn.close()
+
+
+def test_summary_reports_the_employees_own_entitlement(tmp_path):
+    conn = employee_db(tmp_path / 'emp.db', balance=20)
+    conn.execute('UPDATE Employee SET leave_entitlement = 24 WHERE emp_id = 1')
+    conn.commit()
+
+    summary = leave.leave_summary(conn, 1)
+
+    assert (summary['entitlement'], summary['balance']) == (24, 20)
+    assert leave.team_leave_summary(conn)[0]['entitlement'] == 24
+    conn.close()
@@ -0,0 +1,62 @@
+import pytest
+
+import db
+import migrations
+
+
+def legacy_db(path):
+    # A database as the pre-migration ems.py left it : the base tables and user_version 0
+    conn = db.connect(str(path))
+    for sql in migrations.MIGRATIONS[0][1]:
+        conn.execute(sql)
+    conn.execute("INSERT INTO Department(dept_name) VALUES ('IT')")
+    conn.execute("INSERT INTO Employee(dept_id, name, salary) VALUES (1, 'BOB', 25000)")
+    conn.execute("INSERT INTO Leave_Balance(emp_id, total_leave) VALUES (1, 0)")
+    conn.commit()
+    return conn
+
+
+def test_extra_legacy_payroll_rows_keep_their_deductions(tmp_path):
+    conn = legacy_db(tmp_path / 'emp.db')
+    # The row added on registration, then one per punch out : a full absence and a half day, each
+    # copying the first row's deduction and adding its own
+    conn.execute('INSERT INTO Payroll(emp_id, basic_pay, allowance, deduction, overtime_pay, net_pay) VALUES (1, 25000, 0, 200, 0, 25000)')
+    conn.executemany('INSERT INTO Payroll(emp_id, deduction, basic_pay) VALUES (?, ?, ?)',
+                     [(1, 1200, 25000), (1, 700, 25000)])
+    conn.commit()
+
+    migrations.migrate(conn)
+
+    assert conn.execute('SELECT COUNT(*) FROM Payroll').fetchone()[0] == 1
+    entries = conn.execute('''
+                    SELECT amount FROM Payroll_Adjustment WHERE emp_id = 1 AND kind = 'DEDUCTION' AND source = 'MIGRATED'
+                        ORDER BY amount
+                    ''').fetchall()
+    assert [i[0] for i in entries] == [200, 500, 1000]
+    assert conn.execute('SELECT deduction FROM Payroll_Total WHERE emp_id = 1').fetchone()[0] == 1700
+    conn.close()
+
+
+def test_legacy_rows_without_extra_deduction_add_no_entries(tmp_path):
+    conn = legacy_db(tmp_path / 'emp.db')
+    conn.execute('INSERT INTO Payroll(emp_id, basic_pay, allowance, deduction, overtime_pay, net_pay) VALUES (1, 25000, 0, 0, 0, 25000)')
+    conn.execute('INSERT INTO Payroll(emp_id, deduction, basic_pay) VALUES (1, 0, 25000)')
+    conn.commit()
+
+    migrations.migrate(conn)
+
+    assert conn.execute('SELECT COUNT(*) FROM Payroll_Adjustment').fetchone()[0] == 0
+    conn.close()
+
+
+def test_duplicates_in_a_legacy_database_stop_the_migration_with_the_keys(tmp_path):
+    conn = legacy_db(tmp_path / 'emp.db')
+    conn.executemany("INSERT INTO Attendance(emp_id, date, status) VALUES (1, '2025-10-06', ?)", [('PRESENT',), ('ABSENT',)])
+    conn.commit()
+
+    with pytest.raises(migrations.migrationError, match=r"Attendance\(emp_id, date\).*1/2025-10-06 \(2 rows\)"):
+        migrations.migrate(conn)
+
+    assert migrations.schema_version(conn) == 0
+    assert conn.execute('SELECT COUNT(*) FROM Attendance').fetchone()[0] == 2
+    conn.close()
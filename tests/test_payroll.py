@@ -0,0 +1,22 @@
+import db
+import migrations
+import payroll
+
+
+def test_manual_allowance_and_payroll_run_agree_when_salary_changed(tmp_path):
+    conn = db.connect(str(tmp_path / 'emp.db'))
+    migrations.migrate(conn)
+    conn.execute("INSERT INTO Department(dept_name) VALUES ('IT')")
+    # A raise recorded on the employee after their payroll row was created
+    conn.execute("INSERT INTO Employee(dept_id, name, salary) VALUES (1, 'BOB', 30000)")
+    conn.execute('INSERT INTO Payroll(emp_id, basic_pay, allowance, deduction, overtime_pay, net_pay) VALUES (1, 25000, 0, 0, 0, 25000)')
+    conn.commit()
+
+    assert payroll.apply_allowance(conn, '2030-01', emp_id=1, source='MANAGER') == [(1, 3000)]
+    payroll.run_payroll(conn, '2030-01')
+    payroll.apply_allowance(conn, '2030-01', emp_id=1, source='MANAGER')
+
+    entries = conn.execute("SELECT amount, source FROM Payroll_Adjustment WHERE kind = 'ALLOWANCE'").fetchall()
+    assert entries == [(3000, 'MANAGER')]
+    assert payroll.salary_record(conn, 1, '2030-01')[2:4] == (30000, 3000)
+    conn.close()
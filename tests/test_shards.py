@@ -0,0 +1,117 @@
+import datetime
+
+import pytest
+
+import attendance
+import db
+import departments
+import migrations
+import shards
+
+NOW = datetime.datetime(2030, 1, 7, 9, 0)
+
+
+def sharded_db(path):
+    # HR (1) holds ANN, IT (2) holds BOB and CAL; each department's rows in its own shard
+    conn = db.connect(str(path))
+    migrations.migrate(conn)
+    conn.executemany('INSERT INTO Department(dept_name) VALUES (?)', [('HR',), ('IT',)])
+    conn.executemany('INSERT INTO Employee(emp_id, dept_id, name, salary) VALUES (?, ?, ?, ?)',
+                     [(1, 1, 'ANN', 20000), (2, 2, 'BOB', 25000), (3, 2, 'CAL', 30000)])
+    conn.executemany('''
+                    INSERT INTO Payroll(emp_id, basic_pay, allowance, deduction, overtime_pay, net_pay)
+                        SELECT emp_id, salary, 0, 0, 0, salary FROM Employee WHERE emp_id = ?
+                    ''', [(1,), (2,), (3,)])
+    conn.commit()
+    shards.split(conn)
+    return conn
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'emp.db')
+
+
+@pytest.fixture
+def conn(path):
+    conn = sharded_db(path)
+    yield conn
+    attendance.stop_writer()
+    shards.close_all()
+    conn.close()
+
+
+def rows(conn, table, dept_id=None):
+    # emp_ids in table of a department's shard, or of emp.db itself
+    source = conn if dept_id is None else shards.get_conn(conn, dept_id)
+    return [row[0] for row in source.execute(f'SELECT emp_id FROM main.{table} ORDER BY emp_id')]
+
+
+def test_route_returns_the_shard_of_the_employees_department(conn, path):
+    routed = shards.route(conn, 2)
+    assert routed is shards.get_conn(conn, 2)
+    assert routed.execute("PRAGMA database_list").fetchall()[0][2].endswith('emp.dept_2.db')
+    assert shards.route(conn, dept_id=1) is shards.get_conn(conn, 1)
+    # An unknown employee stays on the caller's connection, which reports it as before
+    assert shards.route(conn, 99) is conn
+
+
+def test_punch_is_written_to_the_employees_shard(conn):
+    attendance.punch_in(shards.route(conn, 1), 1, NOW)
+
+    assert rows(conn, 'Attendance', 1) == [1]
+    assert rows(conn, 'Attendance', 2) == []
+    assert rows(conn, 'Attendance') == []
+
+
+def test_scatter_runs_on_every_shard_and_gather_merges(conn):
+    results = shards.scatter(conn, lambda shard: shard.execute('SELECT emp_id FROM main.Payroll').fetchall())
+
+    assert [dept_id for dept_id, _ in results] == [1, 2]
+    assert shards.gather(results, key=lambda row: row[0]) == [(1,), (2,), (3,)]
+    assert rows(conn, 'Payroll') == []
+
+
+def test_place_moves_a_transferred_employees_rows(conn):
+    conn.execute('UPDATE Employee SET dept_id = 1 WHERE emp_id = 3')
+    conn.commit()
+
+    assert shards.place(conn, [3], from_dept=2) == 1
+    assert rows(conn, 'Payroll', 1) == [1, 3]
+    assert rows(conn, 'Payroll', 2) == [2]
+
+
+def test_writer_commits_a_batch_spanning_two_shards_once_per_shard(conn, path):
+    writer = attendance.start_writer(path, max_wait=0.5)
+    futures = [writer.submit('in', emp_id, NOW) for emp_id in (1, 2, 3)]
+
+    assert all(future.result(timeout=5) for future in futures)
+    assert writer.stats['batches'] == 2
+    assert rows(conn, 'Attendance', 1) == [1]
+    assert rows(conn, 'Attendance', 2) == [2, 3]
+
+
+def test_writer_commits_to_a_shard_while_emp_db_is_locked(conn, path):
+    writer = attendance.start_writer(path, max_wait=0)
+    holder = db.connect(path)
+    holder.execute('BEGIN IMMEDIATE')
+    try:
+        assert writer.submit('in', 2, NOW).result(timeout=2)
+    finally:
+        holder.rollback()
+        holder.close()
+    assert rows(conn, 'Attendance', 2) == [2]
+
+
+def test_department_cache_on_a_shard_sees_changes_to_emp_db(conn, path, monkeypatch):
+    monkeypatch.setattr(departments, 'RECHECK_AFTER', 0)
+    shard = shards.get_conn(conn, 2)
+    assert departments.dept_name(shard, 2) == 'IT'
+
+    other = db.connect(path)
+    other.execute("UPDATE Department SET dept_name = 'TECH' WHERE dept_id = 2")
+    other.commit()
+    other.close()
+
+    assert departments.dept_name(shard, 2) == 'TECH'
+    assert departments.dept_id(conn, 'TECH') == 2